@@ -0,0 +1,81 @@
+"""
+Review Aggregator
+
+Hometown Split Benchmark
+
+This file contains a micro-benchmark of the Yelp review hometown steps. YelpReviewDataTransformer.seperate_city_state
+and create_country_column used to run split_hometown and check_if_state_is_state once per row; they now work on the
+whole column. This times both versions on synthetic hometowns and checks that their curated output is identical.
+
+Usage (from the repository root):
+    python benchmarks/hometown_split_benchmark.py --reviews 1000000
+"""
+###################################################################################################################
+# libraries
+import sys
+import os
+import io
+import argparse
+import random
+import time
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from benchmarks.synthetic_data_generator import YELP_HOMETOWNS
+from data_transformers.transformer_classes.yelp_review_data_transformer import YelpReviewDataTransformer
+
+# hometowns the scraper has produced that the generator does not, e.g., missing or with extra commas
+EDGE_CASE_HOMETOWNS = [None, "Nowhere", "Manhattan, New York, NY", "Kyoto, Kyoto, Japan, Asia", ",ME", "Paris,  France "]
+
+###################################################################################################################
+# main
+def make_hometowns(reviews:int, seed:int) -> pd.DataFrame:
+    """
+    Returns a raw review frame with one synthetic hometown per review, read back from csv as the transformer reads it.
+    """
+    rng = random.Random(seed)
+    hometowns = [hometown for hometown, *_ in YELP_HOMETOWNS] * 20 + EDGE_CASE_HOMETOWNS
+    frame = pd.DataFrame({"hometown": rng.choices(hometowns, k = reviews)})
+    return pd.read_csv(io.StringIO(frame.to_csv(index = False)))
+
+def per_row(transformer:YelpReviewDataTransformer) -> None:
+    """
+    The per row version of seperate_city_state and create_country_column.
+    """
+    raw_data = transformer.raw_data
+    raw_data[["city", "state"]] = raw_data["hometown"].apply(lambda x: transformer.split_hometown(x)).apply(pd.Series)
+    raw_data["country"] = raw_data["state"].apply(lambda x: transformer.check_if_state_is_state(x))
+    raw_data.loc[raw_data["country"] != "US", "state"] = pd.NA
+
+def whole_column(transformer:YelpReviewDataTransformer) -> None:
+    """
+    The current seperate_city_state and create_country_column.
+    """
+    transformer.seperate_city_state().create_country_column()
+
+def main():
+    """
+    Time both versions and compare their csv output.
+    """
+    parser = argparse.ArgumentParser(description = "Time the Yelp review hometown steps.")
+    parser.add_argument("--reviews", type = int, default = 1000000)
+    parser.add_argument("--seed", type = int, default = 0)
+    args = parser.parse_args()
+
+    raw_data = make_hometowns(args.reviews, args.seed)
+    outputs, seconds = {}, {}
+    for name, steps in [("per row", per_row), ("whole column", whole_column)]:
+        transformer = YelpReviewDataTransformer()
+        transformer.raw_data = raw_data.copy()
+        start = time.perf_counter()
+        steps(transformer)
+        seconds[name] = time.perf_counter() - start
+        outputs[name] = transformer.raw_data[["city", "state", "country"]].to_csv()
+
+    print(f"{args.reviews} reviews")
+    for name in seconds:
+        print(f"{name:<14} {seconds[name]:8.3f} s  {seconds['per row'] / seconds[name]:6.1f}x")
+    print(f"identical output: {outputs['per row'] == outputs['whole column']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""
+Review Aggregator
+
+Pipeline Benchmark
+
+This file contains a scale benchmark for the ETL pipeline. It generates a synthetic region with SyntheticDataGenerator,
+times every transformer step on the raw files and every RestaurantReviewDB load method on the curated files, and
+appends one JSON line per step to a results file. A previous results file can be passed to flag steps that got slower.
+
+Usage (from the repository root):
+    python benchmarks/pipeline_benchmark.py --restaurants 2400 --reviews 96000 --output benchmarks/results.jsonl
+    python benchmarks/pipeline_benchmark.py --restaurants 2400 --reviews 96000 --compare benchmarks/results.jsonl
+"""
+###################################################################################################################
+# libraries
+import sys
+import os
+import argparse
+import datetime
+import json
+import platform
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'db_manager')))
+from benchmarks.synthetic_data_generator import SyntheticDataGenerator
+from data_transformers.transformer_classes.yelp_res_data_transformer import YelpResDataTransformer
+from data_transformers.transformer_classes.yelp_review_data_transformer import YelpReviewDataTransformer
+from data_transformers.transformer_classes.open_table_res_data_transformer import OpenTableResDataTransformer
+from data_transformers.transformer_classes.open_table_review_data_transformer import OpenTableReviewDataTransformer
+from database_manager_class import RestaurantReviewDB
+
+###################################################################################################################
+# steps
+# The table each load method fills, used to report its row count
+LOAD_METHODS = [("load_site_origin_table", "site_origin"),
+                ("load_region_table", "region"),
+                ("load_tags_table", "tag"),
+                ("load_price_point_table", "price_point"),
+                ("load_restuarant_table", "restaurant"),
+                ("load_res_tags_table", "restaurant_tag"),
+                ("load_reviewer_table", "reviewer"),
+                ("load_restaurant_review_table", "res_review"),
+                ("load_aux_rating_table", "open_table_category_rating")]
+
+class StepTimer:
+    """
+    Times pipeline steps and collects one result record per step.
+
+    Attributes:
+     * run: (dict)     - Fields shared by every record of the run: run id, scale, python and sqlite versions.
+     * results: (list) - One dict per timed step.
+    """
+
+    def __init__(self, run:dict) -> None:
+        self.run = run
+        self.results = []
+
+    def time(self, stage:str, function, *args, rows = None):
+        """
+        Calls function(*args), records its wall time, and returns its result.
+
+        Params:
+         * stage: (str)      - The step name, e.g., "transform.yelp_review.clean_datelike_col".
+         * function: (func)  - The step.
+         * rows: (func)      - Called after the step to get the row count it produced. Default None.
+        """
+        start = time.perf_counter()
+        result = function(*args)
+        seconds = time.perf_counter() - start
+        self.results.append(dict(self.run, stage = stage, seconds = round(seconds, 6),
+                                 rows = rows() if rows is not None else None))
+        print(f"{stage:<62} {seconds:9.3f} s")
+        return result
+
+def run_transformers(timer:StepTimer, home:Path, file_names:dict) -> None:
+    """
+    Runs the four transformers one step at a time, in driver order, writing their output to home/data/curated.
+    """
+    curated_folder = home / "data" / "curated"
+
+    # Yelp restaurants
+    transformer = YelpResDataTransformer()
+    transformer.HOME = home
+    rows = lambda: len(transformer.raw_data)
+    for step, args in [("set_file_name", (file_names["yelp_restaurant"][0], )), ("set_data", ()),
+                       ("clean_restaurant_name_column", ()), ("clean_price_point_col", ()), ("update_tag_col", ()),
+                       ("add_city_and_state_columns", ()), ("drop_rename_reorder_cols", ()), ("save_transformed_data", ())]:
+        timer.time(f"transform.yelp_restaurant.{step}", getattr(transformer, step), *args,
+                   rows = rows if step != "set_file_name" else None)
+
+    # Yelp reviews
+    transformer = YelpReviewDataTransformer()
+    transformer.HOME = home
+    rows = lambda: len(transformer.raw_data)
+    for step, args in [("set_file_name", (file_names["yelp_review"][0], )), ("set_data", ()),
+                       ("clean_restaurant_name_column", ()), ("clean_datelike_col", ()), ("clean_rating_column", ()),
+                       ("seperate_city_state", ()), ("create_country_column", ()), ("drop_rename_reorder_cols", ()),
+                       ("save_transformed_data", ())]:
+        timer.time(f"transform.yelp_review.{step}", getattr(transformer, step), *args,
+                   rows = rows if step != "set_file_name" else None)
+
+    # OpenTable restaurants
+    transformer = OpenTableResDataTransformer()
+    transformer.HOME = home
+    rows = lambda: len(transformer.raw_data)
+    raw_file_name = file_names["open_table_restaurant"][0]
+    for step, args in [("set_file_name", (raw_file_name, )), ("set_data", ()),
+                       ("clean_restaurant_name_columns", (["restaurant_name_extracted", "restaurant_name_input"], )),
+                       ("remove_inadvertent_extractions", ()), ("fix_description_encoding", ()), ("seperate_region", ()),
+                       ("seperate_price_range_cols", ()), ("update_tag_cols", ()), ("drop_and_reorder_cols", ()),
+                       ("save_transformed_data", ())]:
+        timer.time(f"transform.open_table_restaurant.{step}", getattr(transformer, step), *args,
+                   rows = rows if step != "set_file_name" else None)
+    restaurants_to_remove = transformer.drop_list
+
+    # OpenTable reviews
+    transformer = OpenTableReviewDataTransformer()
+    transformer.HOME = home
+    rows = lambda: len(transformer.raw_data)
+    raw_file_name, curated_file_name = file_names["open_table_review"]
+    for step, args in [("set_file_name", (raw_file_name, )), ("set_data", ()),
+                       ("clean_restaurant_name_columns", (["restaurant_name_input"], )), ("fix_review_text_encoding", ()),
+                       ("remove_erroneous_restaurant_reviews", (restaurants_to_remove, )), ("update_datelike_column", ()),
+                       ("rename_columns", ()), ("clean_hometown_column", ()), ("drop_and_reorder_cols", ())]:
+        timer.time(f"transform.open_table_review.{step}", getattr(transformer, step), *args,
+                   rows = rows if step != "set_file_name" else None)
+    timer.time("transform.open_table_review.to_csv", transformer.raw_data.to_csv, str(curated_folder / curated_file_name),
+               rows = rows)
+
+def run_loaders(timer:StepTimer, home:Path, file_names:dict, load_all:bool) -> None:
+    """
+    Loads the curated files into a new database with each load method, or with load_all.
+    """
+    ResDB = RestaurantReviewDB("benchmark.db")
+    ResDB.HOME = home
+    ResDB.set_open_table_data(file_names["open_table_review"][1], file_names["open_table_restaurant"][1])
+    ResDB.set_yelp_data(file_names["yelp_review"][1], file_names["yelp_restaurant"][1])
+
+    def count_rows(table):
+        connection = sqlite3.connect(str(ResDB.get_db_file_path()))
+        try:
+            return connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        finally:
+            connection.close()
+
+    timer.time("load.create_tables", ResDB.create_tables)
+    if load_all:
+        timer.time("load.load_all", ResDB.load_all, rows = lambda: count_rows("res_review"))
+    else:
+        for method, table in LOAD_METHODS:
+            timer.time(f"load.{method}", getattr(ResDB, method), rows = lambda table = table: count_rows(table))
+
+def compare_results(results:list, baseline_path:Path, threshold:float) -> bool:
+    """
+    Compares the run against the latest run at the same scale in a baseline results file, printing the time ratio
+    of every step.
+
+    Params:
+     * results: (list)            - The records of this run.
+     * baseline_path: (Path)      - A results file written by an earlier run.
+     * threshold: (float)         - A step is flagged when it is this many times slower than the baseline.
+
+    Returns:
+     * regressed: (bool) - True if any step was flagged.
+    """
+    scale = (results[0]["restaurants"], results[0]["reviews"])
+    with open(baseline_path, "r") as file:
+        records = [json.loads(line) for line in file if line.strip()]
+    records = [record for record in records if (record["restaurants"], record["reviews"]) == scale]
+    if not records:
+        print(f"No baseline run at {scale[0]} restaurants and {scale[1]} reviews in {baseline_path}")
+        return False
+    baseline_run = records[-1]["run_id"]
+    baseline = {record["stage"]: record["seconds"] for record in records if record["run_id"] == baseline_run}
+
+    print(f"\nCompared with run {baseline_run}:")
+    regressed = False
+    for record in results:
+        if record["stage"] not in baseline:
+            continue
+        ratio = record["seconds"] / baseline[record["stage"]] if baseline[record["stage"]] > 0 else float("inf")
+        # steps under 50 ms are too noisy to flag
+        flag = ratio > threshold and record["seconds"] > 0.05
+        regressed = regressed or flag
+        print(f"{record['stage']:<62} {baseline[record['stage']]:9.3f} s {record['seconds']:9.3f} s {ratio:6.2f}x"
+              f"{'  REGRESSION' if flag else ''}")
+    return regressed
+
+###################################################################################################################
+# main
+def main():
+    """
+    Generate, transform and load a synthetic region, timing each step.
+    """
+    parser = argparse.ArgumentParser(description = "Time the transformers and loaders on synthetic data.")
+    parser.add_argument("--restaurants", type = int, default = 240)
+    parser.add_argument("--reviews", type = int, default = 9600)
+    parser.add_argument("--seed", type = int, default = 0)
+    parser.add_argument("--home", help = "Folder for the generated data and database. Default, a temporary folder.")
+    parser.add_argument("--skip-transform", action = "store_true", help = "Load the generated curated files directly.")
+    parser.add_argument("--load-all", action = "store_true", help = "Time load_all instead of the nine load methods.")
+    parser.add_argument("--output", help = "Results file the step records are appended to, as JSON lines.")
+    parser.add_argument("--compare", help = "Results file of an earlier run to compare against.")
+    parser.add_argument("--threshold", type = float, default = 1.25, help = "Slowdown ratio flagged as a regression.")
+    args = parser.parse_args()
+
+    run = {"run_id": datetime.datetime.now().strftime("%Y%m%dT%H%M%S"),
+           "restaurants": args.restaurants, "reviews": args.reviews, "seed": args.seed,
+           "python": platform.python_version(), "sqlite": sqlite3.sqlite_version}
+    timer = StepTimer(run)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        home = Path(args.home) if args.home else Path(temp_dir)
+        generator = SyntheticDataGenerator(home, restaurants = args.restaurants, reviews = args.reviews, seed = args.seed)
+        timer.time("generate", generator.generate)
+
+        if not args.skip_transform:
+            run_transformers(timer, home, generator.file_names)
+        run_loaders(timer, home, generator.file_names, args.load_all)
+
+    total = sum(record["seconds"] for record in timer.results if record["stage"] != "generate")
+    print(f"{'total (excluding generate)':<62} {total:9.3f} s")
+
+    if args.output:
+        with open(args.output, "a") as file:
+            for record in timer.results:
+                file.write(json.dumps(record) + "\n")
+    if args.compare and compare_results(timer.results, Path(args.compare), args.threshold):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
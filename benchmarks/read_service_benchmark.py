@@ -0,0 +1,133 @@
+"""
+Review Aggregator
+
+Read Service Benchmark
+
+This file contains a benchmark of ReadQueryService. It runs a mix of analyst queries concurrently against a copy of a
+database while a writer thread keeps inserting reviews, and prints the per query latency and the writer's throughput.
+The database given is copied to a temporary folder first, so it is never modified.
+
+Usage (from the repository root):
+    python benchmarks/read_service_benchmark.py data/database/restaurant_review_database.db --workers 8 --rounds 50
+"""
+###################################################################################################################
+# libraries
+import sys
+import os
+import argparse
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'db_manager')))
+from database_manager_class import RestaurantReviewDB
+
+###################################################################################################################
+# queries
+QUERIES = [
+    ("leaderboard",
+     """
+     SELECT Re.name, S.review_count, CAST(S.rating_sum AS REAL) / S.rating_count AS avg_rating
+     FROM restaurant_rating_summary AS S
+     JOIN restaurant AS Re ON S.restaurant_id = Re.id
+     WHERE S.rating_count >= ?
+     ORDER BY avg_rating DESC
+     LIMIT 10
+     """, (20, )),
+    ("monthly_ratings",
+     """
+     SELECT substr(R.date, 1, 7) AS month, S.site_name, COUNT(*) AS reviews, AVG(R.rating) AS avg_rating
+     FROM res_review AS R
+     JOIN site_origin AS S ON R.site_origin_id = S.id
+     GROUP BY month, S.site_name
+     """, ()),
+    ("top_reviewers",
+     """
+     SELECT V.name, V.hometown, COUNT(*) AS reviews
+     FROM res_review AS R
+     JOIN reviewer AS V ON R.reviewer_id = V.id
+     GROUP BY R.reviewer_id
+     ORDER BY reviews DESC
+     LIMIT 25
+     """, ()),
+    ("text_search",
+     """
+     SELECT R.id, R.rating, R.date
+     FROM review_fts
+     JOIN res_review AS R ON R.id = review_fts.rowid
+     WHERE review_fts MATCH ?
+     ORDER BY rank
+     LIMIT 50
+     """, ("lobster OR oysters", )),
+    ]
+
+###################################################################################################################
+# main
+def write_reviews(db_file_path:Path, stop:threading.Event, batch_size:int, counts:dict) -> None:
+    """
+    Inserts batches of reviews, each in its own transaction, until stop is set. The reviews copy existing rows with a
+    new review hash, so every trigger fires as it would for a real load.
+    """
+    connection = sqlite3.connect(str(db_file_path), timeout = 30)
+    source = connection.execute("""
+                                SELECT restaurant_id, reviewer_id, site_origin_id, rating, date, review_text
+                                FROM res_review LIMIT ?
+                                """, (batch_size, )).fetchall()
+    try:
+        while not stop.is_set():
+            with connection:
+                connection.executemany("""
+                                       INSERT INTO res_review(restaurant_id, reviewer_id, site_origin_id, rating, date,
+                                                              review_text, review_hash)
+                                       VALUES (?,?,?,?,?,?,?)
+                                       """, [row + (uuid.uuid4().hex, ) for row in source])
+            counts["commits"] += 1
+            counts["rows"] += len(source)
+    finally:
+        connection.close()
+
+def main():
+    """
+    Run the query mix concurrently while a loader writes and print the latency summary.
+    """
+    parser = argparse.ArgumentParser(description = "Benchmark concurrent reads with ReadQueryService.")
+    parser.add_argument("db_file", help = "The database to copy and benchmark.")
+    parser.add_argument("--workers", type = int, default = 4, help = "Worker threads and read connections.")
+    parser.add_argument("--rounds", type = int, default = 25, help = "Times the query mix is submitted.")
+    parser.add_argument("--write-batch", type = int, default = 500, help = "Reviews per writer transaction, 0 for no writer.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_file_path = Path(temp_dir) / Path(args.db_file).name
+        shutil.copy(args.db_file, db_file_path)
+
+        ResDB = RestaurantReviewDB(db_file_path)
+        with ResDB.read_service(workers = args.workers) as service:
+            stop = threading.Event()
+            counts = {"commits": 0, "rows": 0}
+            writer = threading.Thread(target = write_reviews, args = (db_file_path, stop, args.write_batch, counts))
+            if args.write_batch > 0:
+                writer.start()
+
+            start = time.perf_counter()
+            futures = [service.submit(query, params, label)
+                       for _ in range(args.rounds) for label, query, params in QUERIES]
+            for future in futures:
+                future.result()
+            elapsed = time.perf_counter() - start
+
+            stop.set()
+            if writer.is_alive():
+                writer.join()
+
+            print(f"{len(futures)} queries on {args.workers} workers in {elapsed:.2f} s ({len(futures) / elapsed:.1f} queries/s)")
+            print(f"writer: {counts['commits']} commits, {counts['rows']} reviews inserted meanwhile")
+            print(service.get_latency_summary().round(2).to_string(index = False))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+"""
+Review Aggregator
+
+Synthetic Data Generator
+
+This file contains the SyntheticDataGenerator class. It writes raw and curated csv's with the same column layouts
+the scrapers and transformers produce, for a made-up region at any number of restaurants and reviews, so the
+transformers and the database loaders can be exercised at scales beyond the Portland, ME fixtures. The curated files
+match what the transformers output for the generated raw files.
+
+Usage (from the repository root):
+    python benchmarks/synthetic_data_generator.py /tmp/synthetic --restaurants 2400 --reviews 96000
+"""
+###################################################################################################################
+# libraries
+import argparse
+import csv
+import json
+import random
+import datetime
+from pathlib import Path
+
+###################################################################################################################
+# vocabulary
+ADJECTIVES = ["salty", "golden", "rustic", "little", "hungry", "blue", "old", "green", "crooked", "silver", "smoky",
+              "wild", "happy", "iron", "copper", "sunny", "quiet", "lucky", "brass", "velvet"]
+NOUNS = ["oyster", "lobster", "harbor", "lantern", "anchor", "kettle", "fig", "pine", "wharf", "goat", "tavern",
+         "noodle", "taco", "olive", "bean", "dumpling", "gull", "compass", "barrel", "hearth"]
+SUFFIXES = ["grill", "kitchen", "bistro", "cafe", "bar", "eatery", "house", "canteen", "diner", "pub"]
+CUISINES = ["Seafood", "Mexican", "Contemporary American", "Farm-to-table", "Oyster Bar", "Italian", "Japanese",
+            "Thai", "French", "Steakhouse"]
+YELP_TAGS = ["Seafood", "New American", "Mediterranean", "Gastropubs", "Wine Bars", "Cocktail Bars", "Pizza",
+             "Sushi Bars", "Breakfast & Brunch", "Burgers", "Cafes", "Tacos", "Ramen", "Bakeries", "Vegan"]
+OPEN_TABLE_TAGS = ["Good for special occasions", "Neighborhood gem", "Charming", "Lively", "Hot spot", "Romantic",
+                   "Great for outdoor dining", "Good for groups", "Casual", "Innovative"]
+OPEN_TABLE_PRICES = {"$30 and under": (0, 30), "$31 to $50": (31, 50), "$50 and over": (50, 200)}
+WORDS = ["the", "food", "was", "great", "service", "friendly", "we", "had", "lobster", "roll", "oysters", "fresh",
+         "wait", "time", "long", "table", "drinks", "cocktails", "dessert", "amazing", "bit", "pricey", "would",
+         "come", "back", "cozy", "spot", "loud", "staff", "attentive", "portions", "small", "delicious", "view",
+         "harbor", "brunch", "coffee", "fries", "perfect", "night", "out", "and", "a", "but", "not", "very"]
+FIRST_NAMES = ["Sam", "Alex", "Jordan", "Taylor", "Casey", "Riley", "Morgan", "Jamie", "Avery", "Quinn", "Drew",
+               "Kim", "Lee", "Pat", "Robin", "Sky", "Dana", "Jesse", "Kai", "Noa"]
+
+# (raw Yelp hometown, curated city, curated state, curated country), following YelpReviewDataTransformer
+YELP_HOMETOWNS = [("Boston, MA", "Boston", "MA", "US"), ("Portland, ME", "Portland", "ME", "US"),
+                  ("New York, NY", "New York", "NY", "US"), ("San Francisco, CA", "San Francisco", "CA", "US"),
+                  ("Chicago, IL", "Chicago", "IL", "US"), ("Washington, DC", "Washington DC", "", ""),
+                  ("Toronto, Canada", "Toronto", "", "Canada"), ("London, United Kingdom", "London", "", "United Kingdom")]
+
+# (raw OpenTable hometown, curated city), following OpenTableReviewDataTransformer
+OPEN_TABLE_HOMETOWNS = [("Greater Boston", "Boston"), ("New York City", "New York City"), ("Maine", "Maine"),
+                        ("San Francisco", "San Francisco"), ("Chicago", "Chicago"), ("Washington DC", "Washington DC")]
+
+###################################################################################################################
+# class
+class SyntheticDataGenerator:
+    """
+    Generates raw and curated restaurant and review csv's for one synthetic region.
+
+    Attributes:
+     * home: (Path Object)           - The folder the data/raw and data/curated folders are written to.
+     * restaurants: (int)            - The number of Yelp restaurants.
+     * reviews: (int)                - The total number of reviews across both sites.
+     * city: (str)                   - The region city. Must not contain "_" or spaces, the transformers parse it
+                                       from the file name.
+     * state: (str)                  - The region state, a two letter abbreviation.
+     * extraction_date: (date)       - The date in the file names; relative OpenTable dates count back from it.
+     * open_table_share: (float)     - The share of restaurants also listed on OpenTable.
+     * open_table_review_share: (float) - The share of reviews that are OpenTable reviews.
+     * mismatch_share: (float)       - The share of OpenTable restaurants whose extracted name does not match, which
+                                       the OpenTable transformers drop.
+     * random: (random.Random)       - The seeded random number generator.
+     * file_names: (dict)            - Maps each data set to its (raw, curated) file names once generated.
+     * dropped_restaurants: (list)   - The cleaned names of the mismatched OpenTable restaurants.
+
+    Methods:
+     * generate
+     * get_file_names
+     * clean_name
+     * build_restaurants
+     * write_restaurant_files
+     * write_review_files
+    """
+
+    def __init__(self, home:Path, restaurants:int = 240, reviews:int = 9600, city:str = "Synthville", state:str = "ME",
+                 extraction_date:str = "2024-07-21", open_table_share:float = 0.1, open_table_review_share:float = 0.2,
+                 mismatch_share:float = 0.05, seed:int = 0) -> None:
+        """
+        Initializer for SyntheticDataGenerator. See the class attributes for the parameters.
+        """
+        self.home = Path(home)
+        self.restaurants = restaurants
+        self.reviews = reviews
+        self.city = city
+        self.state = state
+        self.extraction_date = datetime.datetime.strptime(extraction_date, "%Y-%m-%d").date()
+        self.open_table_share = open_table_share
+        self.open_table_review_share = open_table_review_share
+        self.mismatch_share = mismatch_share
+        self.random = random.Random(seed)
+        self.file_names = self.get_file_names()
+        self.dropped_restaurants = []
+        self.restaurant_list = None
+
+    def get_file_names(self) -> dict:
+        """
+        Returns the raw and curated file names, following the scraper and transformer naming.
+
+        Returns:
+         * file_names: (dict) - Maps "yelp_restaurant", "yelp_review", "open_table_restaurant" and "open_table_review"
+                                to a (raw, curated) tuple of file names.
+        """
+        stem = f"{self.city}_{self.state}_{self.extraction_date.isoformat()}"
+        return {"yelp_restaurant": (f"yelp_restaurant_data_{stem}.csv", f"yelp_restaurant_data_{stem}_CURATED.csv"),
+                "yelp_review": (f"yelp_review_data_{stem}.csv", f"yelp_review_data_{stem}.csv_CURATED.csv"),
+                "open_table_restaurant": (f"open_table_restaurant_data_{stem}.csv", f"open_table_restaurant_data_{stem}.csv_CURATED.csv"),
+                "open_table_review": (f"open_table_review_data_{stem}.csv", f"open_table_review_data_{stem}.csv_CURATED.csv")}
+
+    def clean_name(self, name:str) -> str:
+        """
+        Cleans a restaurant name the way the transformers do: "&" to "and", a leading "the" removed, lower case.
+        """
+        name = name.replace("&amp;", "and").replace("&", "and")
+        if name.lower().startswith("the "):
+            name = name[4:].lstrip()
+        return name.lower()
+
+    def build_restaurants(self) -> list:
+        """
+        Builds the restaurant list. Every restaurant is on Yelp; a share is also on OpenTable.
+
+        Returns:
+         * restaurant_list: (list) - One dict per restaurant.
+        """
+        restaurant_list = []
+        for index in range(self.restaurants):
+            name = f"{self.random.choice(ADJECTIVES).title()} {self.random.choice(NOUNS).title()} " \
+                   f"{self.random.choice(['&', 'and'])} {self.random.choice(SUFFIXES).title()} {index}"
+            if self.random.random() < 0.2:
+                name = "The " + name
+            on_open_table = self.random.random() < self.open_table_share
+            restaurant_list.append({"name": name,
+                                    "clean_name": self.clean_name(name),
+                                    "price_point": self.random.choice([None, "$", "$$", "$$$", "$$$$"]),
+                                    "yelp_tags": self.random.sample(YELP_TAGS, self.random.randint(0, 3)),
+                                    "on_open_table": on_open_table,
+                                    "mismatch": on_open_table and self.random.random() < self.mismatch_share,
+                                    "open_table_price": self.random.choice(list(OPEN_TABLE_PRICES)),
+                                    "cuisine": self.random.choice(CUISINES),
+                                    "open_table_tags": self.random.sample(OPEN_TABLE_TAGS, self.random.randint(1, 3))})
+        # there must be at least one OpenTable restaurant for the OpenTable files
+        if restaurant_list and not any(restaurant["on_open_table"] for restaurant in restaurant_list):
+            restaurant_list[0]["on_open_table"] = True
+        self.dropped_restaurants = [restaurant["clean_name"] for restaurant in restaurant_list if restaurant["mismatch"]]
+        return restaurant_list
+
+    def write_restaurant_files(self) -> None:
+        """
+        Writes the raw and curated Yelp and OpenTable restaurant csv's.
+        """
+        raw_folder = self.home / "data" / "raw"
+        curated_folder = self.home / "data" / "curated"
+        region = f"{self.city}, {self.state}"
+
+        yelp_raw, yelp_curated = self.file_names["yelp_restaurant"]
+        with open(raw_folder / yelp_raw, "w", newline = "") as raw_file, open(curated_folder / yelp_curated, "w", newline = "") as curated_file:
+            raw_writer, curated_writer = csv.writer(raw_file), csv.writer(curated_file)
+            raw_writer.writerow(["", "name", "price_point", "tags"])
+            curated_writer.writerow(["", "restaurant_name", "city", "state", "price_point", "tags"])
+            for index, restaurant in enumerate(self.restaurant_list):
+                tags = restaurant["yelp_tags"]
+                raw_writer.writerow([index, restaurant["name"], restaurant["price_point"] or "", repr(tags)])
+                curated_writer.writerow([index, restaurant["clean_name"], self.city, self.state,
+                                         f"{float(len(restaurant['price_point']))}" if restaurant["price_point"] else "",
+                                         json.dumps(tags) if tags else ""])
+
+        open_table_raw, open_table_curated = self.file_names["open_table_restaurant"]
+        with open(raw_folder / open_table_raw, "w", newline = "") as raw_file, open(curated_folder / open_table_curated, "w", newline = "") as curated_file:
+            raw_writer, curated_writer = csv.writer(raw_file), csv.writer(curated_file)
+            raw_writer.writerow(["", "price_point", "cuisine", "description", "tags", "region",
+                                 "restaurant_name_extracted", "restaurant_name_input"])
+            curated_writer.writerow(["", "restaurant_name", "city", "state", "cuisine", "description", "min_price", "max_price", "tags"])
+            open_table_restaurants = [restaurant for restaurant in self.restaurant_list if restaurant["on_open_table"]]
+            for index, restaurant in enumerate(open_table_restaurants):
+                description = " ".join(self.random.choices(WORDS, k = 40)).capitalize() + "."
+                extracted = f"Unrelated Place {index}" if restaurant["mismatch"] else restaurant["name"]
+                tags = restaurant["open_table_tags"]
+                raw_writer.writerow([index, restaurant["open_table_price"], restaurant["cuisine"], description, repr(tags),
+                                     region, extracted, restaurant["name"]])
+                if not restaurant["mismatch"]:
+                    min_price, max_price = OPEN_TABLE_PRICES[restaurant["open_table_price"]]
+                    curated_writer.writerow([index, restaurant["clean_name"], self.city, f" {self.state}", restaurant["cuisine"],
+                                             description, min_price, max_price, json.dumps(tags)])
+        return self
+
+    def write_review_files(self, chunk_size:int = 10000) -> None:
+        """
+        Writes the raw and curated Yelp and OpenTable review csv's, streaming rows in chunks so memory does not grow
+        with the review count.
+
+        Params:
+         * chunk_size: (int) - The number of rows buffered per write. Default 10000.
+        """
+        raw_folder = self.home / "data" / "raw"
+        curated_folder = self.home / "data" / "curated"
+        open_table_restaurants = [restaurant for restaurant in self.restaurant_list if restaurant["on_open_table"]]
+        yelp_reviewers = [(f"{self.random.choice(FIRST_NAMES)} {chr(65 + index % 26)}.", self.random.choice(YELP_HOMETOWNS))
+                          for index in range(max(10, self.reviews // 4))]
+        open_table_reviewers = [(f"{self.random.choice(FIRST_NAMES)}{index}", self.random.choice(OPEN_TABLE_HOMETOWNS))
+                                for index in range(max(10, self.reviews // 4))]
+
+        yelp_raw, yelp_curated = self.file_names["yelp_review"]
+        open_table_raw, open_table_curated = self.file_names["open_table_review"]
+        with open(raw_folder / yelp_raw, "w", newline = "") as yelp_raw_file, \
+             open(curated_folder / yelp_curated, "w", newline = "") as yelp_curated_file, \
+             open(raw_folder / open_table_raw, "w", newline = "") as open_table_raw_file, \
+             open(curated_folder / open_table_curated, "w", newline = "") as open_table_curated_file:
+            writers = {"yelp_raw": csv.writer(yelp_raw_file), "yelp_curated": csv.writer(yelp_curated_file),
+                       "open_table_raw": csv.writer(open_table_raw_file), "open_table_curated": csv.writer(open_table_curated_file)}
+            writers["yelp_raw"].writerow(["", "restaurant", "reviewer_name", "datelike", "hometown", "rating", "text", "origins"])
+            writers["yelp_curated"].writerow(["", "restaurant_name", "datelike", "reviewer_name", "city", "state", "country",
+                                              "rating", "review_text", "origins"])
+            writers["open_table_raw"].writerow(["", "Overall", "Food", "Service", "Ambience", "review_text", "hometown", "datelike",
+                                                "restaurant_name_extracted", "restaurant_name_input", "res_name", "origins"])
+            writers["open_table_curated"].writerow(["", "restaurant_name", "datelike", "reviewer_name", "city", "overall", "food",
+                                                    "service", "ambience", "review_text", "origins"])
+
+            buffers = {name: [] for name in writers}
+            counts = {"yelp": 0, "open_table": 0}
+            for _ in range(self.reviews):
+                text = " ".join(self.random.choices(WORDS, k = self.random.randint(8, 60))).capitalize() + "."
+                review_date = self.extraction_date - datetime.timedelta(days = self.random.randint(0, 3000))
+
+                if open_table_restaurants and self.random.random() < self.open_table_review_share:
+                    restaurant = self.random.choice(open_table_restaurants)
+                    reviewer, (hometown, city) = self.random.choice(open_table_reviewers)
+                    ratings = [self.random.randint(1, 5) for _ in range(4)]
+                    days_ago = (self.extraction_date - review_date).days
+                    if days_ago == 0:
+                        datelike = "Dined today"
+                    elif days_ago < 7:
+                        datelike = f"Dined {days_ago} day{'s' if days_ago > 1 else ''} ago"
+                    else:
+                        datelike = f"Dined on {review_date.strftime('%B')} {review_date.day}, {review_date.year}"
+                    index = counts["open_table"]
+                    buffers["open_table_raw"].append([index] + ratings + [text, hometown, datelike, reviewer, restaurant["name"],
+                                                                          restaurant["clean_name"].title(), "open_table"])
+                    if not restaurant["mismatch"]:
+                        buffers["open_table_curated"].append([index, restaurant["clean_name"], review_date.isoformat(), reviewer,
+                                                              city] + ratings + [text, "open_table"])
+                    counts["open_table"] += 1
+                else:
+                    restaurant = self.random.choice(self.restaurant_list)
+                    reviewer, (hometown, city, state, country) = self.random.choice(yelp_reviewers)
+                    rating = self.random.randint(1, 5)
+                    datelike = f"{review_date.strftime('%b')} {review_date.day}, {review_date.year}"
+                    index = counts["yelp"]
+                    buffers["yelp_raw"].append([index, restaurant["name"], reviewer, datelike, hometown,
+                                                f"{rating} star rating", text, "Yelp"])
+                    buffers["yelp_curated"].append([index, restaurant["clean_name"], review_date.isoformat(), reviewer,
+                                                    city, state, country, rating, text, "Yelp"])
+                    counts["yelp"] += 1
+
+                if len(buffers["yelp_raw"]) + len(buffers["open_table_raw"]) >= chunk_size:
+                    for name, rows in buffers.items():
+                        writers[name].writerows(rows)
+                        rows.clear()
+
+            for name, rows in buffers.items():
+                writers[name].writerows(rows)
+        return self
+
+    def generate(self) -> None:
+        """
+        Writes all eight csv's to home/data/raw and home/data/curated.
+        """
+        (self.home / "data" / "raw").mkdir(parents = True, exist_ok = True)
+        (self.home / "data" / "curated").mkdir(parents = True, exist_ok = True)
+        self.restaurant_list = self.build_restaurants()
+        self.write_restaurant_files()
+        self.write_review_files()
+        return self
+
+###################################################################################################################
+# main
+def main():
+    """
+    Generate a synthetic region from the command line.
+    """
+    parser = argparse.ArgumentParser(description = "Generate synthetic raw and curated review data.")
+    parser.add_argument("home", help = "The folder data/raw and data/curated are written to.")
+    parser.add_argument("--restaurants", type = int, default = 240)
+    parser.add_argument("--reviews", type = int, default = 9600)
+    parser.add_argument("--city", default = "Synthville")
+    parser.add_argument("--seed", type = int, default = 0)
+    args = parser.parse_args()
+
+    generator = SyntheticDataGenerator(args.home, restaurants = args.restaurants, reviews = args.reviews,
+                                       city = args.city, seed = args.seed).generate()
+    for raw, curated in generator.file_names.values():
+        print(f"data/raw/{raw}\n\tdata/curated/{curated}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Review Aggregator
+
+Tag Parsing Benchmark
+
+This file contains a micro-benchmark of the curated tag encodings. The tags in the curated restaurant csv's are parsed
+once per row by each loader; this compares the per row cost of the legacy Python list literals, parsed with
+ast.literal_eval, against the JSON arrays, parsed with json.loads through RestaurantReviewDB.parse_tags. The curated
+csv's may hold either encoding, so their tags are decoded to lists and both encodings are generated from the lists:
+repr for the legacy literals and json.dumps for the JSON arrays.
+
+Usage (from the repository root):
+    python benchmarks/tag_parsing_benchmark.py
+"""
+###################################################################################################################
+# libraries
+import sys
+import os
+import ast
+import csv
+import json
+import timeit
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'db_manager')))
+from database_manager_class import RestaurantReviewDB
+from data_transformers.transformer_classes.curated_format import decode_tags
+
+###################################################################################################################
+# main
+def read_tag_lists(csv_files:list) -> list:
+    """
+    Reads the non-empty tag strings from the curated restaurant csv's and decodes them, whichever their encoding.
+
+    Parameters:
+    - csv_files: (list) - Paths to the curated restaurant csv's.
+
+    Returns:
+    - tags: (list) - The tag lists.
+    """
+    tags = []
+    for csv_file in csv_files:
+        with open(csv_file, "r") as file:
+            reader = csv.reader(file)
+            next(reader)
+            tags.extend(decode_tags(row[-1]) for row in reader if row[-1])
+    return tags
+
+def time_per_row(parser, tags:list, repeat:int) -> float:
+    """
+    Returns the best per row parse time in microseconds over the repeats.
+    """
+    best = min(timeit.repeat(lambda: [parser(tag) for tag in tags], number = 1, repeat = repeat))
+    return best / len(tags) * 1e6
+
+def main():
+    """
+    Parse the curated tags in both encodings and print the per row cost.
+    """
+    CURATED = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data', 'curated'))
+    csv_files = [os.path.join(CURATED, "open_table_restaurant_data_Portland_ME_2024-07-21.csv_CURATED.csv"),
+                 os.path.join(CURATED, "yelp_restaurant_data_Portland_ME_2024-06-29_CURATED.csv")]
+
+    # repeat the rows so the timings are not dominated by timer resolution
+    tag_lists = read_tag_lists(csv_files) * 50
+    legacy_tags = [repr(tags) for tags in tag_lists]
+    json_tags = [json.dumps(tags, ensure_ascii = False) for tags in tag_lists]
+
+    ResDB = RestaurantReviewDB("benchmark.db")
+    parse_tags = lambda tags: ResDB.parse_tags(tags, "", "benchmark")
+    assert [parse_tags(tags) for tags in legacy_tags] == tag_lists
+    assert [parse_tags(tags) for tags in json_tags] == tag_lists
+
+    results = {"legacy, ast.literal_eval":   time_per_row(ast.literal_eval, legacy_tags, 5),
+               "legacy, parse_tags":         time_per_row(parse_tags, legacy_tags, 5),
+               "json, json.loads":           time_per_row(json.loads, json_tags, 5),
+               "json, parse_tags":           time_per_row(parse_tags, json_tags, 5)}
+
+    print(f"{len(legacy_tags)} tag rows")
+    baseline = results["legacy, ast.literal_eval"]
+    for name, micro_seconds in results.items():
+        print(f"{name:<28} {micro_seconds:8.2f} us/row  {baseline / micro_seconds:6.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""
+Review Aggregator
+
+Curated Format
+
+This file contains the CuratedWriter class, which writes the curated data of a transformer to data/curated/ as a csv,
+or as a typed columnar file: Parquet or Feather (Arrow IPC). The typed formats keep the column types the transformers
+produce, dates as timestamps, ratings and prices as integers and tags as lists of strings, so the database loader reads
+them back without reparsing strings. They require pyarrow, which is only imported when a typed format is written.
+
+Each transformer lists the type of every curated column in CURATED_COLUMN_TYPES, e.g.,
+{"restaurant_name": "string", "datelike": "datetime", "rating": "int", "tags": "list"}. The types are fixed rather than
+inferred, so every chunk written in streaming mode has the same schema, even a chunk whose column is entirely missing.
+
+In a csv the "list" columns are written as JSON arrays with encode_tags. decode_tags, shared by the restaurant
+transformers and the typed formats, decodes the tag strings of the raw and curated csv's.
+"""
+###################################################################################################################
+# libraries
+import ast
+import json
+from pathlib import Path
+import pandas as pd
+
+###################################################################################################################
+# formats
+# curated file format --> file suffix
+CURATED_FORMATS = {"csv": ".csv",
+                   "parquet": ".parquet",
+                   "feather": ".feather"}
+
+def get_curated_suffix(file_format:str) -> str:
+    """
+    Returns the file suffix of a curated file format, e.g., ".parquet".
+
+    Params:
+     * file_format: (str) - "csv", "parquet" or "feather".
+    """
+    if file_format not in CURATED_FORMATS:
+        raise ValueError(f"file_format must be one of {list(CURATED_FORMATS)}, got {file_format}")
+    return CURATED_FORMATS[file_format]
+
+def encode_tags(tags:list) -> str:
+    """
+    Encodes a list of tags as a JSON array, the curated csv tag format, so the database loader can parse it with
+    json.loads instead of ast.literal_eval. Anything but a list, e.g., None, is written as an empty cell.
+
+    Params:
+     * tags: (list) - The tags.
+
+    Returns:
+     * tags: (str) - The JSON array, e.g., '["Seafood", "Bars"]', or None.
+    """
+    return json.dumps(tags, ensure_ascii = False) if isinstance(tags, list) else None
+
+def decode_tags(tags:str) -> list:
+    """
+    Converts an encoded tags string to a list. Curated csv's hold JSON arrays, decoded with json.loads. The scrapers
+    write Python list literals, which fall back to ast.literal_eval; these are not always distinguishable from JSON by
+    their first characters, e.g., ["Chef's Table", 'Bar'].
+
+    Params:
+     * tags: (str) - The encoded tags, e.g., '["Seafood", "Bars"]' or "['Seafood', 'Bars']".
+
+    Returns:
+     * tags: (list) - The decoded tags.
+    """
+    try:
+        return json.loads(tags)
+    except json.JSONDecodeError:
+        return ast.literal_eval(tags)
+
+def decode_list(value):
+    """
+    Returns a tag list. Encoded lists are decoded with decode_tags; missing values and empty lists are None.
+    """
+    if isinstance(value, str):
+        value = decode_tags(value)
+    if isinstance(value, list) and value:
+        return [str(item) for item in value]
+    return None
+
+def to_typed_frame(data:pd.DataFrame, column_types:dict) -> pd.DataFrame:
+    """
+    Casts the curated columns to their types, in the order of column_types. The index is kept as the first column,
+    "index", as it is in the curated csv.
+
+    Params:
+     * data: (DataFrame)      - The transformed data.
+     * column_types: (dict)   - Maps column name to "string", "datetime", "int", "float" or "list".
+
+    Returns:
+     * typed_data: (DataFrame)
+    """
+    typed_data = pd.DataFrame({"index": data.index.to_numpy()})
+    for column, column_type in column_types.items():
+        values = data[column].reset_index(drop = True)
+        if column_type == "string":
+            typed_data[column] = values.astype("string")
+        elif column_type == "datetime":
+            typed_data[column] = pd.to_datetime(values).astype("datetime64[us]")
+        elif column_type == "int":
+            typed_data[column] = pd.to_numeric(values).astype("Int64")
+        elif column_type == "float":
+            typed_data[column] = pd.to_numeric(values).astype(float)
+        elif column_type == "list":
+            typed_data[column] = values.apply(decode_list).astype(object)
+        else:
+            raise ValueError(f"Unknown type {column_type} for column {column}")
+    return typed_data
+
+def get_arrow_schema(column_types:dict):
+    """
+    Returns the Arrow schema of a typed curated file: the index as int64 followed by the curated columns.
+
+    Params:
+     * column_types: (dict) - Maps column name to "string", "datetime", "int", "float" or "list".
+
+    Returns:
+     * schema: (pyarrow.Schema)
+    """
+    import pyarrow as pa
+    arrow_types = {"string": pa.string(),
+                   "datetime": pa.timestamp("us"),
+                   "int": pa.int64(),
+                   "float": pa.float64(),
+                   "list": pa.list_(pa.string())}
+    return pa.schema([("index", pa.int64())] + [(column, arrow_types[column_type]) for column, column_type in column_types.items()])
+
+###################################################################################################################
+# class
+class CuratedWriter:
+    """
+    Writes a curated file one or more frames at a time. A csv is written with to_csv, appending every frame after the
+    first, with the "list" columns encoded as JSON arrays by encode_tags. Parquet and Feather files are written with
+    one row group (record batch) per frame and are only complete once close is called.
+
+    Attributes:
+     * path: (Path Object)   - The curated file.
+     * file_format: (str)    - "csv", "parquet" or "feather".
+     * column_types: (dict)  - The type of every curated column, see to_typed_frame.
+     * append: (bool)        - If True, the first frame is appended to an existing curated csv.
+     * writer: (object)      - The open pyarrow writer of a typed format, None until the first frame is written.
+     * rows_written: (int)   - The number of rows written.
+
+    Methods:
+     * write
+     * close
+    """
+
+    def __init__(self, path:Path, file_format:str = "csv", column_types:dict = None, append:bool = False) -> None:
+        """
+        Initializer for CuratedWriter.
+
+        Params:
+         * path: (Path)          - The curated file.
+         * file_format: (str)    - "csv", "parquet" or "feather". Default "csv".
+         * column_types: (dict)  - The type of every curated column. Required for the typed formats.
+         * append: (bool)        - If True, append to an existing curated csv. The typed formats cannot be appended
+                                   to once closed. Default False.
+        """
+        get_curated_suffix(file_format)
+        if file_format != "csv" and append:
+            raise ValueError(f"Cannot append to a closed {file_format} file, keep the writer open instead")
+        if file_format != "csv" and not column_types:
+            raise ValueError(f"file_format = '{file_format}' requires the column types")
+        self.path = Path(path)
+        self.file_format = file_format
+        self.column_types = column_types
+        self.append = append
+        self.writer = None
+        self.rows_written = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def write(self, data:pd.DataFrame) -> None:
+        """
+        Writes a frame to the curated file.
+
+        Params:
+         * data: (DataFrame) - The transformed data, with the curated columns. The "list" columns hold lists.
+        """
+        if self.file_format == "csv":
+            append = self.append or self.rows_written > 0
+            list_columns = [column for column, column_type in (self.column_types or {}).items() if column_type == "list"]
+            data = data.assign(**{column: data[column].apply(encode_tags) for column in list_columns})
+            data.to_csv(str(self.path), mode = "a" if append else "w", header = not append)
+        else:
+            try:
+                import pyarrow as pa
+            except ImportError as e:
+                raise ImportError(f"file_format = '{self.file_format}' requires the pyarrow package") from e
+            schema = get_arrow_schema(self.column_types)
+            table = pa.Table.from_pandas(to_typed_frame(data, self.column_types), schema = schema, preserve_index = False)
+            if self.writer is None:
+                if self.file_format == "parquet":
+                    import pyarrow.parquet as pq
+                    self.writer = pq.ParquetWriter(str(self.path), schema)
+                else:
+                    self.writer = pa.ipc.new_file(str(self.path), schema)
+            self.writer.write_table(table)
+        self.rows_written += len(data)
+        return None
+
+    def close(self) -> None:
+        """
+        Finishes the curated file. A typed file to which nothing was written is written empty, with its schema.
+        """
+        if self.file_format != "csv" and self.writer is None:
+            self.write(pd.DataFrame({column: [] for column in self.column_types}))
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+        return None
+
+#################################################################################################################################
+# End
+#################################################################################################################################
+if __name__ == "__main__":
+    pass
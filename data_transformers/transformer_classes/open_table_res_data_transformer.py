@@ -12,6 +12,9 @@ data from the OpenTable website to a form that is ready to be loaded in the rest
 # libraries
 import pandas as pd  
 from pathlib import Path
+from instrumentation.stage_recorder import timed_stage, length_of, report_rows
+from data_transformers.transformer_classes.transform_manifest import get_manifest
+from data_transformers.transformer_classes.curated_format import CuratedWriter, get_curated_suffix, decode_tags
 import re
 import ast
 
@@ -22,15 +25,37 @@ class OpenTableResDataTransformer:
     Class for transforming raw extracted OpenTable data to curated data ready to be entered into the 
     restaurant_review_database.
     """
-    def __init__(self) -> None:
+    # bump when a change alters the curated csv, so the transform manifest reruns files curated by older versions
+    TRANSFORMER_VERSION = 1
+
+    # the type of every curated column in a typed (parquet, feather) curated file
+    CURATED_COLUMN_TYPES = {"restaurant_name": "string",
+                            "city": "string",
+                            "state": "string",
+                            "cuisine": "string",
+                            "description": "string",
+                            "min_price": "int",
+                            "max_price": "int",
+                            "tags": "list"}
+
+    def __init__(self, file_format:str = "csv") -> None:
         """
         Initializes the data transformer object. 
+
+        Parameters:
+        - file_format: (str) - The curated file format: "csv", or the typed formats "parquet" and "feather", which
+                               require pyarrow. Default "csv".
         """
+        get_curated_suffix(file_format)
         self.HOME = Path.cwd()
         self.raw_data = None
         self.file_name = None
+        self.file_format = file_format
+        self.curated_writer = None # open while execute_streaming writes chunks
         self.drop_list = None # restaurant removed from data
         self.restaurants_to_inspect_list = None # restaurants that require further validation
+        self.skipped = False # True if execute found the curated csv up to date
+        self.manifest = None
 
     def set_file_name(self, file_name:str) -> None:
         """
@@ -39,6 +64,49 @@ class OpenTableResDataTransformer:
         self.file_name = file_name
         return None
 
+    def get_raw_path(self) -> Path:
+        """
+        Returns the path of the raw csv.
+        """
+        return self.HOME / "data" / "raw" / self.file_name
+
+    def get_curated_path(self) -> Path:
+        """
+        Returns the path of the curated file, e.g., data/curated/open_table_restaurant_data_Portland_ME_2024-07-21.csv_CURATED.csv.
+        """
+        return self.HOME / "data" / "curated" / f"{self.file_name}_CURATED{get_curated_suffix(self.file_format)}"
+
+    def begin_transformation(self, file_name:str, skip_if_unchanged:bool = True) -> bool:
+        """
+        Sets the file name and checks the transform manifest. If the curated csv is up to date, drop_list and
+        restaurants_to_inspect_list are restored from the manifest, since OpenTableReviewDataTransformer needs them.
+
+        Parameters:
+        - file_name: (str) - The file name of the OpenTable restaurant raw data.
+        - skip_if_unchanged: (bool) - If False, the manifest is not consulted. Default True.
+
+        Returns:
+        - skip: (bool) - True if the curated csv is up to date with the raw file and this TRANSFORMER_VERSION.
+        """
+        self.set_file_name(file_name)
+        self.manifest = get_manifest(self.HOME)
+        self.skipped = skip_if_unchanged and self.manifest.is_transformer_up_to_date(self)
+        if self.skipped:
+            outputs = self.manifest.get_entry(file_name, get_curated_suffix(self.file_format))["outputs"]
+            self.drop_list = outputs["drop_list"]
+            self.restaurants_to_inspect_list = pd.Series(outputs["restaurants_to_inspect_list"], dtype = object)
+            print(f"Skipping {file_name}, the curated csv is up to date")
+        return self.skipped
+
+    def record_transformation(self) -> None:
+        """
+        Records the transformation in the transform manifest, with the restaurants dropped and to inspect.
+        """
+        self.manifest.record_transformer(self, outputs = {"drop_list": list(self.drop_list),
+                                                          "restaurants_to_inspect_list": list(self.restaurants_to_inspect_list)})
+        return None
+
+    @timed_stage("transform.open_table_restaurant", rows = length_of("raw_data"))
     def set_data(self) -> None:
         """
         Retrieves the raw data from the csv file.
@@ -48,6 +116,7 @@ class OpenTableResDataTransformer:
         self.raw_data = pd.read_csv(PATH_TO_OPENTABLE_DATA)
         return None
     
+    @timed_stage("transform.open_table_restaurant", rows = length_of("raw_data"))
     def clean_restaurant_name_columns(self, columns:list) -> None:
         """
         Cleans the two name columns, "restaurant_name_input" and "restaurant_name_extracted", preparing them to be
@@ -105,6 +174,7 @@ class OpenTableResDataTransformer:
         """
         return (row["restaurant_name_extracted"] in row["restaurant_name_input"]) or (row["restaurant_name_input"] in row["restaurant_name_extracted"])
     
+    @timed_stage("transform.open_table_restaurant", rows = length_of("raw_data"))
     def remove_inadvertent_extractions(self) -> None:   
         """
         Removes restaurants that were scraped inadvertently, i.e., the OpenTable search returned the incorrect restaurant. This validation uses name
@@ -120,8 +190,9 @@ class OpenTableResDataTransformer:
         # filter the dataframe for restaurant names that do not match
         non_matching_res_name_df = self.get_non_matching_restaurant_name()
 
-        # create a boolean column, indicating a partial match
-        non_matching_res_name_df["partial_match"] = non_matching_res_name_df.apply(lambda row: self.check_for_substring(row), axis = 1)
+        # create a boolean column, indicating a partial match; reduce keeps it a column when every name matches
+        non_matching_res_name_df["partial_match"] = non_matching_res_name_df.apply(lambda row: self.check_for_substring(row), axis = 1,
+                                                                                   result_type = "reduce")
 
         # get indices that are not a complete or partial match; these will dropped
         drop_indices = non_matching_res_name_df[(non_matching_res_name_df["partial_match"] == False)].index.to_list()
@@ -154,6 +225,7 @@ class OpenTableResDataTransformer:
         except (UnicodeEncodeError, UnicodeDecodeError):
             return text
         
+    @timed_stage("transform.open_table_restaurant", rows = length_of("raw_data"))
     def fix_description_encoding(self) -> None:
         """
         Applies encoder_fixer to the elements of raw_data dataframe.
@@ -167,6 +239,7 @@ class OpenTableResDataTransformer:
         self.raw_data["description"] = self.raw_data["description"].apply(self.encoder_fixer)
         return None
 
+    @timed_stage("transform.open_table_restaurant", rows = length_of("raw_data"))
     def seperate_region(self) -> None:
         """
         Seperates "region" into two columns, "city and "state".
@@ -213,6 +286,7 @@ class OpenTableResDataTransformer:
             max = 200
             return min, max
         
+    @timed_stage("transform.open_table_restaurant", rows = length_of("raw_data"))
     def seperate_price_range_cols(self) -> None:
         """
         Seperates the "price_range" column into two columns: min_price, max_price
@@ -229,6 +303,7 @@ class OpenTableResDataTransformer:
         self.raw_data["max_price"] = pd.to_numeric(self.raw_data["max_price"])
         return None
     
+    @timed_stage("transform.open_table_restaurant", rows = length_of("raw_data"))
     def update_tag_cols(self) -> None:
         """
         The tags columns contains strings literals that should be lists. It also contains NaN values.
@@ -237,6 +312,7 @@ class OpenTableResDataTransformer:
         * "[]"                              --> None
         * NaN                               --> None
         * "['string_1', 'string_2', ...]"   --> to list dtype
+        * '["string_1", "string_2", ...]'   --> to list dtype
 
         Parameters:
         - None
@@ -245,8 +321,9 @@ class OpenTableResDataTransformer:
         - None
         """
         self.raw_data["tags"] = self.raw_data["tags"].apply(lambda x: None if (x == "[]") or (pd.isna(x)) else x)
-        self.raw_data["tags"] = self.raw_data["tags"].apply(lambda x: ast.literal_eval(x) if x is not None else x)
+        self.raw_data["tags"] = self.raw_data["tags"].apply(lambda x: decode_tags(x) if isinstance(x, str) else None)
 
+    @timed_stage("transform.open_table_restaurant", rows = length_of("raw_data"))
     def drop_and_reorder_cols(self):
         """
         Drops columns: "restuarant_name_extracted" and "Unnamed: 0", renames "restaurant_name_input" "restaurant_name" and
@@ -264,6 +341,120 @@ class OpenTableResDataTransformer:
         column_order = ["restaurant_name", "city", "state", "cuisine", "description", "min_price", "max_price", "tags"]
         self.raw_data = self.raw_data[column_order]
 
+    @timed_stage("transform.open_table_restaurant", rows = length_of("raw_data"))
+    def save_transformed_data(self, append:bool = False, keep_open:bool = False) -> None:
+        """
+        Saves transformed data to: data/curated/ folder. In a csv the tag lists are written as JSON arrays; the typed
+        formats keep them as lists.
+
+        Parameters:
+        - append: (bool) - If True, append to the curated file, as execute_streaming does for every chunk after the
+                           first. Default False.
+        - keep_open: (bool) - If True, leave the curated file open for the next chunk; close_curated_writer finishes
+                              it. Required to append to a typed format. Default False.
+
+        Returns:
+        - None
+        """
+        if not append:
+            self.close_curated_writer()
+        if self.curated_writer is None:
+            self.curated_writer = CuratedWriter(self.get_curated_path(), self.file_format, self.CURATED_COLUMN_TYPES,
+                                                append = append)
+        self.curated_writer.write(self.raw_data)
+        if not keep_open:
+            self.close_curated_writer()
+        return None
+
+    def close_curated_writer(self) -> None:
+        """
+        Finishes the curated file left open by save_transformed_data.
+        """
+        curated_writer, self.curated_writer = self.curated_writer, None
+        if curated_writer is not None:
+            curated_writer.close()
+        return None
+
+    @timed_stage("transform.open_table_restaurant", rows = length_of("raw_data"))
+    def execute(self, file_name:str, skip_if_unchanged:bool = True) -> None:
+        """
+        Executes entire data transformation, the same steps as the driver, and saves the curated csv. The restaurants
+        dropped are left in drop_list for OpenTableReviewDataTransformer. Skipped if the transform manifest shows the
+        curated csv is up to date.
+
+        Parameters:
+        - file_name: (str) - file name of OpenTable restaurant data.
+        - skip_if_unchanged: (bool) - If False, transform even if the curated csv is up to date. Default True.
+
+        Returns:
+        - None
+        """
+        if self.begin_transformation(file_name, skip_if_unchanged):
+            return None
+        self.set_data()
+        self.clean_restaurant_name_columns(["restaurant_name_extracted", "restaurant_name_input"])
+        self.remove_inadvertent_extractions()
+        self.fix_description_encoding()
+        self.seperate_region()
+        self.seperate_price_range_cols()
+        self.update_tag_cols()
+        self.drop_and_reorder_cols()
+        self.save_transformed_data()
+        self.record_transformation()
+        return None
+
+    @timed_stage("transform.open_table_restaurant")
+    def execute_streaming(self, file_name:str, chunksize:int = 100000, skip_if_unchanged:bool = True) -> None:
+        """
+        Executes entire data transformation in streaming mode. The raw csv is read chunksize rows at a time, each
+        chunk goes through the same steps as the driver and is appended to the curated csv, so memory is bounded by
+        the chunk size instead of the file size. Every raw column is read as text, so a chunk's column types do not
+        depend on which values it happens to contain.
+
+        drop_list and restaurants_to_inspect_list collect the restaurants of every chunk; raw_data only holds the
+        last chunk afterwards. Skipped, like execute, if the curated csv is up to date.
+
+        Parameters:
+        - file_name: (str) - file name of OpenTable restaurant data.
+        - chunksize: (int) - The number of raw rows transformed at a time. Default 100000.
+        - skip_if_unchanged: (bool) - If False, transform even if the curated csv is up to date. Default True.
+
+        Returns:
+        - None
+        """
+        if self.begin_transformation(file_name, skip_if_unchanged):
+            return None
+        drop_list, restaurants_to_inspect = [], []
+        rows_in, rows_out = 0, 0
+        for chunk in pd.read_csv(self.get_raw_path(), chunksize = chunksize, dtype = str):
+            self.raw_data = chunk
+            rows_in += len(chunk)
+            self.clean_restaurant_name_columns(["restaurant_name_extracted", "restaurant_name_input"])
+            self.remove_inadvertent_extractions()
+            drop_list.extend(self.drop_list)
+            restaurants_to_inspect.append(self.restaurants_to_inspect_list)
+
+            # every row of the chunk was dropped
+            if self.raw_data.empty:
+                continue
+            self.fix_description_encoding()
+            self.seperate_region()
+            self.seperate_price_range_cols()
+            self.update_tag_cols()
+            self.drop_and_reorder_cols()
+            self.save_transformed_data(append = rows_out > 0, keep_open = True)
+            rows_out += len(self.raw_data)
+
+        self.close_curated_writer()
+        self.drop_list = drop_list
+        self.restaurants_to_inspect_list = pd.concat(restaurants_to_inspect) if restaurants_to_inspect else pd.Series()
+        if rows_out == 0:
+            print(f"No rows left to save from {self.file_name}")
+        else:
+            self.record_transformation()
+        report_rows(rows_in, rows_out)
+        return None
+
     def generate_summary(self):
         """ 
         Prints a summery of the transformation process: restaurants dropped, restaurants to inspect, and 
@@ -15,6 +15,9 @@ import pandas as pd
 import numpy as np  
 from datetime import date, datetime, timedelta 
 from pathlib import Path
+from instrumentation.stage_recorder import timed_stage, length_of, report_rows
+from data_transformers.transformer_classes.transform_manifest import get_manifest
+from data_transformers.transformer_classes.curated_format import CuratedWriter, get_curated_suffix
 import re
 import datetime
 
@@ -26,14 +29,38 @@ class OpenTableReviewDataTransformer:
     Class for transforming raw extracted OpenTable review data to curated data ready to be entered into the 
     restaurant_review_database.
     """
-    def __init__(self) -> None:
+    # bump when a change alters the curated csv, so the transform manifest reruns files curated by older versions
+    TRANSFORMER_VERSION = 1
+
+    # the type of every curated column in a typed (parquet, feather) curated file
+    CURATED_COLUMN_TYPES = {"restaurant_name": "string",
+                            "datelike": "datetime",
+                            "reviewer_name": "string",
+                            "city": "string",
+                            "overall": "int",
+                            "food": "int",
+                            "service": "int",
+                            "ambience": "int",
+                            "review_text": "string",
+                            "origins": "string"}
+
+    def __init__(self, file_format:str = "csv") -> None:
         """
         Initializes the data transformer object. 
+
+        Parameters:
+        - file_format: (str) - The curated file format: "csv", or the typed formats "parquet" and "feather", which
+                               require pyarrow. Default "csv".
         """
+        get_curated_suffix(file_format)
         self.HOME = Path.cwd()
         self.raw_data = None
         self.file_name = None
+        self.file_format = file_format
+        self.curated_writer = None # open while execute_streaming writes chunks
         self.restaurants_to_drop_list = None
+        self.skipped = False # True if execute found the curated csv up to date
+        self.manifest = None
 
     def set_file_name(self, file_name:str) -> None:
         """
@@ -49,6 +76,54 @@ class OpenTableReviewDataTransformer:
         self.restaurants_to_drop_list = restaurants_to_drop_list
         return None
 
+    def get_raw_path(self) -> Path:
+        """
+        Returns the path of the raw csv.
+        """
+        return self.HOME / "data" / "raw" / self.file_name
+
+    def get_curated_path(self) -> Path:
+        """
+        Returns the path of the curated file, e.g., data/curated/open_table_review_data_Portland_ME_2024-07-21.csv_CURATED.csv.
+        """
+        return self.HOME / "data" / "curated" / f"{self.file_name}_CURATED{get_curated_suffix(self.file_format)}"
+
+    def get_manifest_params(self) -> dict:
+        """
+        Returns the parameters that change the curated csv, recorded in the transform manifest: the restaurants dropped.
+        """
+        return {"restaurants_to_drop": sorted(self.restaurants_to_drop_list or [])}
+
+    def begin_transformation(self, file_name:str, restaurants_to_drop_list:list = None, skip_if_unchanged:bool = True) -> bool:
+        """
+        Sets the file name and the restaurants to drop, and checks the transform manifest.
+
+        Parameters:
+        - file_name: (str) - The file name of the OpenTable review raw data.
+        - restaurants_to_drop_list: (list) - Restaurants whose reviews are removed. Default None, unchanged.
+        - skip_if_unchanged: (bool) - If False, the manifest is not consulted. Default True.
+
+        Returns:
+        - skip: (bool) - True if the curated csv is up to date with the raw file, the restaurants to drop and this
+                         TRANSFORMER_VERSION.
+        """
+        self.set_file_name(file_name)
+        if restaurants_to_drop_list is not None:
+            self.set_restaurants_to_drop(restaurants_to_drop_list)
+        self.manifest = get_manifest(self.HOME)
+        self.skipped = skip_if_unchanged and self.manifest.is_transformer_up_to_date(self, self.get_manifest_params())
+        if self.skipped:
+            print(f"Skipping {file_name}, the curated csv is up to date")
+        return self.skipped
+
+    def record_transformation(self) -> None:
+        """
+        Records the transformation in the transform manifest.
+        """
+        self.manifest.record_transformer(self, self.get_manifest_params())
+        return None
+
+    @timed_stage("transform.open_table_review", rows = length_of("raw_data"))
     def set_data(self) -> None:
         """
         Retrieves the raw data from the csv file.
@@ -58,6 +133,7 @@ class OpenTableReviewDataTransformer:
         self.raw_data = pd.read_csv(PATH_TO_OPENTABLE_DATA)
         return None
     
+    @timed_stage("transform.open_table_review", rows = length_of("raw_data"))
     def clean_restaurant_name_columns(self, columns:list) -> None:
         """
         Cleans the two name columns, "restaurant_name_input" and "restaurant_name_extracted", preparing them to be
@@ -100,6 +176,7 @@ class OpenTableReviewDataTransformer:
         except (UnicodeEncodeError, UnicodeDecodeError):
             return text
         
+    @timed_stage("transform.open_table_review", rows = length_of("raw_data"))
     def fix_review_text_encoding(self) -> None:
         """
         Applies encoder_fixer to the elements of raw_data dataframe.
@@ -113,6 +190,7 @@ class OpenTableReviewDataTransformer:
         self.raw_data["review_text"] = self.raw_data["review_text"].apply(self.encoder_fixer)
         return None
     
+    @timed_stage("transform.open_table_review", rows = length_of("raw_data"))
     def remove_erroneous_restaurant_reviews(self, restaurant_list: list) -> None:
         """
         Removes all reviews for restaurants identified as "incorrect" by the OpenTableResDataTransformer.
@@ -128,6 +206,7 @@ class OpenTableReviewDataTransformer:
             self.raw_data = self.raw_data[self.raw_data["restaurant_name_input"] != res]
         return None
     
+    @timed_stage("transform.open_table_review", rows = length_of("raw_data"))
     def clean_hometown_column(self) -> None:
         """
         Removes "Greater" from the hometown column
@@ -147,8 +226,8 @@ class OpenTableReviewDataTransformer:
         Returns:
         - date: (datetime.datetime) - The date the data was extracted.
         """
-        # regex used to extract the date from a string
-        regex = r'ME_(\d{4}-\d{2}-\d{2})'
+        # regex used to extract the date following the state from a string, e.g., "Portland_ME_2024-07-21"
+        regex = r'_[A-Z]{2}_(\d{4}-\d{2}-\d{2})'
 
         # perfrom search
         match = re.findall(regex, self.file_name)
@@ -189,14 +268,41 @@ class OpenTableReviewDataTransformer:
 
         return review_date
     
+    @timed_stage("transform.open_table_review", rows = length_of("raw_data"))
     def update_datelike_column(self) -> None:
         """
-        Applies modify date to a pd.DataFrame
+        Converts the "datelike" column to dates, resolving the three forms modify_date handles over the whole column
+        at once instead of row by row. The extraction date is parsed from the file name once.
 
+        * "Dined today"                 --> extraction date
+        * "Dined N day(s) ago"          --> extraction date - N days
+        * "Dined on <Month D, YYYY>"    --> that date
+
+        Parameters:
+        - None
+
+        Returns:
+        - None
         """
-        self.raw_data["datelike"] = self.raw_data["datelike"].apply(lambda text: self.modify_date(text))
+        datelike = self.raw_data["datelike"]
+        extraction_date = pd.Timestamp(self.get_date_from_file_name())
+
+        # "on <Month D, YYYY>" dates, then the relative forms in modify_date's order of precedence
+        review_date = pd.to_datetime(datelike.str.extract(r"on (.+)", expand = False), format = "%B %d, %Y", errors = "coerce")
+        is_ago = datelike.str.contains("ago", regex = False)
+        days_ago = pd.to_numeric(datelike.str.extract(r"Dined (\d+)", expand = False), errors = "coerce")
+        review_date = review_date.mask(is_ago, extraction_date - pd.to_timedelta(days_ago, unit = "D"))
+        review_date = review_date.mask(datelike.str.contains("today", regex = False), extraction_date)
+
+        # modify_date raises on anything else, so does this
+        unresolved = review_date.isna()
+        if unresolved.any():
+            raise ValueError(f"Unrecognized datelike values: {datelike[unresolved].unique()[:5].tolist()}")
+
+        self.raw_data["datelike"] = review_date
         return None
 
+    @timed_stage("transform.open_table_review", rows = length_of("raw_data"))
     def rename_columns(self) -> None:
         """
         Renames some of the dataframe columns.
@@ -219,6 +325,7 @@ class OpenTableReviewDataTransformer:
                                         "Ambience": "ambience"}, inplace = True)
         return None
             
+    @timed_stage("transform.open_table_review", rows = length_of("raw_data"))
     def drop_and_reorder_cols(self) -> None:
         """
         Drops columns: "restuarant_name_extracted" and "Unnamed: 0", renames "restaurant_name_input" "restaurant_name" and
@@ -234,6 +341,117 @@ class OpenTableReviewDataTransformer:
         column_order = ["restaurant_name", "datelike", "reviewer_name", "city", "overall", "food", "service", "ambience", "review_text", "origins"]
         self.raw_data = self.raw_data[column_order]
         return None
+
+    @timed_stage("transform.open_table_review", rows = length_of("raw_data"))
+    def save_transformed_data(self, append:bool = False, keep_open:bool = False) -> None:
+        """
+        Saves transformed data to: data/curated/ folder.
+
+        Parameters:
+        - append: (bool) - If True, append to the curated file, as execute_streaming does for every chunk after the
+                           first. Default False.
+        - keep_open: (bool) - If True, leave the curated file open for the next chunk; close_curated_writer finishes
+                              it. Required to append to a typed format. Default False.
+
+        Returns:
+        - None
+        """
+        if not append:
+            self.close_curated_writer()
+        if self.curated_writer is None:
+            self.curated_writer = CuratedWriter(self.get_curated_path(), self.file_format, self.CURATED_COLUMN_TYPES,
+                                                append = append)
+        self.curated_writer.write(self.raw_data)
+        if not keep_open:
+            self.close_curated_writer()
+        return None
+
+    def close_curated_writer(self) -> None:
+        """
+        Finishes the curated file left open by save_transformed_data.
+        """
+        curated_writer, self.curated_writer = self.curated_writer, None
+        if curated_writer is not None:
+            curated_writer.close()
+        return None
+
+    @timed_stage("transform.open_table_review", rows = length_of("raw_data"))
+    def execute(self, file_name:str, restaurants_to_drop_list:list = None, skip_if_unchanged:bool = True) -> None:
+        """
+        Executes entire data transformation, the same steps as the driver, and saves the curated csv. Skipped if the
+        transform manifest shows the curated csv is up to date.
+
+        Parameters:
+        - file_name: (str) - file name of OpenTable review data.
+        - restaurants_to_drop_list: (list) - Restaurants whose reviews are removed, i.e., the drop_list of
+                                             OpenTableResDataTransformer. Default None, the list set with
+                                             set_restaurants_to_drop.
+        - skip_if_unchanged: (bool) - If False, transform even if the curated csv is up to date. Default True.
+
+        Returns:
+        - None
+        """
+        if self.begin_transformation(file_name, restaurants_to_drop_list, skip_if_unchanged):
+            return None
+        self.set_data()
+        self.clean_restaurant_name_columns(["restaurant_name_input"])
+        self.fix_review_text_encoding()
+        self.remove_erroneous_restaurant_reviews(self.restaurants_to_drop_list or [])
+        self.update_datelike_column()
+        self.rename_columns()
+        self.clean_hometown_column()
+        self.drop_and_reorder_cols()
+        self.save_transformed_data()
+        self.record_transformation()
+        return None
+
+    @timed_stage("transform.open_table_review")
+    def execute_streaming(self, file_name:str, restaurants_to_drop_list:list = None, chunksize:int = 100000,
+                          skip_if_unchanged:bool = True) -> None:
+        """
+        Executes entire data transformation in streaming mode. The raw csv is read chunksize rows at a time, each
+        chunk goes through the same steps as the driver and is appended to the curated csv, so memory is bounded by
+        the chunk size instead of the file size. Every raw column is read as text, so a chunk's column types do not
+        depend on which values it happens to contain. Skipped, like execute, if the curated csv is up to date.
+
+        Parameters:
+        - file_name: (str) - file name of OpenTable review data.
+        - restaurants_to_drop_list: (list) - Restaurants whose reviews are removed, i.e., the drop_list of
+                                             OpenTableResDataTransformer. Default None, the list set with
+                                             set_restaurants_to_drop.
+        - chunksize: (int) - The number of raw rows transformed at a time. Default 100000.
+        - skip_if_unchanged: (bool) - If False, transform even if the curated csv is up to date. Default True.
+
+        Returns:
+        - None
+        """
+        if self.begin_transformation(file_name, restaurants_to_drop_list, skip_if_unchanged):
+            return None
+        rows_in, rows_out = 0, 0
+        for chunk in pd.read_csv(self.get_raw_path(), chunksize = chunksize, dtype = str):
+            self.raw_data = chunk
+            rows_in += len(chunk)
+            self.clean_restaurant_name_columns(["restaurant_name_input"])
+            self.fix_review_text_encoding()
+            self.remove_erroneous_restaurant_reviews(self.restaurants_to_drop_list or [])
+
+            # every row of the chunk was dropped
+            if self.raw_data.empty:
+                continue
+            self.update_datelike_column()
+            self.rename_columns()
+            self.clean_hometown_column()
+            self.drop_and_reorder_cols()
+            self.save_transformed_data(append = rows_out > 0, keep_open = True)
+            rows_out += len(self.raw_data)
+
+        self.close_curated_writer()
+        if rows_out == 0:
+            print(f"No rows left to save from {self.file_name}")
+        else:
+            self.record_transformation()
+        report_rows(rows_in, rows_out)
+        return None
         
 #################################################################################################################################
 # End
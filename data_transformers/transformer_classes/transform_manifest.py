@@ -0,0 +1,198 @@
+"""
+Review Aggregator
+
+Transform Manifest Class
+
+This file contains the TransformManifest class. It records, for every raw file a transformer has curated, the hash of
+the raw file's contents, the transformer and its version, the parameters that changed the output (e.g., the
+restaurants dropped from OpenTable reviews) and the curated csv that was written. The transformers consult it before
+running and skip raw files whose curated csv is already up to date, so rerunning the pipeline after one new scrape
+only transforms the new files.
+
+Each raw file has one entry file per curated format, data/curated/transform_manifest/<raw file name><curated
+suffix>.json, e.g., yelp_review_data_Portland_ME_2024-06-29.csv.parquet.json, so transformers running in parallel
+processes never write the same file, and switching between curated formats does not overwrite the other format's entry.
+The folder is git ignored, as the entries describe local files.
+"""
+###################################################################################################################
+# libraries
+import os
+import json
+import hashlib
+import datetime
+from pathlib import Path
+from data_transformers.transformer_classes.curated_format import CURATED_FORMATS
+
+###################################################################################################################
+# class
+class TransformManifest:
+    """
+    Records which raw files have been transformed, and from which contents.
+
+    A raw file's curated csv is up to date when its entry has the same raw file hash, transformer, transformer
+    version and parameters, and the curated csv has not been deleted or rewritten since (same size and modification
+    time).
+
+    Attributes:
+     * folder: (Path Object)    - The folder holding the entry files.
+     * hashes: (dict)           - Raw file hashes computed by this object, keyed on (path, size, modification time),
+                                  so a file is hashed once between checking and recording.
+
+    Methods:
+     * get_file_hash
+     * get_entry
+     * is_up_to_date
+     * record
+     * is_transformer_up_to_date
+     * record_transformer
+     * remove
+    """
+
+    def __init__(self, folder:Path) -> None:
+        """
+        Initializer for TransformManifest.
+
+        Params:
+         * folder: (Path) - The folder holding the entry files, e.g., data/curated/transform_manifest.
+        """
+        self.folder = Path(folder)
+        self.hashes = {}
+
+    def get_entry_path(self, raw_file_name:str, curated_suffix:str = ".csv") -> Path:
+        """
+        Returns the path of a raw file's entry file for the curated file format with the suffix curated_suffix.
+        """
+        return self.folder / f"{raw_file_name}{curated_suffix}.json"
+
+    def get_file_hash(self, path:Path) -> str:
+        """
+        Hashes a file's contents, reusing the hash while the file's size and modification time are unchanged.
+
+        Params:
+         * path: (Path) - The path to the file.
+
+        Returns:
+         * file_hash: (str) - The SHA-1 hex digest of the file.
+        """
+        stat = os.stat(path)
+        key = (str(path), stat.st_size, stat.st_mtime_ns)
+        if key not in self.hashes:
+            file_hash = hashlib.sha1()
+            with open(path, "rb") as file:
+                for block in iter(lambda: file.read(1 << 20), b""):
+                    file_hash.update(block)
+            self.hashes[key] = file_hash.hexdigest()
+        return self.hashes[key]
+
+    def get_entry(self, raw_file_name:str, curated_suffix:str = ".csv") -> dict:
+        """
+        Returns a raw file's entry for the curated file format with the suffix curated_suffix, e.g., ".parquet".
+        None if it has none or the entry cannot be read.
+        """
+        try:
+            with open(self.get_entry_path(raw_file_name, curated_suffix), "r") as file:
+                return json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def is_up_to_date(self, raw_path:Path, curated_path:Path, transformer:str, version:int, params:dict = None) -> bool:
+        """
+        Checks whether a raw file's curated csv was written from the raw file's current contents, by the same
+        transformer version with the same parameters.
+
+        Params:
+         * raw_path: (Path)      - The raw csv.
+         * curated_path: (Path)  - The curated csv the transformer writes for it.
+         * transformer: (str)    - The transformer class name.
+         * version: (int)        - The transformer's TRANSFORMER_VERSION.
+         * params: (dict)        - Parameters that change the output. Default None, no parameters.
+
+        Returns:
+         * up_to_date: (bool)
+        """
+        entry = self.get_entry(Path(raw_path).name, Path(curated_path).suffix)
+        if entry is None or not Path(raw_path).exists() or not Path(curated_path).exists():
+            return False
+        curated_stat = os.stat(curated_path)
+        return (entry["transformer"] == transformer
+                and entry["transformer_version"] == version
+                and entry["params"] == (params or {})
+                and entry["curated_file"] == Path(curated_path).name
+                and entry["curated_size"] == curated_stat.st_size
+                and entry["curated_mtime_ns"] == curated_stat.st_mtime_ns
+                and entry["raw_hash"] == self.get_file_hash(raw_path))
+
+    def record(self, raw_path:Path, curated_path:Path, transformer:str, version:int, params:dict = None,
+               outputs:dict = None) -> None:
+        """
+        Records that the curated csv was written from the raw file. The entry is written to a temporary file and
+        renamed, so a reader never sees half an entry.
+
+        Params:
+         * raw_path: (Path)      - The raw csv.
+         * curated_path: (Path)  - The curated csv that was written.
+         * transformer: (str)    - The transformer class name.
+         * version: (int)        - The transformer's TRANSFORMER_VERSION.
+         * params: (dict)        - Parameters that change the output. Default None, no parameters.
+         * outputs: (dict)       - Results a skipped run should restore, e.g., the restaurants an OpenTable
+                                   restaurant transformation dropped. Default None.
+        """
+        curated_stat = os.stat(curated_path)
+        entry = {"raw_file": Path(raw_path).name,
+                 "raw_hash": self.get_file_hash(raw_path),
+                 "transformer": transformer,
+                 "transformer_version": version,
+                 "params": params or {},
+                 "curated_file": Path(curated_path).name,
+                 "curated_size": curated_stat.st_size,
+                 "curated_mtime_ns": curated_stat.st_mtime_ns,
+                 "outputs": outputs or {},
+                 "transformed_at": datetime.datetime.now().isoformat(timespec = "seconds")}
+
+        self.folder.mkdir(parents = True, exist_ok = True)
+        entry_path = self.get_entry_path(entry["raw_file"], Path(curated_path).suffix)
+        temp_path = entry_path.with_name(f"{entry_path.name}.{os.getpid()}.tmp")
+        with open(temp_path, "w") as file:
+            json.dump(entry, file, indent = 2)
+        os.replace(temp_path, entry_path)
+        return None
+
+    def is_transformer_up_to_date(self, transformer, params:dict = None) -> bool:
+        """
+        is_up_to_date for a transformer object, using its get_raw_path, get_curated_path and TRANSFORMER_VERSION.
+        """
+        return self.is_up_to_date(transformer.get_raw_path(), transformer.get_curated_path(), type(transformer).__name__,
+                                  transformer.TRANSFORMER_VERSION, params)
+
+    def record_transformer(self, transformer, params:dict = None, outputs:dict = None) -> None:
+        """
+        record for a transformer object, using its get_raw_path, get_curated_path and TRANSFORMER_VERSION.
+        """
+        return self.record(transformer.get_raw_path(), transformer.get_curated_path(), type(transformer).__name__,
+                           transformer.TRANSFORMER_VERSION, params, outputs)
+
+    def remove(self, raw_file_name:str, curated_suffix:str = None) -> None:
+        """
+        Removes a raw file's entry, so it is transformed again on the next run.
+
+        Params:
+         * raw_file_name: (str)   - The raw file name.
+         * curated_suffix: (str)  - The suffix of the curated file format whose entry is removed. Default None, the
+                                    entries of every format.
+        """
+        curated_suffixes = CURATED_FORMATS.values() if curated_suffix is None else [curated_suffix]
+        for suffix in curated_suffixes:
+            self.get_entry_path(raw_file_name, suffix).unlink(missing_ok = True)
+        return None
+
+def get_manifest(home:Path) -> TransformManifest:
+    """
+    Returns the transform manifest of a project folder, kept in home/data/curated/transform_manifest.
+    """
+    return TransformManifest(Path(home) / "data" / "curated" / "transform_manifest")
+
+#################################################################################################################################
+# End
+#################################################################################################################################
+if __name__ == "__main__":
+    pass
@@ -13,6 +13,9 @@ data from the Yelp website to a form that is ready to be loaded in the restauran
 #################################################################################################################################
 import pandas as pd  
 from pathlib import Path
+from instrumentation.stage_recorder import timed_stage, length_of, report_rows
+from data_transformers.transformer_classes.transform_manifest import get_manifest
+from data_transformers.transformer_classes.curated_format import CuratedWriter, get_curated_suffix, decode_tags
 import re
 import ast
 
@@ -24,19 +27,36 @@ class YelpResDataTransformer:
     Class for transforming raw extracted Yelp data to curated data ready to be entered into the 
     restaurant_review_database.
     """
-    def __init__(self) -> None:
+    # bump when a change alters the curated csv, so the transform manifest reruns files curated by older versions
+    TRANSFORMER_VERSION = 1
+
+    # the type of every curated column in a typed (parquet, feather) curated file
+    CURATED_COLUMN_TYPES = {"restaurant_name": "string",
+                            "city": "string",
+                            "state": "string",
+                            "price_point": "float",
+                            "tags": "list"}
+
+    def __init__(self, file_format:str = "csv") -> None:
         """
         Initializes the data transformer object.
 
         Parameters:
-        - None
+        - file_format: (str) - The curated file format: "csv", or the typed formats "parquet" and "feather", which
+                               require pyarrow. Default "csv".
 
         Returns:
         - None
         """
+        get_curated_suffix(file_format)
         self.HOME = Path.cwd()
         self.raw_data = None
         self.file_name = None
+        self.file_format = file_format
+        self.curated_writer = None # open while execute_streaming writes chunks
+        self.errors = [] # error messages of the current transformation
+        self.skipped = False # True if execute found the curated csv up to date
+        self.manifest = None
 
     def set_file_name(self, file_name:str) -> None:
         """
@@ -51,6 +71,54 @@ class YelpResDataTransformer:
         self.file_name = file_name
         return self
 
+    def get_raw_path(self) -> Path:
+        """
+        Returns the path of the raw csv.
+        """
+        return self.HOME / "data" / "raw" / self.file_name
+
+    def get_curated_path(self) -> Path:
+        """
+        Returns the path of the curated file, e.g., data/curated/yelp_restaurant_data_Portland_ME_2024-06-29_CURATED.csv.
+        """
+        return self.HOME / "data" / "curated" / f"{self.file_name.replace('.csv', '')}_CURATED{get_curated_suffix(self.file_format)}"
+
+    def report_error(self, message:str) -> None:
+        """
+        Prints an error message and keeps it in errors, so a failed transformation is not recorded in the transform
+        manifest.
+        """
+        print(message)
+        self.errors.append(message)
+
+    def begin_transformation(self, file_name:str, skip_if_unchanged:bool = True) -> bool:
+        """
+        Sets the file name, clears the errors of the previous transformation and checks the transform manifest.
+
+        Parameters:
+        - file_name: (str) - The file name of the Yelp restaurant raw data.
+        - skip_if_unchanged: (bool) - If False, the manifest is not consulted. Default True.
+
+        Returns:
+        - skip: (bool) - True if the curated csv is up to date with the raw file and this TRANSFORMER_VERSION.
+        """
+        self.set_file_name(file_name)
+        self.errors = []
+        self.manifest = get_manifest(self.HOME)
+        self.skipped = skip_if_unchanged and self.manifest.is_transformer_up_to_date(self)
+        if self.skipped:
+            print(f"Skipping {file_name}, the curated csv is up to date")
+        return self.skipped
+
+    def record_transformation(self) -> None:
+        """
+        Records the transformation in the transform manifest, unless a step reported an error.
+        """
+        if not self.errors:
+            self.manifest.record_transformer(self)
+        return None
+
+    @timed_stage("transform.yelp_restaurant", rows = length_of("raw_data"))
     def set_data(self) -> None:
         """
         Retrieves the raw data from the csv file.
@@ -66,10 +134,11 @@ class YelpResDataTransformer:
             PATH_TO_OPENTABLE_DATA = PATH_TO_DATA_FOLDER / self.file_name
             self.raw_data = pd.read_csv(PATH_TO_OPENTABLE_DATA)
         except Exception as e:
-            print(f"Error reading in data: {e}")
+            self.report_error(f"Error reading in data: {e}")
 
         return self
     
+    @timed_stage("transform.yelp_restaurant", rows = length_of("raw_data"))
     def clean_restaurant_name_column(self) -> None:
         """
         Cleans the two name columns, "restaurant_name_input" and "restaurant_name_extracted", preparing them to be
@@ -95,10 +164,11 @@ class YelpResDataTransformer:
             self.raw_data["name"] = self.raw_data["name"].str.lower()
 
         except Exception as e:
-            print(f"Error cleaning restaurant_name column: {e}")
+            self.report_error(f"Error cleaning restaurant_name column: {e}")
 
         return self
                 
+    @timed_stage("transform.yelp_restaurant", rows = length_of("raw_data"))
     def clean_price_point_col(self) -> None:
         """
         Convert extractions that do not contain "$" to None.
@@ -119,10 +189,11 @@ class YelpResDataTransformer:
                       "$$$$":4}
             self.raw_data["price_point"] = self.raw_data["price_point"].map(mapper)
         except Exception as e:
-            print(f"Error cleaning price_point column: {e}")
+            self.report_error(f"Error cleaning price_point column: {e}")
 
         return self
     
+    @timed_stage("transform.yelp_restaurant", rows = length_of("raw_data"))
     def update_tag_col(self) -> None:
         """
         The tags columns contains strings literals that should be lists. It also contains NaN values.
@@ -131,6 +202,7 @@ class YelpResDataTransformer:
         * "[]"                              --> None
         * NaN                               --> None
         * "['string_1', 'string_2', ...]"   --> to list dtype
+        * '["string_1", "string_2", ...]'   --> to list dtype
 
         Parameters:
         - None
@@ -140,12 +212,13 @@ class YelpResDataTransformer:
         """
         try:
             self.raw_data["tags"] = self.raw_data["tags"].apply(lambda x: None if (x == "[]") or (pd.isna(x)) else x)
-            self.raw_data["tags"] = self.raw_data["tags"].apply(lambda x: ast.literal_eval(x) if x is not None else x)
+            self.raw_data["tags"] = self.raw_data["tags"].apply(lambda x: decode_tags(x) if isinstance(x, str) else None)
         except Exception as e:
-            print(f"Error updating tag column: {e}")
+            self.report_error(f"Error updating tag column: {e}")
 
         return self
     
+    @timed_stage("transform.yelp_restaurant", rows = length_of("raw_data"))
     def add_city_and_state_columns(self) -> None:
         """
         Adds a city and state column by extracting the information from the column name. OpenTableScrapper generates
@@ -158,6 +231,7 @@ class YelpResDataTransformer:
         self.raw_data["state"] = state
         return self
 
+    @timed_stage("transform.yelp_restaurant", rows = length_of("raw_data"))
     def drop_rename_reorder_cols(self) -> None:
         """
         Drops columns: "restuarant_name_extracted" and "Unnamed: 0", renames "restaurant_name_input" "restaurant_name" and
@@ -176,36 +250,64 @@ class YelpResDataTransformer:
             column_order = ["restaurant_name", "city", "state", "price_point", "tags"]
             self.raw_data = self.raw_data[column_order]
         except Exception as e:
-            print(f"Error dropping, renaming, and reordering columns: {e}")
+            self.report_error(f"Error dropping, renaming, and reordering columns: {e}")
 
         return self
     
-    def save_transformed_data(self) -> None:
+    @timed_stage("transform.yelp_restaurant", rows = length_of("raw_data"))
+    def save_transformed_data(self, append:bool = False, keep_open:bool = False) -> None:
         """
-        Saves transformed data to: data/curated/ folder
+        Saves transformed data to: data/curated/ folder. In a csv the tag lists are written as JSON arrays; the typed
+        formats keep them as lists.
+
+        Parameters:
+        - append: (bool) - If True, append to the curated file, as execute_streaming does for every chunk after the
+                           first. Default False.
+        - keep_open: (bool) - If True, leave the curated file open for the next chunk; close_curated_writer finishes
+                              it. Required to append to a typed format. Default False.
+
+        Returns:
+        - None
         """
         try:
-            file_name = self.file_name.replace(".csv", "")
-            SAVE_PATH = str(self.HOME / "data" / "curated" / f"{file_name}_CURATED.csv")
-            self.raw_data.to_csv(SAVE_PATH)
+            if not append:
+                self.close_curated_writer()
+            if self.curated_writer is None:
+                self.curated_writer = CuratedWriter(self.get_curated_path(), self.file_format, self.CURATED_COLUMN_TYPES,
+                                                    append = append)
+            self.curated_writer.write(self.raw_data)
+            if not keep_open:
+                self.close_curated_writer()
         except Exception as e:
-            print(f"Error saving data to csv: {e}")
+            self.report_error(f"Error saving data to {self.file_format}: {e}")
         
         return self
+
+    def close_curated_writer(self) -> None:
+        """
+        Finishes the curated file left open by save_transformed_data.
+        """
+        curated_writer, self.curated_writer = self.curated_writer, None
+        if curated_writer is not None:
+            curated_writer.close()
+        return self
     
-    def execute(self, file_name:str) -> None:
+    @timed_stage("transform.yelp_restaurant", rows = length_of("raw_data"))
+    def execute(self, file_name:str, skip_if_unchanged:bool = True) -> None:
         """
-        Executes entire data transformation.
+        Executes entire data transformation. Skipped if the transform manifest shows the curated csv is up to date.
 
         Parameters:
         - file_name: (str) - file name of Yelp restaurant data.
+        - skip_if_unchanged: (bool) - If False, transform even if the curated csv is up to date. Default True.
 
         Returns:
         - None
         """
         try:
+            if self.begin_transformation(file_name, skip_if_unchanged):
+                return None
             (self
-            .set_file_name(file_name)
             .set_data()
             .clean_restaurant_name_column()
             .clean_price_point_col()
@@ -214,10 +316,54 @@ class YelpResDataTransformer:
             .drop_rename_reorder_cols()
             .save_transformed_data()
             )
+            self.record_transformation()
         except Exception as e:
-            print(f"Error executing transformation: {e}")
+            self.report_error(f"Error executing transformation: {e}")
             
         return None
+
+    @timed_stage("transform.yelp_restaurant")
+    def execute_streaming(self, file_name:str, chunksize:int = 100000, skip_if_unchanged:bool = True) -> None:
+        """
+        Executes entire data transformation in streaming mode. The raw csv is read chunksize rows at a time, each
+        chunk goes through the same steps as execute and is appended to the curated csv, so memory is bounded by the
+        chunk size instead of the file size. Skipped, like execute, if the curated csv is up to date.
+
+        Every raw column is read as text, so a chunk's column types do not depend on which values it happens to
+        contain. price_point is kept as float in every chunk, as execute writes it when any price point is missing.
+
+        Parameters:
+        - file_name: (str) - file name of Yelp restaurant data.
+        - chunksize: (int) - The number of raw rows transformed at a time. Default 100000.
+        - skip_if_unchanged: (bool) - If False, transform even if the curated csv is up to date. Default True.
+
+        Returns:
+        - None
+        """
+        try:
+            if self.begin_transformation(file_name, skip_if_unchanged):
+                return None
+            rows_in, rows_out = 0, 0
+            for chunk_number, chunk in enumerate(pd.read_csv(self.get_raw_path(), chunksize = chunksize, dtype = str)):
+                self.raw_data = chunk
+                rows_in += len(chunk)
+                (self
+                .clean_restaurant_name_column()
+                .clean_price_point_col()
+                .update_tag_col()
+                .add_city_and_state_columns()
+                .drop_rename_reorder_cols()
+                )
+                self.raw_data["price_point"] = self.raw_data["price_point"].astype(float)
+                self.save_transformed_data(append = chunk_number > 0, keep_open = True)
+                rows_out += len(self.raw_data)
+            self.close_curated_writer()
+            report_rows(rows_in, rows_out)
+            self.record_transformation()
+        except Exception as e:
+            self.report_error(f"Error executing streaming transformation: {e}")
+
+        return None
     
 #################################################################################################################################
 # End
@@ -13,6 +13,9 @@ data from the Yelp website to a form that is ready to be loaded in the restauran
 #################################################################################################################################
 import pandas as pd  
 from pathlib import Path
+from instrumentation.stage_recorder import timed_stage, length_of, report_rows
+from data_transformers.transformer_classes.transform_manifest import get_manifest
+from data_transformers.transformer_classes.curated_format import CuratedWriter, get_curated_suffix
 import re
 import ast
 import datetime 
@@ -25,13 +28,46 @@ class YelpReviewDataTransformer:
     Class for transforming raw extracted Yelp data to curated data ready to be entered into the 
     restaurant_review_database.
     """
-    def __init__(self) -> None:
+    # US state abbreviations, used to tell states from countries in the hometown column
+    STATE_ABBREVIATIONS = frozenset([
+                                'AL', 'AK', 'AZ', 'AR', 'CA', 'CO', 'CT', 'DE', 'FL', 'GA',
+                                'HI', 'ID', 'IL', 'IN', 'IA', 'KS', 'KY', 'LA', 'ME', 'MD',
+                                'MA', 'MI', 'MN', 'MS', 'MO', 'MT', 'NE', 'NV', 'NH', 'NJ',
+                                'NM', 'NY', 'NC', 'ND', 'OH', 'OK', 'OR', 'PA', 'RI', 'SC',
+                                'SD', 'TN', 'TX', 'UT', 'VT', 'VA', 'WA', 'WV', 'WI', 'WY'
+                            ])
+
+    # bump when a change alters the curated csv, so the transform manifest reruns files curated by older versions
+    TRANSFORMER_VERSION = 1
+
+    # the type of every curated column in a typed (parquet, feather) curated file
+    CURATED_COLUMN_TYPES = {"restaurant_name": "string",
+                            "datelike": "datetime",
+                            "reviewer_name": "string",
+                            "city": "string",
+                            "state": "string",
+                            "country": "string",
+                            "rating": "int",
+                            "review_text": "string",
+                            "origins": "string"}
+
+    def __init__(self, file_format:str = "csv") -> None:
         """
         Initializes the data transformer object.
+
+        Parameters:
+        - file_format: (str) - The curated file format: "csv", or the typed formats "parquet" and "feather", which
+                               require pyarrow. Default "csv".
         """
+        get_curated_suffix(file_format)
         self.HOME = Path.cwd()
         self.raw_data = None
         self.file_name = None
+        self.file_format = file_format
+        self.curated_writer = None # open while execute_streaming writes chunks
+        self.errors = [] # error messages of the current transformation
+        self.skipped = False # True if execute found the curated csv up to date
+        self.manifest = None
 
     def set_file_name(self, file_name:str) -> None:
         """
@@ -43,6 +79,54 @@ class YelpReviewDataTransformer:
         self.file_name = file_name
         return self
 
+    def get_raw_path(self) -> Path:
+        """
+        Returns the path of the raw csv.
+        """
+        return self.HOME / "data" / "raw" / self.file_name
+
+    def get_curated_path(self) -> Path:
+        """
+        Returns the path of the curated file, e.g., data/curated/yelp_review_data_Portland_ME_2024-06-29.csv_CURATED.csv.
+        """
+        return self.HOME / "data" / "curated" / f"{self.file_name}_CURATED{get_curated_suffix(self.file_format)}"
+
+    def report_error(self, message:str) -> None:
+        """
+        Prints an error message and keeps it in errors, so a failed transformation is not recorded in the transform
+        manifest.
+        """
+        print(message)
+        self.errors.append(message)
+
+    def begin_transformation(self, file_name:str, skip_if_unchanged:bool = True) -> bool:
+        """
+        Sets the file name, clears the errors of the previous transformation and checks the transform manifest.
+
+        Parameters:
+        - file_name: (str) - The file name of the Yelp review raw data.
+        - skip_if_unchanged: (bool) - If False, the manifest is not consulted. Default True.
+
+        Returns:
+        - skip: (bool) - True if the curated csv is up to date with the raw file and this TRANSFORMER_VERSION.
+        """
+        self.set_file_name(file_name)
+        self.errors = []
+        self.manifest = get_manifest(self.HOME)
+        self.skipped = skip_if_unchanged and self.manifest.is_transformer_up_to_date(self)
+        if self.skipped:
+            print(f"Skipping {file_name}, the curated csv is up to date")
+        return self.skipped
+
+    def record_transformation(self) -> None:
+        """
+        Records the transformation in the transform manifest, unless a step reported an error.
+        """
+        if not self.errors:
+            self.manifest.record_transformer(self)
+        return None
+
+    @timed_stage("transform.yelp_review", rows = length_of("raw_data"))
     def set_data(self) -> None:
         """
         Retrieves the raw data from the csv file.
@@ -52,10 +136,11 @@ class YelpReviewDataTransformer:
             PATH_TO_OPENTABLE_DATA = PATH_TO_DATA_FOLDER / self.file_name
             self.raw_data = pd.read_csv(PATH_TO_OPENTABLE_DATA)
         except Exception as e:
-            print(f"Error reading in data: {e}")
+            self.report_error(f"Error reading in data: {e}")
 
         return self
     
+    @timed_stage("transform.yelp_review", rows = length_of("raw_data"))
     def clean_restaurant_name_column(self) -> None:
         """
         Cleans the two name columns, "restaurant_name_input" and "restaurant_name_extracted", preparing them to be
@@ -78,10 +163,11 @@ class YelpReviewDataTransformer:
             self.raw_data["restaurant"] = self.raw_data["restaurant"].str.lower()
 
         except Exception as e:
-            print(f"Error cleaning restaurant_name column: {e}")
+            self.report_error(f"Error cleaning restaurant_name column: {e}")
 
         return self
                 
+    @timed_stage("transform.yelp_review", rows = length_of("raw_data"))
     def clean_datelike_col(self) -> None:
         """
         Converts "datelike" column elemnts to datetime.datetime object
@@ -89,7 +175,7 @@ class YelpReviewDataTransformer:
         try:
             self.raw_data["datelike"] = self.raw_data["datelike"].apply(lambda x: datetime.datetime.strptime(x, "%b %d, %Y"))
         except Exception as e:
-            print(f"Error cleaning price_point column: {e}")
+            self.report_error(f"Error cleaning price_point column: {e}")
 
         return self
     
@@ -110,6 +196,7 @@ class YelpReviewDataTransformer:
         rating = int(rating_str)
         return rating
     
+    @timed_stage("transform.yelp_review", rows = length_of("raw_data"))
     def clean_rating_column(self) -> None:
         """
         Extracts the integer portion of the text in the rating column
@@ -117,7 +204,7 @@ class YelpReviewDataTransformer:
         try:
             self.raw_data["rating"] = self.raw_data["rating"].apply(lambda x: self.get_rating_integer_from_text(x))
         except Exception as e:
-            print(f"Error updating tag column: {e}")
+            self.report_error(f"Error updating tag column: {e}")
 
         return self
     
@@ -151,39 +238,63 @@ class YelpReviewDataTransformer:
             result = result[0].strip(), result[1].strip() if len(result) > 1 else pd.NA
         return result
     
+    @timed_stage("transform.yelp_review", rows = length_of("raw_data"))
     def seperate_city_state(self) -> None:
         """  
-        Seperates the hometown column into city and state columns.
+        Seperates the hometown column into city and state columns. Follows split_hometown, but splits the whole column
+        at once with the .str accessor:
+
+        * no comma                  --> city = hometown, no state
+        * one comma                 --> city = first part, state = second part
+        * two or more commas        --> city = second part, state = the rest
+        * "Washington, DC"          --> city = "Washington DC", no state
         """
-        self.raw_data[["city", "state"]] = self.raw_data["hometown"].apply(lambda x: self.split_hometown(x)).apply(pd.Series)
+        hometown = self.raw_data["hometown"]
+
+        # a column with no hometowns at all is read in as floats
+        if hometown.isna().all():
+            hometown = hometown.astype(object)
+        comma_count = hometown.str.count(",")
+
+        # at most three parts; reindex in case no hometown has two commas
+        parts = hometown.str.split(",", n = 2, expand = True)
+        parts = parts.apply(lambda part: part.str.strip()).reindex(columns = range(3))
+
+        city = hometown.where(comma_count == 0, parts[0].where(comma_count == 1, parts[1]))
+        state = parts[1].where(comma_count == 1, parts[2].where(comma_count >= 2))
+
+        is_washington_dc = hometown == "Washington, DC"
+        city = city.mask(is_washington_dc, "Washington DC")
+        state = state.mask(is_washington_dc)
+
+        self.raw_data["city"] = city
+        self.raw_data["state"] = state
         return self
     
     def check_if_state_is_state(self, x) -> None:
         """  
         Checks if what in the state column is actually as US state.
         """
-        state_abbreviations = [
-                                'AL', 'AK', 'AZ', 'AR', 'CA', 'CO', 'CT', 'DE', 'FL', 'GA',
-                                'HI', 'ID', 'IL', 'IN', 'IA', 'KS', 'KY', 'LA', 'ME', 'MD',
-                                'MA', 'MI', 'MN', 'MS', 'MO', 'MT', 'NE', 'NV', 'NH', 'NJ',
-                                'NM', 'NY', 'NC', 'ND', 'OH', 'OK', 'OR', 'PA', 'RI', 'SC',
-                                'SD', 'TN', 'TX', 'UT', 'VT', 'VA', 'WA', 'WV', 'WI', 'WY'
-                            ]
         if pd.isna(x):
             return pd.NA
-        elif x not in state_abbreviations:
+        elif x not in self.STATE_ABBREVIATIONS:
             return x
         else:
             return "US"
         
+    @timed_stage("transform.yelp_review", rows = length_of("raw_data"))
     def create_country_column(self) -> None:
         """  
-        Generates a country column by checking if what in the state column is actually as US state. 
+        Generates a country column by checking if what in the state column is actually as US state. US states get
+        "US", anything else in the state column is moved to the country column.
         """
-        self.raw_data["country"] = self.raw_data["state"].apply(lambda x: self.check_if_state_is_state(x))
-        self.raw_data.loc[self.raw_data["country"] != "US", "state"] = pd.NA
+        state = self.raw_data["state"]
+        is_state = state.isin(self.STATE_ABBREVIATIONS)
+        self.raw_data["country"] = state.mask(is_state, "US")
+        self.raw_data["state"] = state.where(is_state)
         return self
 
+    @timed_stage("transform.yelp_review", rows = length_of("raw_data"))
     def drop_rename_reorder_cols(self) -> None:
         """
         Drops columns: "Unnamed: 0", renames "restaurant" and "text" and reorders the columns to facilitate 
@@ -197,35 +308,60 @@ class YelpReviewDataTransformer:
             column_order = ["restaurant_name", "datelike", "reviewer_name", "city", "state", "country", "rating", "review_text", "origins"]
             self.raw_data = self.raw_data[column_order]
         except Exception as e:
-            print(f"Error dropping, renaming, and reordering columns: {e}")
+            self.report_error(f"Error dropping, renaming, and reordering columns: {e}")
 
         return self
     
-    def save_transformed_data(self) -> None:
+    @timed_stage("transform.yelp_review", rows = length_of("raw_data"))
+    def save_transformed_data(self, append:bool = False, keep_open:bool = False) -> None:
         """
         Saves transformed data to: data/curated/ folder
+
+        Parameters:
+        - append: (bool) - If True, append to the curated file, as execute_streaming does for every chunk after the
+                           first. Default False.
+        - keep_open: (bool) - If True, leave the curated file open for the next chunk; close_curated_writer finishes
+                              it. Required to append to a typed format. Default False.
         """
         try:
-            SAVE_PATH = str(self.HOME / "data" / "curated" / f"{self.file_name}_CURATED.csv")
-            self.raw_data.to_csv(SAVE_PATH)
+            if not append:
+                self.close_curated_writer()
+            if self.curated_writer is None:
+                self.curated_writer = CuratedWriter(self.get_curated_path(), self.file_format, self.CURATED_COLUMN_TYPES,
+                                                    append = append)
+            self.curated_writer.write(self.raw_data)
+            if not keep_open:
+                self.close_curated_writer()
         except Exception as e:
-            print(f"Error saving data to csv: {e}")
+            self.report_error(f"Error saving data to {self.file_format}: {e}")
         
         return self
+
+    def close_curated_writer(self) -> None:
+        """
+        Finishes the curated file left open by save_transformed_data.
+        """
+        curated_writer, self.curated_writer = self.curated_writer, None
+        if curated_writer is not None:
+            curated_writer.close()
+        return self
     
-    def execute(self, file_name:str) -> None:
+    @timed_stage("transform.yelp_review", rows = length_of("raw_data"))
+    def execute(self, file_name:str, skip_if_unchanged:bool = True) -> None:
         """
-        Executes entire data transformation.
+        Executes entire data transformation. Skipped if the transform manifest shows the curated csv is up to date.
 
         Parameters:
         - file_name: (str) - file name of Yelp review data data.
+        - skip_if_unchanged: (bool) - If False, transform even if the curated csv is up to date. Default True.
 
         Returns:
         - None
         """
         try:
+            if self.begin_transformation(file_name, skip_if_unchanged):
+                return None
             (self
-            .set_file_name(file_name)
             .set_data()
             .clean_restaurant_name_column()
             .clean_datelike_col()
@@ -235,11 +371,53 @@ class YelpReviewDataTransformer:
             .drop_rename_reorder_cols()
             .save_transformed_data()
             )
+            self.record_transformation()
         except Exception as e:
-            print(f"Error executing transformation: {e}")
+            self.report_error(f"Error executing transformation: {e}")
             
         return None
 
+    @timed_stage("transform.yelp_review")
+    def execute_streaming(self, file_name:str, chunksize:int = 100000, skip_if_unchanged:bool = True) -> None:
+        """
+        Executes entire data transformation in streaming mode. The raw csv is read chunksize rows at a time, each
+        chunk goes through the same steps as execute and is appended to the curated csv, so memory is bounded by the
+        chunk size instead of the file size. Every raw column is read as text, so a chunk's column types do not depend
+        on which values it happens to contain. Skipped, like execute, if the curated csv is up to date.
+
+        Parameters:
+        - file_name: (str) - file name of Yelp review data data.
+        - chunksize: (int) - The number of raw rows transformed at a time. Default 100000.
+        - skip_if_unchanged: (bool) - If False, transform even if the curated csv is up to date. Default True.
+
+        Returns:
+        - None
+        """
+        try:
+            if self.begin_transformation(file_name, skip_if_unchanged):
+                return None
+            rows_in, rows_out = 0, 0
+            for chunk_number, chunk in enumerate(pd.read_csv(self.get_raw_path(), chunksize = chunksize, dtype = str)):
+                self.raw_data = chunk
+                rows_in += len(chunk)
+                (self
+                .clean_restaurant_name_column()
+                .clean_datelike_col()
+                .clean_rating_column()
+                .seperate_city_state()
+                .create_country_column()
+                .drop_rename_reorder_cols()
+                .save_transformed_data(append = chunk_number > 0, keep_open = True)
+                )
+                rows_out += len(self.raw_data)
+            self.close_curated_writer()
+            report_rows(rows_in, rows_out)
+            self.record_transformation()
+        except Exception as e:
+            self.report_error(f"Error executing streaming transformation: {e}")
+
+        return None
+
 #################################################################################################################################
 # End
 #################################################################################################################################
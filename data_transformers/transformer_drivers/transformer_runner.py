@@ -0,0 +1,364 @@
+"""
+Review Aggregator
+
+Transformer Runner
+
+This file contains the TransformerRunner class. It discovers the pending raw files in data/raw, picks the transformer
+class from each file name's prefix, and runs the files across a process pool. Every file runs in its own task, so a
+file that fails is reported without stopping the others. Per file status, timing and row counts are aggregated into
+one summary, and can be appended to a report file as JSON lines.
+
+A raw file is pending unless the transform manifest shows its curated csv is up to date with the raw file's contents
+and the transformer version. Each OpenTable review file waits for the OpenTable restaurant file of the same region and
+date, whose dropped restaurants it removes, so the two are always run together; an up to date file is skipped by its
+transformer.
+
+Usage (from the repository root):
+    python data_transformers/transformer_drivers/transformer_runner.py
+    python data_transformers/transformer_drivers/transformer_runner.py --workers 8 --chunksize 100000 --report runs.jsonl
+    python data_transformers/transformer_drivers/transformer_runner.py --format parquet
+"""
+###################################################################################################################
+# libraries
+import sys
+import os
+import io
+import json
+import time
+import argparse
+import datetime
+import contextlib
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from pathlib import Path
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from data_transformers.transformer_classes.yelp_res_data_transformer import YelpResDataTransformer
+from data_transformers.transformer_classes.yelp_review_data_transformer import YelpReviewDataTransformer
+from data_transformers.transformer_classes.open_table_res_data_transformer import OpenTableResDataTransformer
+from data_transformers.transformer_classes.open_table_review_data_transformer import OpenTableReviewDataTransformer
+from data_transformers.transformer_classes.transform_manifest import get_manifest
+from data_transformers.transformer_classes.curated_format import CURATED_FORMATS, get_curated_suffix
+from instrumentation.stage_recorder import RECORDER
+
+###################################################################################################################
+# file names
+# raw file name prefix --> transformer class
+TRANSFORMERS = {"yelp_restaurant_data_": YelpResDataTransformer,
+                "yelp_review_data_": YelpReviewDataTransformer,
+                "open_table_restaurant_data_": OpenTableResDataTransformer,
+                "open_table_review_data_": OpenTableReviewDataTransformer}
+
+def get_transformer_class(file_name:str):
+    """
+    Returns the transformer class for a raw file name, or None if no prefix matches.
+    """
+    for prefix, transformer_class in TRANSFORMERS.items():
+        if file_name.startswith(prefix):
+            return transformer_class
+    return None
+
+def get_curated_file_name(file_name:str, file_format:str = "csv") -> str:
+    """
+    Returns the name of the curated file a transformer writes for a raw file name, in the curated file format.
+    """
+    if get_transformer_class(file_name) is YelpResDataTransformer:
+        return f"{file_name.replace('.csv', '')}_CURATED{get_curated_suffix(file_format)}"
+    return f"{file_name}_CURATED{get_curated_suffix(file_format)}"
+
+def get_region_key(file_name:str) -> str:
+    """
+    Returns the part of a raw file name after its prefix, e.g., "Portland_ME_2024-07-21.csv". An OpenTable review
+    file and the OpenTable restaurant file it depends on share this key.
+    """
+    for prefix in TRANSFORMERS:
+        if file_name.startswith(prefix):
+            return file_name[len(prefix):]
+    return file_name
+
+###################################################################################################################
+# worker
+def initialize_worker(run_id:str) -> None:
+    """
+    Tags the worker's stage records with the runner's run id.
+    """
+    RECORDER.configure(RECORDER.output_path, run_id = run_id)
+
+def transform_file(home:str, file_name:str, chunksize:int = None, restaurants_to_drop_list:list = None,
+                   skip_if_unchanged:bool = True, file_format:str = "csv") -> dict:
+    """
+    Transforms one raw file. Runs in a worker process and never raises; failures are returned in the result.
+
+    The Yelp transformers print their errors instead of raising, so an error in the transformer's errors, or a
+    curated csv that was not written, also marks the file as failed.
+
+    Params:
+     * home: (str)                       - The folder holding data/raw and data/curated.
+     * file_name: (str)                  - The raw file name.
+     * chunksize: (int)                  - If set, transform in streaming mode with this many rows per chunk.
+                                           Default None, the full transformation.
+     * restaurants_to_drop_list: (list)  - For OpenTable review files, the restaurants whose reviews are removed.
+     * skip_if_unchanged: (bool)         - If False, transform even if the curated csv is up to date. Default True.
+     * file_format: (str)                - The curated file format, "csv", "parquet" or "feather". Default "csv".
+
+    Returns:
+     * result: (dict) - file_name, transformer, status ("ok", "skipped" or "error"), error, seconds, rows_in, rows_out,
+                        drop_list (OpenTable restaurant files), log (the last lines printed) and pid.
+    """
+    transformer_class = get_transformer_class(file_name)
+    result = {"file_name": file_name,
+              "transformer": transformer_class.__name__ if transformer_class else None,
+              "status": "ok",
+              "error": None,
+              "seconds": None,
+              "rows_in": None,
+              "rows_out": None,
+              "drop_list": None,
+              "log": None,
+              "pid": os.getpid()}
+
+    log = io.StringIO()
+    started_at = time.time()
+    start = time.perf_counter()
+    try:
+        RECORDER.clear()
+        with contextlib.redirect_stdout(log):
+            transformer = transformer_class(file_format)
+            transformer.HOME = Path(home)
+            args = (file_name, restaurants_to_drop_list) if transformer_class is OpenTableReviewDataTransformer else (file_name, )
+            if chunksize:
+                transformer.execute_streaming(*args, chunksize = chunksize, skip_if_unchanged = skip_if_unchanged)
+            else:
+                transformer.execute(*args, skip_if_unchanged = skip_if_unchanged)
+
+        curated_path = Path(home) / "data" / "curated" / get_curated_file_name(file_name, file_format)
+        errors = getattr(transformer, "errors", [])
+        if errors:
+            result["status"], result["error"] = "error", errors[0]
+        elif transformer.skipped:
+            result["status"] = "skipped"
+        elif not curated_path.exists() or curated_path.stat().st_mtime < started_at - 1:
+            result["status"], result["error"] = "error", f"No curated file written to {curated_path}"
+
+        if transformer_class is OpenTableResDataTransformer:
+            result["drop_list"] = transformer.drop_list
+
+        # the outermost stage, execute or execute_streaming, finishes last; in full mode set_data has the rows read
+        records = RECORDER.get_records()
+        if records:
+            result["rows_in"], result["rows_out"] = records[-1]["rows_in"], records[-1]["rows_out"]
+        if result["rows_in"] is None:
+            result["rows_in"] = next((record["rows_out"] for record in records if record["stage"].endswith(".set_data")), None)
+    except Exception as e:
+        result["status"], result["error"] = "error", f"{type(e).__name__}: {e}"
+
+    result["seconds"] = round(time.perf_counter() - start, 3)
+    result["log"] = "\n".join(log.getvalue().splitlines()[-20:])
+    return result
+
+###################################################################################################################
+# class
+class TransformerRunner:
+    """
+    Runs the transformers over every pending raw file on a process pool.
+
+    Attributes:
+     * HOME: (Path Object)      - The folder holding data/raw and data/curated. Default, the working directory.
+     * workers: (int)           - The number of worker processes. Default, the number of cores.
+     * chunksize: (int)         - If set, files are transformed in streaming mode. Default None.
+     * force: (bool)            - If True, every raw file is pending and transformed. Default False.
+     * file_format: (str)       - The curated file format, "csv", "parquet" or "feather". Default "csv".
+     * run_id: (str)            - Identifies the run in the results and the stage records.
+     * results: (list)          - One result dict per file, in finishing order.
+
+    Methods:
+     * discover_files
+     * is_pending
+     * run
+     * print_summary
+     * write_report
+    """
+
+    def __init__(self, home:Path = None, workers:int = None, chunksize:int = None, force:bool = False,
+                 file_format:str = "csv") -> None:
+        """
+        Initializer for TransformerRunner.
+
+        Params:
+         * home: (Path)      - The folder holding data/raw and data/curated. Default None, the working directory.
+         * workers: (int)    - The number of worker processes. Default None, the number of cores.
+         * chunksize: (int)  - If set, transform in streaming mode with this many rows per chunk. Default None.
+         * force: (bool)     - If True, transform every raw file, pending or not. Default False.
+         * file_format: (str) - The curated file format, "csv", "parquet" or "feather". Default "csv".
+        """
+        self.HOME = Path(home) if home else Path.cwd()
+        self.workers = workers or os.cpu_count()
+        self.chunksize = chunksize
+        self.force = force
+        self.file_format = file_format
+        self.run_id = datetime.datetime.now().strftime("%Y%m%dT%H%M%S")
+        self.results = []
+        self.manifest = get_manifest(self.HOME)
+
+    def is_pending(self, file_name:str) -> bool:
+        """
+        Returns True unless the transform manifest shows the raw file's curated csv is up to date with the raw file's
+        contents and the transformer version. OpenTable review files are checked with the restaurants their entry
+        was recorded with; a changed drop list is caught when the restaurant file is rerun.
+        """
+        if self.force:
+            return True
+        transformer_class = get_transformer_class(file_name)
+        entry = self.manifest.get_entry(file_name, get_curated_suffix(self.file_format))
+        return not self.manifest.is_up_to_date(self.HOME / "data" / "raw" / file_name,
+                                               self.HOME / "data" / "curated" / get_curated_file_name(file_name, self.file_format),
+                                               transformer_class.__name__, transformer_class.TRANSFORMER_VERSION,
+                                               entry["params"] if entry else None)
+
+    def discover_files(self) -> list:
+        """
+        Returns the pending raw csv's with a known prefix, sorted by name. The OpenTable restaurant and review files
+        of a region and date are included together if either is pending: the review file needs the restaurants the
+        restaurant file dropped, and those may have changed. Raw files with an unknown prefix are reported and left
+        out.
+        """
+        raw_files = sorted(path.name for path in (self.HOME / "data" / "raw").glob("*.csv"))
+        for file_name in raw_files:
+            if get_transformer_class(file_name) is None:
+                print(f"Skipping {file_name}, no transformer for its prefix")
+        raw_files = [file_name for file_name in raw_files if get_transformer_class(file_name) is not None]
+
+        pending = {file_name for file_name in raw_files if self.is_pending(file_name)}
+        open_table_files = {}
+        for file_name in raw_files:
+            if get_transformer_class(file_name) in (OpenTableResDataTransformer, OpenTableReviewDataTransformer):
+                open_table_files.setdefault(get_region_key(file_name), []).append(file_name)
+        for file_name in list(pending):
+            if get_transformer_class(file_name) in (OpenTableResDataTransformer, OpenTableReviewDataTransformer):
+                pending.update(open_table_files[get_region_key(file_name)])
+        return sorted(pending)
+
+    def run(self, file_names:list = None) -> list:
+        """
+        Transforms the files on the process pool and collects one result per file. OpenTable review files are
+        submitted once their restaurant file has finished; if it failed, the review file is failed too. A review file
+        without a restaurant file in the run is transformed without dropping any restaurants.
+
+        Params:
+         * file_names: (list) - Raw file names. Default None, the pending files from discover_files.
+
+        Returns:
+         * results: (list) - One result dict per file, see transform_file.
+        """
+        file_names = self.discover_files() if file_names is None else file_names
+        self.results = []
+        if not file_names:
+            print("No pending raw files")
+            return self.results
+
+        restaurant_keys = {get_region_key(file_name) for file_name in file_names
+                           if get_transformer_class(file_name) is OpenTableResDataTransformer}
+        waiting_reviews = {}
+
+        with ProcessPoolExecutor(max_workers = min(self.workers, len(file_names)), initializer = initialize_worker,
+                                 initargs = (self.run_id, )) as pool:
+            futures = {}
+            for file_name in file_names:
+                is_review = get_transformer_class(file_name) is OpenTableReviewDataTransformer
+                if is_review and get_region_key(file_name) in restaurant_keys:
+                    waiting_reviews[get_region_key(file_name)] = file_name
+                    continue
+                if is_review:
+                    print(f"No OpenTable restaurant file for {file_name}, no restaurants are dropped")
+                futures[pool.submit(transform_file, str(self.HOME), file_name, self.chunksize, None, not self.force,
+                                    self.file_format)] = file_name
+
+            while futures:
+                done, _ = wait(futures, return_when = FIRST_COMPLETED)
+                for future in done:
+                    file_name = futures.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e: # the worker process died, e.g., out of memory
+                        result = {"file_name": file_name, "transformer": getattr(get_transformer_class(file_name), "__name__", None),
+                                  "status": "error", "error": f"{type(e).__name__}: {e}"}
+                    self.results.append(result)
+                    print(f"{result['status']:<7} {file_name}")
+
+                    # Only an OpenTable restaurant file releases its review file; a Yelp file can share its region key
+                    if get_transformer_class(file_name) is not OpenTableResDataTransformer:
+                        continue
+                    review_file = waiting_reviews.pop(get_region_key(file_name), None)
+                    if review_file is None:
+                        continue
+                    if result["status"] in ("ok", "skipped"):
+                        futures[pool.submit(transform_file, str(self.HOME), review_file, self.chunksize,
+                                            result["drop_list"], not self.force, self.file_format)] = review_file
+                    else:
+                        self.results.append({"file_name": review_file, "transformer": OpenTableReviewDataTransformer.__name__,
+                                             "status": "error", "error": f"Restaurant file {file_name} failed"})
+                        print(f"{'error':<7} {review_file}")
+
+        # Report any review file no restaurant file released as failed, like other worker errors
+        for review_file in sorted(waiting_reviews.values()):
+            self.results.append({"file_name": review_file, "transformer": OpenTableReviewDataTransformer.__name__,
+                                 "status": "error", "error": "Never submitted, no OpenTable restaurant file of its region and date released it"})
+            print(f"{'error':<7} {review_file}")
+        return self.results
+
+    def print_summary(self) -> None:
+        """
+        Prints the status, time and row counts of every file, then the failures.
+        """
+        print()
+        print("-" * 110)
+        print(f"{'file':<60} {'status':<7} {'seconds':>9} {'rows in':>10} {'rows out':>10}")
+        for result in sorted(self.results, key = lambda result: result["file_name"]):
+            seconds = f"{result['seconds']:.3f}" if result.get("seconds") is not None else ""
+            rows_in = result.get("rows_in") if result.get("rows_in") is not None else ""
+            rows_out = result.get("rows_out") if result.get("rows_out") is not None else ""
+            print(f"{result['file_name']:<60} {result['status']:<7} {seconds:>9} {rows_in:>10} {rows_out:>10}")
+        failed = [result for result in self.results if result["status"] == "error"]
+        skipped = [result for result in self.results if result["status"] == "skipped"]
+        print(f"{len(self.results) - len(failed) - len(skipped)} of {len(self.results)} files transformed, "
+              f"{len(skipped)} up to date")
+        for result in failed:
+            print(f"\t{result['file_name']}: {result['error']}")
+        print("-" * 110)
+
+    def write_report(self, report_path:Path) -> None:
+        """
+        Appends one JSON line per file to report_path, tagged with the run id.
+        """
+        with open(report_path, "a") as file:
+            for result in self.results:
+                file.write(json.dumps(dict(result, run_id = self.run_id), default = str) + "\n")
+
+###################################################################################################################
+# main
+def main():
+    """
+    Transform every pending raw file.
+    """
+    parser = argparse.ArgumentParser(description = "Transform the pending raw files in data/raw on a process pool.")
+    parser.add_argument("--home", help = "Folder holding data/raw and data/curated. Default, the working directory.")
+    parser.add_argument("--workers", type = int, help = "Worker processes. Default, the number of cores.")
+    parser.add_argument("--chunksize", type = int, help = "Transform in streaming mode with this many rows per chunk.")
+    parser.add_argument("--force", action = "store_true", help = "Transform every raw file, even if up to date.")
+    parser.add_argument("--format", choices = list(CURATED_FORMATS), default = "csv",
+                        help = "Curated file format. parquet and feather keep the column types and require pyarrow.")
+    parser.add_argument("--report", help = "File the per file results are appended to, as JSON lines.")
+    args = parser.parse_args()
+
+    runner = TransformerRunner(args.home, args.workers, args.chunksize, args.force, args.format)
+    start = time.perf_counter()
+    runner.run()
+    runner.print_summary()
+    print(f"Wall time: {time.perf_counter() - start:.3f} s")
+
+    if args.report:
+        runner.write_report(Path(args.report))
+    if any(result["status"] == "error" for result in runner.results):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
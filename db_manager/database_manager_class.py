@@ -6,7 +6,8 @@ Joseph Nelson Farrell
 Restaurant Review Data Base Class
 
 This file contains RestaurantReviewDB class. This class manages the restaurant review database. It creates the database,
-inserts the date, and allows querying.
+inserts the date, and allows querying. It also contains ConnectionPool, a small pool of connections for multi-threaded
+readers.
 """
 #################################################################################################################################
 # Packages
@@ -16,8 +17,20 @@ from pathlib import Path
 import os
 import csv
 import ast
+import hashlib
+import datetime
+import json
+import shutil
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
 import pandas as pd
 
+from instrumentation.stage_recorder import timed_stage, report_rows
+
 #################################################################################################################################
 # Class
 #################################################################################################################################
@@ -41,24 +54,305 @@ class RestaurantReviewDB:
                                                    using setter method.
      * open_table_review_data: (Path Object)     - The path to the OpenTable review data. Set with string file name using
                                                    using setter method.
+     * key_cache: (dict)                         - Surrogate key cache shared by the loaders. Maps lookup table name to a
+                                                   dict of natural key to id.
+     * key_cache_hits: (int)                     - The number of lookups served from the key cache.
+     * key_cache_misses: (int)                   - The number of lookups that fell through to the database.
+     * bulk_load_pragmas: (dict)                 - The PRAGMA settings applied to every connection while in bulk load mode,
+                                                   None outside of bulk load mode.
+     * saved_journal_mode: (str)                 - The journal mode in place before bulk load mode, restored afterwards.
+     * session_depth: (int)                      - The number of open sessions. While > 0 one long-lived connection is
+                                                   shared by every method instead of connecting per call.
+     * read_pool: (ConnectionPool)               - Pool of read-only connections used by query when set.
+     * query_cache: (OrderedDict)                - LRU cache of query results keyed on (SQL, params). Cleared whenever a
+                                                   load method writes to the database.
+     * query_cache_size: (int)                   - The maximum number of cached results. 0 disables the cache.
 
     Methods:
      * set_yelp_data
      * set_open_table_data
+     * get_db_file_path
      * connect
+     * disconnect
+     * open_session
+     * close_session
+     * session
+     * open_read_pool
+     * close_read_pool
+     * read_service
+     * set_query_cache_size
+     * invalidate_query_cache
+     * begin_bulk_load
+     * end_bulk_load
+     * bulk_load_mode
+     * warm_key_cache
+     * get_key
+     * clear_key_cache
+     * get_key_cache_stats
      * create_tables
+     * get_schema_version
+     * migrate
+     * explain_lookup_queries
+     * compact_reviewer_table
+     * get_review_hash
+     * get_file_hash
+     * get_load_log_entry
+     * record_load
      * load_site_origin_table
      * load_region_table
      * load_tags_table
      * load_price_point_table
+     * build_open_table_restaurant_index
      * load_restaurant_table
+     * parse_tags
      * load_res_tags_table
      * load_reviewer_table
      * load_restaurant_review_table
      * load_aux_rating_table
+     * read_typed_curated_columns
+     * open_curated
+     * read_curated_columns
+     * rollback_load
+     * load_all
      * query
+     * fetch_dataframe
+     * read_cursor
+     * query_iter
+     * query_chunks
+     * rebuild_rating_summary
+     * get_rating_summary
+     * search_reviews
+     * get_export_dir
+     * get_arrow_schema
+     * write_parquet_stream
+     * export_tables_to_parquet
+     * export_review_facts_to_parquet
     """
 
+    # The natural key column of each lookup table served by the key cache
+    KEY_COLUMNS = {"reviewer": "name",
+                   "restaurant": "name",
+                   "site_origin": "site_name",
+                   "tag": "name",
+                   "price_point": "price_point"}
+
+    # Collapses reviewers that share a natural key (name, hometown) into the row with the lowest id and points their
+    # reviews at that row. Used by migration 2 and compact_reviewer_table.
+    COMPACT_REVIEWER_STATEMENTS = ["CREATE TEMP TABLE IF NOT EXISTS reviewer_map(old_id INTEGER PRIMARY KEY, keep_id INTEGER)",
+                                   "DELETE FROM temp.reviewer_map",
+                                   """
+                                   INSERT INTO temp.reviewer_map(old_id, keep_id)
+                                   SELECT R.id, K.keep_id
+                                   FROM reviewer AS R
+                                   JOIN (SELECT MIN(id) AS keep_id, name, IFNULL(hometown, '') AS hometown_key
+                                         FROM reviewer
+                                         GROUP BY name, IFNULL(hometown, '')) AS K
+                                     ON R.name = K.name AND IFNULL(R.hometown, '') = K.hometown_key
+                                   WHERE R.id != K.keep_id
+                                   """,
+                                   """
+                                   UPDATE res_review
+                                   SET reviewer_id = (SELECT keep_id FROM temp.reviewer_map WHERE old_id = res_review.reviewer_id)
+                                   WHERE reviewer_id IN (SELECT old_id FROM temp.reviewer_map)
+                                   """,
+                                   "DELETE FROM reviewer WHERE id IN (SELECT old_id FROM temp.reviewer_map)",
+                                   "DROP TABLE temp.reviewer_map"]
+
+    # Curated file suffixes read with pyarrow as typed columns; anything else is read as a csv
+    TYPED_CURATED_SUFFIXES = (".parquet", ".feather")
+
+    # Recomputes the materialized restaurant_rating_summary from res_review and open_table_category_rating. Used by
+    # migration 4 and rebuild_rating_summary; afterwards the triggers keep the summary up to date.
+    REBUILD_RATING_SUMMARY_STATEMENTS = ["DELETE FROM restaurant_rating_summary",
+                                         """
+                                         INSERT INTO restaurant_rating_summary(restaurant_id, site_origin_id, review_count,
+                                                                               rating_count, rating_sum)
+                                         SELECT restaurant_id, site_origin_id, COUNT(*), COUNT(rating), IFNULL(SUM(rating), 0)
+                                         FROM res_review
+                                         GROUP BY restaurant_id, site_origin_id
+                                         """,
+                                         """
+                                         UPDATE restaurant_rating_summary AS S
+                                         SET food_count = C.food_count, food_sum = C.food_sum,
+                                             service_count = C.service_count, service_sum = C.service_sum,
+                                             ambience_count = C.ambience_count, ambience_sum = C.ambience_sum
+                                         FROM (SELECT R.restaurant_id, R.site_origin_id,
+                                                      COUNT(O.food) AS food_count, IFNULL(SUM(O.food), 0) AS food_sum,
+                                                      COUNT(O.service) AS service_count, IFNULL(SUM(O.service), 0) AS service_sum,
+                                                      COUNT(O.ambience) AS ambience_count, IFNULL(SUM(O.ambience), 0) AS ambience_sum
+                                               FROM open_table_category_rating AS O
+                                               JOIN res_review AS R ON R.id = O.review_id
+                                               GROUP BY R.restaurant_id, R.site_origin_id) AS C
+                                         WHERE S.restaurant_id = C.restaurant_id AND S.site_origin_id = C.site_origin_id
+                                         """]
+
+    # Versioned schema migrations, applied in order by migrate. The version reached is stored in PRAGMA user_version.
+    # To modify the structure of an existing database, append a new (version, [statements]) entry.
+    MIGRATIONS = [(1, ["CREATE INDEX IF NOT EXISTS idx_reviewer_name ON reviewer(name)",
+                       "CREATE INDEX IF NOT EXISTS idx_restaurant_name ON restaurant(name)",
+                       "CREATE INDEX IF NOT EXISTS idx_res_review_reviewer_date_restaurant ON res_review(reviewer_id, date, restaurant_id)"]),
+                  (2, COMPACT_REVIEWER_STATEMENTS +
+                      ["CREATE UNIQUE INDEX IF NOT EXISTS idx_reviewer_natural_key ON reviewer(name, IFNULL(hometown, ''))"]),
+                  (3, ["ALTER TABLE res_review ADD COLUMN review_hash TEXT",
+                       "UPDATE res_review SET review_hash = review_hash(review_text)",
+                       "CREATE TEMP TABLE IF NOT EXISTS review_map(old_id INTEGER PRIMARY KEY, keep_id INTEGER)",
+                       "DELETE FROM temp.review_map",
+                       """
+                       INSERT INTO temp.review_map(old_id, keep_id)
+                       SELECT R.id, K.keep_id
+                       FROM res_review AS R
+                       JOIN (SELECT MIN(id) AS keep_id, restaurant_id, reviewer_id, date, site_origin_id, review_hash
+                             FROM res_review
+                             GROUP BY restaurant_id, reviewer_id, date, site_origin_id, review_hash) AS K
+                         ON R.restaurant_id IS K.restaurant_id AND R.reviewer_id IS K.reviewer_id AND R.date IS K.date
+                            AND R.site_origin_id IS K.site_origin_id AND R.review_hash IS K.review_hash
+                       WHERE R.id != K.keep_id
+                       """,
+                       """
+                       UPDATE open_table_category_rating
+                       SET review_id = (SELECT keep_id FROM temp.review_map WHERE old_id = open_table_category_rating.review_id)
+                       WHERE review_id IN (SELECT old_id FROM temp.review_map)
+                       """,
+                       "DELETE FROM res_review WHERE id IN (SELECT old_id FROM temp.review_map)",
+                       "DROP TABLE temp.review_map",
+                       """
+                       CREATE UNIQUE INDEX IF NOT EXISTS idx_res_review_natural_key
+                       ON res_review(restaurant_id, reviewer_id, date, site_origin_id, review_hash)
+                       """,
+                       """
+                       CREATE TABLE IF NOT EXISTS load_log(
+                               file_name TEXT PRIMARY KEY,
+                               file_hash TEXT,
+                               rows_read INTEGER,
+                               rows_inserted INTEGER,
+                               completed INTEGER,
+                               loaded_at TEXT
+                               )
+                       """]),
+                  (4, ["""
+                       CREATE TABLE IF NOT EXISTS restaurant_rating_summary(
+                               restaurant_id INTEGER,
+                               site_origin_id INTEGER,
+                               review_count INTEGER NOT NULL DEFAULT 0,
+                               rating_count INTEGER NOT NULL DEFAULT 0,
+                               rating_sum INTEGER NOT NULL DEFAULT 0,
+                               food_count INTEGER NOT NULL DEFAULT 0,
+                               food_sum INTEGER NOT NULL DEFAULT 0,
+                               service_count INTEGER NOT NULL DEFAULT 0,
+                               service_sum INTEGER NOT NULL DEFAULT 0,
+                               ambience_count INTEGER NOT NULL DEFAULT 0,
+                               ambience_sum INTEGER NOT NULL DEFAULT 0,
+                               PRIMARY KEY (restaurant_id, site_origin_id),
+                               FOREIGN KEY(restaurant_id) REFERENCES restaurant(id),
+                               FOREIGN KEY(site_origin_id) REFERENCES site_origin(id)
+                               )
+                       """] +
+                      REBUILD_RATING_SUMMARY_STATEMENTS +
+                      ["""
+                       CREATE TRIGGER IF NOT EXISTS trg_res_review_summary_insert AFTER INSERT ON res_review
+                       BEGIN
+                           INSERT INTO restaurant_rating_summary(restaurant_id, site_origin_id, review_count, rating_count, rating_sum)
+                           VALUES (NEW.restaurant_id, NEW.site_origin_id, 1, NEW.rating IS NOT NULL, IFNULL(NEW.rating, 0))
+                           ON CONFLICT(restaurant_id, site_origin_id) DO UPDATE SET
+                               review_count = review_count + 1,
+                               rating_count = rating_count + excluded.rating_count,
+                               rating_sum = rating_sum + excluded.rating_sum;
+                       END
+                       """,
+                       """
+                       CREATE TRIGGER IF NOT EXISTS trg_res_review_summary_delete AFTER DELETE ON res_review
+                       BEGIN
+                           UPDATE restaurant_rating_summary
+                           SET review_count = review_count - 1,
+                               rating_count = rating_count - (OLD.rating IS NOT NULL),
+                               rating_sum = rating_sum - IFNULL(OLD.rating, 0)
+                           WHERE restaurant_id = OLD.restaurant_id AND site_origin_id = OLD.site_origin_id;
+                       END
+                       """,
+                       """
+                       CREATE TRIGGER IF NOT EXISTS trg_res_review_summary_update
+                       AFTER UPDATE OF restaurant_id, site_origin_id, rating ON res_review
+                       BEGIN
+                           UPDATE restaurant_rating_summary
+                           SET review_count = review_count - 1,
+                               rating_count = rating_count - (OLD.rating IS NOT NULL),
+                               rating_sum = rating_sum - IFNULL(OLD.rating, 0)
+                           WHERE restaurant_id = OLD.restaurant_id AND site_origin_id = OLD.site_origin_id;
+                           INSERT INTO restaurant_rating_summary(restaurant_id, site_origin_id, review_count, rating_count, rating_sum)
+                           VALUES (NEW.restaurant_id, NEW.site_origin_id, 1, NEW.rating IS NOT NULL, IFNULL(NEW.rating, 0))
+                           ON CONFLICT(restaurant_id, site_origin_id) DO UPDATE SET
+                               review_count = review_count + 1,
+                               rating_count = rating_count + excluded.rating_count,
+                               rating_sum = rating_sum + excluded.rating_sum;
+                       END
+                       """,
+                       """
+                       CREATE TRIGGER IF NOT EXISTS trg_category_rating_summary_insert AFTER INSERT ON open_table_category_rating
+                       BEGIN
+                           UPDATE restaurant_rating_summary
+                           SET food_count = food_count + (NEW.food IS NOT NULL),
+                               food_sum = food_sum + IFNULL(NEW.food, 0),
+                               service_count = service_count + (NEW.service IS NOT NULL),
+                               service_sum = service_sum + IFNULL(NEW.service, 0),
+                               ambience_count = ambience_count + (NEW.ambience IS NOT NULL),
+                               ambience_sum = ambience_sum + IFNULL(NEW.ambience, 0)
+                           WHERE (restaurant_id, site_origin_id) = (SELECT restaurant_id, site_origin_id FROM res_review WHERE id = NEW.review_id);
+                       END
+                       """,
+                       """
+                       CREATE TRIGGER IF NOT EXISTS trg_category_rating_summary_delete AFTER DELETE ON open_table_category_rating
+                       BEGIN
+                           UPDATE restaurant_rating_summary
+                           SET food_count = food_count - (OLD.food IS NOT NULL),
+                               food_sum = food_sum - IFNULL(OLD.food, 0),
+                               service_count = service_count - (OLD.service IS NOT NULL),
+                               service_sum = service_sum - IFNULL(OLD.service, 0),
+                               ambience_count = ambience_count - (OLD.ambience IS NOT NULL),
+                               ambience_sum = ambience_sum - IFNULL(OLD.ambience, 0)
+                           WHERE (restaurant_id, site_origin_id) = (SELECT restaurant_id, site_origin_id FROM res_review WHERE id = OLD.review_id);
+                       END
+                       """]),
+                  (5, ["""
+                       CREATE VIRTUAL TABLE IF NOT EXISTS review_fts USING fts5(
+                               review_text,
+                               content = 'res_review',
+                               content_rowid = 'id',
+                               tokenize = 'porter unicode61'
+                               )
+                       """,
+                       "INSERT INTO review_fts(review_fts) VALUES ('rebuild')",
+                       """
+                       CREATE TRIGGER IF NOT EXISTS trg_res_review_fts_insert AFTER INSERT ON res_review
+                       BEGIN
+                           INSERT INTO review_fts(rowid, review_text) VALUES (NEW.id, NEW.review_text);
+                       END
+                       """,
+                       """
+                       CREATE TRIGGER IF NOT EXISTS trg_res_review_fts_delete AFTER DELETE ON res_review
+                       BEGIN
+                           INSERT INTO review_fts(review_fts, rowid, review_text) VALUES ('delete', OLD.id, OLD.review_text);
+                       END
+                       """,
+                       """
+                       CREATE TRIGGER IF NOT EXISTS trg_res_review_fts_update AFTER UPDATE OF review_text ON res_review
+                       BEGIN
+                           INSERT INTO review_fts(review_fts, rowid, review_text) VALUES ('delete', OLD.id, OLD.review_text);
+                           INSERT INTO review_fts(rowid, review_text) VALUES (NEW.id, NEW.review_text);
+                       END
+                       """]),
+                  (6, ["""
+                       DELETE FROM open_table_category_rating
+                       WHERE review_id IS NOT NULL
+                         AND id NOT IN (SELECT MIN(id) FROM open_table_category_rating GROUP BY review_id)
+                       """,
+                       "CREATE UNIQUE INDEX IF NOT EXISTS idx_category_rating_review ON open_table_category_rating(review_id)"])]
+
+    # The lookups issued per row by the loaders, checked by explain_lookup_queries
+    LOOKUP_QUERIES = {"reviewer_by_name": ("SELECT id FROM reviewer WHERE name = ?", ("", )),
+                      "restaurant_by_name": ("SELECT id FROM restaurant WHERE name = ?", ("", )),
+                      "review_by_reviewer_date_restaurant": ("SELECT id FROM res_review WHERE reviewer_id = ? AND date = ? AND restaurant_id = ?",
+                                                             (0, "", 0))}
+
     def __init__(self, db_file_name) -> None:
         """
         Initializer for RestaurantReviewDB
@@ -74,6 +368,22 @@ class RestaurantReviewDB:
         self.yelp_review_data = None
         self.open_table_restaurant_data = None
         self.open_table_review_data = None
+        self.key_cache = {}
+        self.key_cache_hits = 0
+        self.key_cache_misses = 0
+        self.bulk_load_pragmas = None
+        self.saved_journal_mode = None
+        self.session_depth = 0
+        self.read_pool = None
+        self.query_cache = OrderedDict()
+        self.query_cache_size = 0
+        self.query_cache_lock = threading.Lock()
+
+    def __enter__(self):
+        return self.open_session()
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close_session()
 
     def set_yelp_data(self, review_data_file_name:str, restaurant_data_file_name) -> None:
         """
@@ -103,9 +413,12 @@ class RestaurantReviewDB:
         self.open_table_review_data = CURATED_FOLDER_PATH / review_data_file_name
         return self
     
-    def connect(self) -> None:
+    def get_db_file_path(self) -> Path:
         """
-        Created connection to database. Sets connection and cur attributes.
+        Returns the path to the database file, creating the database folder if it does not exist.
+
+        Returns:
+         * DB_FILE_PATH: (Path Object) - The path to the database file.
         """
         # set the path to the db folder
         DB_FOLDER_PATH = self.HOME / "data" / "database"
@@ -115,15 +428,281 @@ class RestaurantReviewDB:
 
         # set path to db file
         DB_FILE_PATH = DB_FOLDER_PATH / self.file_name
+        return DB_FILE_PATH
+
+    def connect(self) -> None:
+        """
+        Created connection to database. Sets connection and cur attributes. Inside a session the open connection is
+        reused.
+        """
+        if self.session_depth > 0 and self.connection is not None:
+            return self
 
         # connect to db
-        self.connection = sqlite3.connect(str(DB_FILE_PATH))
+        self.connection = sqlite3.connect(str(self.get_db_file_path()))
         self.cur = self.connection.cursor()
+
+        # make the review key hash available to SQL, e.g., for backfilling res_review.review_hash
+        self.connection.create_function("review_hash", 1, self.get_review_hash, deterministic = True)
+
+        # PRAGMA settings are per connection, so bulk load settings are reapplied on every connect
+        if self.bulk_load_pragmas:
+            for pragma, value in self.bulk_load_pragmas.items():
+                self.cur.execute(f"PRAGMA {pragma} = {value}")
+        return self
+
+    def disconnect(self) -> None:
+        """
+        Closes the connection opened by connect. Inside a session the connection is kept open, but any transaction the
+        calling method left uncommitted is rolled back, just as closing the connection would.
+        """
+        if self.connection is None:
+            return self
+        if self.session_depth > 0:
+            if self.connection.in_transaction:
+                self.connection.rollback()
+
+            # replace the cursor so no partially fetched statement stays active on the shared connection
+            self.cur.close()
+            self.cur = self.connection.cursor()
+            return self
+        self.connection.close()
+        self.connection = None
+        return self
+
+    def open_session(self) -> None:
+        """
+        Opens a long-lived connection that every method shares until close_session, so a full load sequence or a burst
+        of queries reuses one connection and its page cache. Sessions nest.
+        """
+        if self.session_depth == 0:
+            self.connect()
+        self.session_depth += 1
+        return self
+
+    def close_session(self) -> None:
+        """
+        Closes the long-lived connection once the outermost session ends.
+        """
+        if self.session_depth == 0:
+            return self
+        self.session_depth -= 1
+        if self.session_depth == 0:
+            self.disconnect()
+        return self
+
+    @contextmanager
+    def session(self):
+        """
+        Context manager wrapping open_session and close_session. The RestaurantReviewDB object itself can also be used
+        in a with statement.
+        """
+        self.open_session()
+        try:
+            yield self
+        finally:
+            self.close_session()
+
+    def open_read_pool(self, size:int = 4) -> None:
+        """
+        Opens a pool of read-only connections. While open, query borrows a connection from the pool, so it can be
+        called from several threads at once.
+
+        Params:
+         * size: (int) - The number of connections in the pool. Default 4.
+        """
+        if self.read_pool is None:
+            self.read_pool = ConnectionPool(self.get_db_file_path(), size = size, read_only = True)
+        return self
+
+    def close_read_pool(self) -> None:
+        """
+        Closes every connection in the read pool.
+        """
+        if self.read_pool is not None:
+            self.read_pool.close()
+            self.read_pool = None
+        return self
+
+    def read_service(self, workers:int = 4) -> "ReadQueryService":
+        """
+        Returns a ReadQueryService over this database, for running many read queries concurrently, e.g., while a
+        loader writes. The service is started by using it in a with statement.
+
+        Params:
+         * workers: (int) - The number of worker threads and read-only connections. Default 4.
+
+        Returns:
+         * service: (ReadQueryService) - The read service.
+
+        Example:
+         * with ResDB.read_service(workers = 8) as service:
+               futures = [service.submit(query, params) for params in param_list]
+        """
+        return ReadQueryService(self.get_db_file_path(), workers = workers)
+
+    def set_query_cache_size(self, max_entries:int) -> None:
+        """
+        Sets the size of the query result cache. Results of query calls made with use_cache = True are kept until
+        max_entries newer results push them out or a load method writes to the database.
+
+        Params:
+         * max_entries: (int) - The maximum number of cached results. 0 disables the cache.
+        """
+        with self.query_cache_lock:
+            self.query_cache_size = max_entries
+            while len(self.query_cache) > max_entries:
+                self.query_cache.popitem(last = False)
         return self
 
+    def invalidate_query_cache(self) -> None:
+        """
+        Empties the query result cache. Called by every method that writes to the database.
+        """
+        with self.query_cache_lock:
+            self.query_cache.clear()
+        return self
+
+    def begin_bulk_load(self, synchronous:str = "OFF", cache_size_kib:int = 262144) -> None:
+        """
+        Enters bulk load mode for building a fresh database. Switches the database to WAL journaling and has every
+        subsequent connection skip or relax fsyncs, use a large page cache and keep temporary tables in memory.
+        A crash during bulk load mode can corrupt the database (synchronous = OFF), so only use it for builds that
+        can be rerun from the curated data. Call end_bulk_load afterwards.
+
+        Params:
+         * synchronous: (str)    - "OFF" or "NORMAL". Default "OFF".
+         * cache_size_kib: (int) - The page cache size in KiB. Default 256 MiB.
+        """
+        if synchronous not in ("OFF", "NORMAL"):
+            raise ValueError(f"synchronous must be 'OFF' or 'NORMAL', got {synchronous}")
+
+        self.connect()
+        try:
+            self.saved_journal_mode = self.cur.execute("PRAGMA journal_mode").fetchone()[0]
+            self.cur.execute("PRAGMA journal_mode = WAL")
+        finally:
+            self.disconnect()
+
+        # negative cache_size is interpreted by SQLite as KiB
+        self.bulk_load_pragmas = {"synchronous": synchronous,
+                                  "cache_size": -int(cache_size_kib),
+                                  "temp_store": "MEMORY"}
+
+        # a session connection is already open, so apply the settings to it directly
+        if self.session_depth > 0:
+            for pragma, value in self.bulk_load_pragmas.items():
+                self.cur.execute(f"PRAGMA {pragma} = {value}")
+        return self
+
+    def end_bulk_load(self) -> None:
+        """
+        Leaves bulk load mode. New connections go back to the safe defaults, the journal mode in place before
+        begin_bulk_load is restored, the review full-text index is merged into a single segment and ANALYZE is run so
+        the query planner has statistics for the new data.
+        """
+        self.bulk_load_pragmas = None
+        journal_mode = self.saved_journal_mode or "DELETE"
+
+        self.connect()
+        try:
+            self.cur.execute("PRAGMA synchronous = FULL")
+            self.cur.execute("PRAGMA cache_size = -2000")
+            self.cur.execute("PRAGMA temp_store = DEFAULT")
+            if self.cur.execute("SELECT 1 FROM sqlite_master WHERE name = 'review_fts'").fetchone():
+                self.cur.execute("INSERT INTO review_fts(review_fts) VALUES ('optimize')")
+            self.cur.execute("ANALYZE")
+            self.connection.commit()
+            restored_mode = self.cur.execute(f"PRAGMA journal_mode = {journal_mode}").fetchone()[0]
+            if restored_mode.upper() != journal_mode.upper():
+                print(f"Warning: journal mode could not be restored to {journal_mode}, still {restored_mode}")
+        finally:
+            self.disconnect()
+        self.saved_journal_mode = None
+        return self
+
+    @contextmanager
+    def bulk_load_mode(self, synchronous:str = "OFF", cache_size_kib:int = 262144):
+        """
+        Context manager wrapping begin_bulk_load and end_bulk_load. Safe settings are restored even if a loader raises.
+
+        Params:
+         * synchronous: (str)    - "OFF" or "NORMAL". Default "OFF".
+         * cache_size_kib: (int) - The page cache size in KiB. Default 256 MiB.
+        """
+        self.begin_bulk_load(synchronous, cache_size_kib)
+        try:
+            yield self
+        finally:
+            self.end_bulk_load()
+
+    def warm_key_cache(self, table:str) -> None:
+        """
+        Loads an entire lookup table into the key cache with one query. When a natural key appears more than once
+        the lowest id is kept, matching "SELECT id ... WHERE name = ?". Requires an open connection.
+
+        Params:
+         * table: (str) - The lookup table name, a key of KEY_COLUMNS.
+        """
+        column = self.KEY_COLUMNS[table]
+        table_cache = self.key_cache.setdefault(table, {})
+        for key_id, key in self.cur.execute(f"SELECT id, {column} FROM {table} ORDER BY id"):
+            table_cache.setdefault(key, key_id)
+        return self
+
+    def get_key(self, table:str, key:str):
+        """
+        Returns the id for a natural key in a lookup table. The key cache is checked first, on a miss the database
+        is queried and the result cached. Keys that are not found are not cached, so rows inserted by a later loader
+        are still picked up. Requires an open connection.
+
+        Params:
+         * table: (str) - The lookup table name, a key of KEY_COLUMNS.
+         * key: (str)   - The natural key, e.g., the reviewer name.
+
+        Returns:
+         * key_id: (int) - The id of the row, None if the key is not in the table.
+        """
+        table_cache = self.key_cache.setdefault(table, {})
+        key_id = table_cache.get(key)
+        if key_id is not None:
+            self.key_cache_hits += 1
+            return key_id
+
+        self.key_cache_misses += 1
+        self.cur.execute(f"SELECT id FROM {table} WHERE {self.KEY_COLUMNS[table]} = ?", (key, ))
+        key_id = self.cur.fetchone()
+        if not key_id:
+            return None
+        table_cache[key] = key_id[0]
+        return key_id[0]
+
+    def clear_key_cache(self) -> None:
+        """
+        Empties the key cache and resets the counters. Required if the database is rebuilt under the same object.
+        """
+        self.key_cache = {}
+        self.key_cache_hits = 0
+        self.key_cache_misses = 0
+        return self
+
+    def get_key_cache_stats(self) -> dict:
+        """
+        Reports the effect of the key cache.
+
+        Returns:
+         * stats: (dict) - Hits, misses and the number of cached keys per table.
+        """
+        stats = {"hits": self.key_cache_hits,
+                 "misses": self.key_cache_misses,
+                 "cached_keys": {table: len(keys) for table, keys in self.key_cache.items()}}
+        return stats
+
+    @timed_stage("db")
     def create_tables(self) -> None:
         """
-        Creates database tables, if they do not exist. This is where the structure of the database can be modified.
+        Creates database tables, if they do not exist, then applies any pending migrations. New tables are defined
+        here, changes to existing databases (indexes, columns) are added to MIGRATIONS.
         """
         # connect to db
         self.connect()
@@ -215,9 +794,174 @@ class RestaurantReviewDB:
         
         for table in tables_list:
             self.cur.execute(table)
-        self.connection.close()
+        self.invalidate_query_cache()
+        self.disconnect()
+
+        # bring existing databases up to date
+        self.migrate()
         return self
+
+    def get_schema_version(self) -> int:
+        """
+        Returns the schema version of the database, i.e., the last migration applied.
+
+        Returns:
+         * version: (int) - The value of PRAGMA user_version.
+        """
+        self.connect()
+        try:
+            version = self.cur.execute("PRAGMA user_version").fetchone()[0]
+        finally:
+            self.disconnect()
+        return version
+
+    def migrate(self) -> None:
+        """
+        Applies the MIGRATIONS newer than the database's schema version. Each migration runs in its own transaction
+        together with the user_version update, so a failed migration leaves the database at the previous version.
+        """
+        current_version = self.get_schema_version()
+        try:
+            self.connect()
+            for version, statements in self.MIGRATIONS:
+                if version <= current_version:
+                    continue
+                try:
+                    self.connection.execute("BEGIN")
+                    for statement in statements:
+                        self.connection.execute(statement)
+                    self.connection.execute(f"PRAGMA user_version = {int(version)}")
+                    self.connection.commit()
+                    print(f"Applied schema migration {version}")
+                except sqlite3.Error:
+                    self.connection.rollback()
+                    raise
+
+        except sqlite3.Error as e:
+            print(f"Database error: {e}")
+        finally:
+            self.invalidate_query_cache()
+            self.disconnect()
+        return self
+
+    def explain_lookup_queries(self) -> dict:
+        """
+        Runs EXPLAIN QUERY PLAN on the per row lookups issued by the loaders and reports whether each is served by
+        an index rather than a full table scan.
+
+        Returns:
+         * plans: (dict) - Maps lookup name to a (uses_index, plan_details) tuple.
+        """
+        plans = {}
+        self.connect()
+        try:
+            for name, (lookup, params) in self.LOOKUP_QUERIES.items():
+                plan_details = [row[-1] for row in self.cur.execute(f"EXPLAIN QUERY PLAN {lookup}", params)]
+                uses_index = all("USING" in detail and "INDEX" in detail for detail in plan_details)
+                plans[name] = (uses_index, plan_details)
+        finally:
+            self.disconnect()
+        return plans
     
+    def compact_reviewer_table(self) -> int:
+        """
+        One-shot compaction for databases loaded before reviewers were deduplicated. Collapses reviewers with the same
+        (name, hometown) into the row with the lowest id and rewrites res_review.reviewer_id to match. Migration 2 runs
+        this automatically; the method is for rerunning it by hand.
+
+        Returns:
+         * removed: (int) - The number of duplicate reviewer rows removed.
+        """
+        removed = 0
+        try:
+            self.connect()
+            before = self.cur.execute("SELECT COUNT(*) FROM reviewer").fetchone()[0]
+            self.connection.execute("BEGIN")
+            for statement in self.COMPACT_REVIEWER_STATEMENTS:
+                self.connection.execute(statement)
+            self.connection.commit()
+            removed = before - self.cur.execute("SELECT COUNT(*) FROM reviewer").fetchone()[0]
+            print(f"Removed {removed} duplicate reviewers")
+
+        except sqlite3.Error as e:
+            self.connection.rollback()
+            print(f"Database error: {e}")
+        finally:
+            self.clear_key_cache()
+            self.invalidate_query_cache()
+            self.disconnect()
+        return removed
+
+    def get_review_hash(self, text:str) -> str:
+        """
+        Hashes review text for the res_review natural key (restaurant, reviewer, date, site, text hash).
+
+        Params:
+         * text: (str) - The review text.
+
+        Returns:
+         * review_hash: (str) - The SHA-1 hex digest of the text; None is hashed as an empty string.
+        """
+        return hashlib.sha1((text or "").encode("utf-8")).hexdigest()
+
+    def get_file_hash(self, csv_file:str) -> str:
+        """
+        Hashes a file's contents so the load log can tell whether a file changed since it was last loaded.
+
+        Params:
+         * csv_file: (str) - The path to the file.
+
+        Returns:
+         * file_hash: (str) - The SHA-1 hex digest of the file.
+        """
+        file_hash = hashlib.sha1()
+        with open(csv_file, "rb") as file:
+            for block in iter(lambda: file.read(1 << 20), b""):
+                file_hash.update(block)
+        return file_hash.hexdigest()
+
+    def get_load_log_entry(self, file_name:str):
+        """
+        Returns the load log entry for a file. Requires an open connection.
+
+        Params:
+         * file_name: (str) - The csv file name.
+
+        Returns:
+         * entry: (tuple) - (file_hash, rows_read, rows_inserted, completed), None if never loaded.
+        """
+        self.cur.execute("""
+                         SELECT file_hash, rows_read, rows_inserted, completed
+                         FROM load_log WHERE file_name = ?
+                         """, (file_name, ))
+        return self.cur.fetchone()
+
+    def record_load(self, file_name:str, file_hash:str, rows_read:int, rows_inserted:int, completed:bool) -> None:
+        """
+        Records a file's high-water mark in the load log: how many csv rows have been read and committed, and how many
+        reviews were new. Runs inside the caller's transaction so the mark always matches the committed rows. Requires
+        an open connection.
+
+        Params:
+         * file_name: (str)       - The csv file name.
+         * file_hash: (str)       - The content hash of the file.
+         * rows_read: (int)       - The number of csv rows read and committed.
+         * rows_inserted: (int)   - The number of new reviews inserted from the file.
+         * completed: (bool)      - True once the whole file has been loaded.
+        """
+        self.connection.execute("""
+                                INSERT INTO load_log(file_name, file_hash, rows_read, rows_inserted, completed, loaded_at)
+                                VALUES (?,?,?,?,?,?)
+                                ON CONFLICT(file_name) DO UPDATE SET file_hash = excluded.file_hash,
+                                                                     rows_read = excluded.rows_read,
+                                                                     rows_inserted = excluded.rows_inserted,
+                                                                     completed = excluded.completed,
+                                                                     loaded_at = excluded.loaded_at
+                                """, (file_name, file_hash, rows_read, rows_inserted, int(completed),
+                                      datetime.datetime.now().isoformat(timespec = "seconds")))
+        return self
+
+    @timed_stage("load")
     def load_site_origin_table(self) -> None:
         """
         Inserts data into the site origin table.
@@ -232,6 +976,9 @@ class RestaurantReviewDB:
             # Connect to db
             self.connect()
 
+            # Rows read and inserted, for the stage record
+            rows_read, rows_inserted = 0, 0
+
             # Define inserter
             inserter =  """
                         INSERT OR IGNORE INTO site_origin( site_name ) VALUES (?)
@@ -239,8 +986,7 @@ class RestaurantReviewDB:
 
             # Iterate over data in both cvs, loading data
             for csv_file in csv_list:
-                with open(csv_file, "r") as file:
-                    reader = csv.reader(file)
+                with self.open_curated(csv_file) as reader:
                     next(reader)
 
                     # Iterate over each row in the csv
@@ -256,19 +1002,23 @@ class RestaurantReviewDB:
                         db_row.append(site_origin)
 
                         # Insert data
-                        self.connection.execute(inserter, db_row)
+                        rows_read += 1
+                        rows_inserted += self.connection.execute(inserter, db_row).rowcount
             
             # Commit changes to db
             self.connection.commit()
+            report_rows(rows_in = rows_read, rows_out = rows_inserted)
 
         except FileNotFoundError as e:
             print(f"Error: File not found - {e}")
         except sqlite3.Error as e:
             print(f"Database error: {e}")
         finally:
-            self.connection.close()
+            self.invalidate_query_cache()
+            self.disconnect()
         return self
 
+    @timed_stage("load")
     def load_region_table(self) -> None:
         """
         Inserts data into the region table.
@@ -283,6 +1033,9 @@ class RestaurantReviewDB:
             # Connect to db
             self.connect()
 
+            # Rows read and inserted, for the stage record
+            rows_read, rows_inserted = 0, 0
+
             # Define inserter
             inserter =  """
                         INSERT OR IGNORE INTO region( city, state ) VALUES (?,?)
@@ -290,8 +1043,7 @@ class RestaurantReviewDB:
 
             # Iterate over data in both cvs, loading data
             for csv_file in csv_list:
-                with open(csv_file, "r") as file:
-                    reader = csv.reader(file)
+                with self.open_curated(csv_file) as reader:
                     next(reader)
 
                     # Iterate over each row in the csv
@@ -308,19 +1060,23 @@ class RestaurantReviewDB:
                         db_row.extend([city, state])
 
                         # Insert data
-                        self.connection.execute(inserter, db_row)
+                        rows_read += 1
+                        rows_inserted += self.connection.execute(inserter, db_row).rowcount
             
             # Commit changes to db
             self.connection.commit()
+            report_rows(rows_in = rows_read, rows_out = rows_inserted)
 
         except FileNotFoundError as e:
             print(f"Error: File not found - {e}")
         except sqlite3.Error as e:
             print(f"Database error: {e}")
         finally:
-            self.connection.close()
+            self.invalidate_query_cache()
+            self.disconnect()
         return self
     
+    @timed_stage("load")
     def load_tags_table(self) -> None:
         """
         Inserts data into the tag table.
@@ -335,6 +1091,9 @@ class RestaurantReviewDB:
             # Connect to db
             self.connect()
 
+            # Rows read and inserted, for the stage record
+            rows_read, rows_inserted = 0, 0
+
             # Define inserter
             inserter =  """
                         INSERT OR IGNORE INTO tag( name ) VALUES (?)
@@ -342,22 +1101,14 @@ class RestaurantReviewDB:
 
             # Iterate over data in both cvs, loading data
             for csv_file in csv_list:
-                with open(csv_file, "r") as file:
-                    reader = csv.reader(file)
+                with self.open_curated(csv_file) as reader:
                     next(reader)
 
                     # Iterate over each row in the csv
                     for row in reader:
 
-                        # Extracts the last element from the row
-                        tags = row[-1]
-
-                        # If it's an empty string, literal_eval will fail so skip.
-                        if tags == "":
-                            continue
-
-                        # Converts string literals to dtypes; here lists
-                        tags = ast.literal_eval(tags)
+                        # Converts the last element from the row, the encoded tags, to a list
+                        tags = self.parse_tags(row[-1], row[1], csv_file)
 
                         # Iterate over the tags in the list
                         for tag in tags:
@@ -366,19 +1117,23 @@ class RestaurantReviewDB:
                             db_row = [tag]
 
                             # Insert data
-                            self.connection.execute(inserter, db_row)
+                            rows_read += 1
+                            rows_inserted += self.connection.execute(inserter, db_row).rowcount
             
             # Commit changes to db
             self.connection.commit()
+            report_rows(rows_in = rows_read, rows_out = rows_inserted)
 
         except FileNotFoundError as e:
             print(f"Error: File not found - {e}")
         except sqlite3.Error as e:
             print(f"Database error: {e}")
         finally:
-            self.connection.close()
+            self.invalidate_query_cache()
+            self.disconnect()
         return self
     
+    @timed_stage("load")
     def load_price_point_table(self) -> None:
         """
         Inserts data into the price_point table.
@@ -390,13 +1145,15 @@ class RestaurantReviewDB:
             # Connect to db
             self.connect()
 
+            # Rows read and inserted, for the stage record
+            rows_read, rows_inserted = 0, 0
+
             # Define inserter
             inserter =  """
                         INSERT OR IGNORE INTO price_point( price_point ) VALUES (?)
                         """
             # Iterate over data in both cvs, loading data
-            with open(csv_file, "r") as file:
-                reader = csv.reader(file)
+            with self.open_curated(csv_file) as reader:
                 next(reader)
 
                 # Iterate over each row in the csv
@@ -413,30 +1170,51 @@ class RestaurantReviewDB:
                     db_row = [price_point]
 
                     # Insert data
-                    self.connection.execute(inserter, db_row)
+                    rows_read += 1
+                    rows_inserted += self.connection.execute(inserter, db_row).rowcount
         
             # Commit changes to db
             self.connection.commit()
+            report_rows(rows_in = rows_read, rows_out = rows_inserted)
                 
         except FileNotFoundError as e:
             print(f"Error: File not found - {e}")
         except sqlite3.Error as e:
             print(f"Database error: {e}")
         finally:
-            self.connection.close()
+            self.invalidate_query_cache()
+            self.disconnect()
         return self
 
+    def build_open_table_restaurant_index(self) -> dict:
+        """
+        Reads the OpenTable restaurant data once and indexes the rows by restaurant name. When a name appears
+        more than once the first row is kept, matching the original first-match scan.
+
+        Returns:
+         * open_table_index: (dict) - Maps restaurant name to its csv row.
+        """
+        open_table_index = {}
+        with self.open_curated(str(self.open_table_restaurant_data)) as open_table_reader:
+            next(open_table_reader)
+            for open_table_row in open_table_reader:
+                open_table_index.setdefault(open_table_row[1], open_table_row)
+        return open_table_index
+
+    @timed_stage("load")
     def load_restuarant_table(self):
         """
         Inserts data into the restaurant table.
         """
         # Path to data source
-        PATH_TO_OPEN_TABLE_CSV = str(self.open_table_restaurant_data)
         PATH_TO_YELP_CSV = str(self.yelp_restaurant_data)        
         try: 
             # Connect to db
             self.connect()
 
+            # Rows read and inserted, for the stage record
+            rows_read, rows_inserted = 0, 0
+
             # Define inserter
             inserter =  """
                         INSERT OR IGNORE INTO restaurant( name,
@@ -447,8 +1225,10 @@ class RestaurantReviewDB:
                                                           state) VALUES (?,?,?,?,?,?)
                         """
 
-            with open(PATH_TO_YELP_CSV, "r") as yelp_file:
-                yelp_reader = csv.reader(yelp_file)
+            # Index the OpenTable restaurants by name once, rather than rescanning the csv for every Yelp row
+            open_table_index = self.build_open_table_restaurant_index()
+
+            with self.open_curated(PATH_TO_YELP_CSV) as yelp_reader:
                 next(yelp_reader)
 
                 # Iterate over each row in the csv
@@ -475,24 +1255,16 @@ class RestaurantReviewDB:
                         self.cur.execute("INSERT INTO region (city, state) VALUES (?, ?)", (city, state))
                         print(f"Inserted new region: {city}, {state}")
 
-                    # Get the corresponding id for price point, if there is one
+                    # The price point is stored as given, as load_all does; an empty price point is NULL
                     if price_point == "":
                         price_point = None
-                    
-                    else:
-                        self.cur.execute("SELECT id FROM price_point WHERE price_point = ?", (price_point, ))
-                        price_point_id = self.cur.fetchone()
-                        price_point_id = price_point_id[0]
-
-                    with open(PATH_TO_OPEN_TABLE_CSV, "r") as open_table_file:
-                        open_table_reader = csv.reader(open_table_file)
-                        next(open_table_reader)
-                        for open_table_row in open_table_reader:
-                            if open_table_row[1] == name:
-                                cuisine = open_table_row[4]
-                                description = open_table_row[5]
-                                got_cuisine_and_description_flag = True
-                                break
+
+                    # Look up cuisine and description in the OpenTable index
+                    open_table_row = open_table_index.get(name)
+                    if open_table_row is not None:
+                        cuisine = open_table_row[4]
+                        description = open_table_row[5]
+                        got_cuisine_and_description_flag = True
                     
                     # Update the data containter
                     if not got_cuisine_and_description_flag:
@@ -503,28 +1275,62 @@ class RestaurantReviewDB:
                     db_row.extend([name, price_point, cuisine, description, city, state])
                     
                     # Insert data
-                    self.connection.execute(inserter, db_row)
+                    rows_read += 1
+                    rows_inserted += self.connection.execute(inserter, db_row).rowcount
 
                     # Update flag
                     got_cuisine_and_description_flag = False
         
             # Commit changes to db
             self.connection.commit()
+            report_rows(rows_in = rows_read, rows_out = rows_inserted)
 
         except FileNotFoundError as e:
             print(f"Error: File not found - {e}")
         except sqlite3.Error as e:
             print(f"Database error: {e}")
         finally:
-            self.connection.close()
+            self.invalidate_query_cache()
+            self.disconnect()
         return self
     
+    def parse_tags(self, tags:str, restaurant_name:str, source:str) -> list:
+        """
+        Converts an encoded tags string from the curated data to a list. Tags are written as JSON arrays, e.g.,
+        '["Seafood", "New American"]', which are decoded with json.loads. Curated files written before the JSON
+        encoding hold Python list literals, e.g., "['Seafood', 'New American']"; json.loads rejects these and they
+        fall back to ast.literal_eval. A literal cannot be told from JSON by its first characters, e.g.,
+        ["Chef's Table", 'Bar'], so every string is tried as JSON first. Empty strings and unparsable strings return an empty list. Typed curated files hold the
+        lists themselves, which are returned as a copy.
+
+        Params:
+         * tags: (str)            - The encoded tags, or a list from a typed curated file.
+         * restaurant_name: (str) - The restaurant the tags belong to, used for error reporting.
+         * source: (str)          - The data source the tags came from, used for error reporting.
+
+        Returns:
+         * tags: (list) - The parsed tags.
+        """
+        if isinstance(tags, list):
+            return list(tags)
+        if not tags:
+            return []
+        try:
+            try:
+                return json.loads(tags)
+            except json.JSONDecodeError:
+                return ast.literal_eval(tags)
+        except (SyntaxError, ValueError):
+            print(f"Error parsing tags for {restaurant_name} from {source} data")
+            return []
+
+    @timed_stage("load")
     def load_res_tags_table(self):
         """
-        Inserts data into the restaurant_tag table.
+        Inserts data into the restaurant_tag table. Each csv is read once, the tag lists are parsed once and the
+        tag and restaurant ids are resolved from in-memory maps before a single batched insert.
         """
         # Path to data source
-        PATH_TO_OPEN_TABLE_CSV = str(self.open_table_restaurant_data)
         PATH_TO_YELP_CSV = str(self.yelp_restaurant_data)        
         try: 
             # Connect to db
@@ -535,91 +1341,60 @@ class RestaurantReviewDB:
                         INSERT OR IGNORE INTO restaurant_tag( restaurant_id,
                                                               tag_id) VALUES (?,?)
                         """
-            # First, open the Yelp csv and iterate over the restaurants extracting the tags 
-            with open(PATH_TO_YELP_CSV, "r") as yelp_file:
-                yelp_reader = csv.reader(yelp_file)
+
+            # Parse the OpenTable tags once per restaurant
+            open_table_tags_index = {}
+            for name, open_table_row in self.build_open_table_restaurant_index().items():
+                open_table_tags_index[name] = self.parse_tags(open_table_row[-1], name, "OpenTable")
+
+            # Load the tag and restaurant lookup tables into the key cache
+            self.warm_key_cache("tag").warm_key_cache("restaurant")
+
+            # Iterate over the Yelp restaurants, combining the Yelp and OpenTable tags
+            db_rows = []
+            with self.open_curated(PATH_TO_YELP_CSV) as yelp_reader:
                 next(yelp_reader)
 
                 for yelp_row in yelp_reader:
-                    restaurant_tags_list = []
                     yelp_name = yelp_row[1].strip()
-                    yelp_tags = yelp_row[-1]
+                    restaurant_tags_list = self.parse_tags(yelp_row[-1], yelp_name, "Yelp")
+                    restaurant_tags_list.extend(open_table_tags_index.get(yelp_name, []))
+
+                    # Resolve the ids of each distinct tag
+                    for tag in set(restaurant_tags_list):
+                        tag_id = self.get_key("tag", tag)
+                        if tag_id is None:
+                            print(f"Tag '{tag}' not found in the tag lookup table.")
+                            continue
 
-                    with open(PATH_TO_OPEN_TABLE_CSV, "r") as open_table_file:
-                        open_table_reader = csv.reader(open_table_file)
-                        next(open_table_reader)
-                        
-                        open_table_tags = None
-                        for open_table_row in open_table_reader:
-                            if yelp_name == open_table_row[1]:
-                                open_table_tags = open_table_row[-1]
-                                break
-                            else:
-                                continue
-                    
-                    # Process Yelp tags
-                    load_yelp_flag = False
-                    if yelp_tags:
-                        try:
-                            yelp_tags = ast.literal_eval(yelp_tags)
-                            load_yelp_flag = True
-                        except (SyntaxError, ValueError):
-                            print(f"Error parsing tags for {yelp_name} from Yelp data")
-
-                    # Process OpenTable tags
-                    load_open_table_flag = False
-                    if open_table_tags:
-                        try:
-                            open_table_tags = ast.literal_eval(open_table_tags)
-                            load_open_table_flag = True
-                        except (SyntaxError, ValueError):
-                            print(f"Error parsing tags for {yelp_name} from OpenTable data")
-
-                    # Combine tag lists, if they exist
-                    if load_yelp_flag:
-                        restaurant_tags_list.extend(yelp_tags)
-                    if load_open_table_flag:
-                        restaurant_tags_list.extend(open_table_tags)
-
-                    # Insert res tags into the database if any exist
-                    if restaurant_tags_list:
-                        for tag in set(restaurant_tags_list):
-
-                            # Extract the tag_id from the tag lookup table
-                            self.cur.execute("SELECT id FROM tag WHERE name = ?", (tag,))
-                            tag_id = self.cur.fetchone()
-                            if tag_id:
-                                tag_id = tag_id[0]
-                            else:
-                                print(f"Tag '{tag}' not found in the tag lookup table.")
-                                continue
-
-                            # Extract the restaurant_id from the restaurant lookup table
-                            self.cur.execute("SELECT id FROM restaurant WHERE name = ?", (yelp_name,))
-                            name_id = self.cur.fetchone()
-                            if name_id:
-                                name_id = name_id[0]  # Extract the ID from the tuple
-                            else:
-                                print(f"Restaurant '{yelp_name}' not found in the restaurant lookup table.")
-                                continue
-
-                            # Insert the restaurant_id and tag_id into the restaurant_tag table
-                            self.connection.execute(inserter, (name_id, tag_id))
+                        name_id = self.get_key("restaurant", yelp_name)
+                        if name_id is None:
+                            print(f"Restaurant '{yelp_name}' not found in the restaurant lookup table.")
+                            continue
+
+                        db_rows.append((name_id, tag_id))
+
+            # Insert the restaurant_id and tag_id pairs into the restaurant_tag table
+            rows_inserted = self.connection.executemany(inserter, db_rows).rowcount
 
             # Commit changes to db
             self.connection.commit()
+            report_rows(rows_in = len(db_rows), rows_out = rows_inserted)
 
         except FileNotFoundError as e:
             print(f"Error: File not found - {e}")
         except sqlite3.Error as e:
             print(f"Database error: {e}")
         finally:
-            self.connection.close()
+            self.invalidate_query_cache()
+            self.disconnect()
         return self
 
+    @timed_stage("load")
     def load_reviewer_table(self):
         """
-        Inserts data into the reviewer table.
+        Inserts data into the reviewer table. Reviewers are deduplicated on their natural key (name, hometown) in memory,
+        and reviewers already in the database are skipped by the upsert, so each reviewer is stored once.
         """
         # Path to data source
         PATH_TO_YELP_CSV = str(self.yelp_review_data)
@@ -633,13 +1408,15 @@ class RestaurantReviewDB:
 
             # Define inserter
             inserter =  """
-                        INSERT INTO reviewer(name, hometown) VALUES (?, ?)
+                        INSERT INTO reviewer(name, hometown) VALUES (?, ?) ON CONFLICT DO NOTHING
                         """
 
+            # Distinct reviewers in first seen order
+            reviewers = {}
+
             # Iterate over data in both cvs, loading data
             for csv_file in csv_list:
-                with open(csv_file, "r") as file:
-                    reader = csv.reader(file)
+                with self.open_curated(csv_file) as reader:
                     next(reader)
 
                     # Iterate over each row in the csv
@@ -656,24 +1433,43 @@ class RestaurantReviewDB:
                         if hometown == "":
                             hometown = None
 
-                        # Insert data 
+                        # Collect data
                         db_row.extend([name, hometown])
-                        self.connection.execute(inserter, db_row)
+                        reviewers.setdefault(tuple(db_row))
+
+            # Insert data
+            rows_inserted = self.connection.executemany(inserter, list(reviewers)).rowcount
             
             # Commit changes to db
             self.connection.commit()
+            report_rows(rows_in = len(reviewers), rows_out = rows_inserted)
 
         except FileNotFoundError as e:
             print(f"Error: File not found - {e}")
         except sqlite3.Error as e:
             print(f"Database error: {e}")
         finally:
-            self.connection.close()
+            self.invalidate_query_cache()
+            self.disconnect()
         return self
 
-    def load_restaurant_review_table(self):
+    @timed_stage("load")
+    def load_restaurant_review_table(self, batch_size:int = None, use_executemany:bool = False, incremental:bool = False):
         """ 
-        Inserts data into the restaurant_review table.
+        Inserts data into the restaurant_review table. Rows are committed in transactions of batch_size rows, or
+        one transaction per file when batch_size is None.
+
+        Reviews are keyed on (restaurant, reviewer, date, site, text hash) and reviews already in the database are
+        skipped, so rerunning a load or loading a new scrape that overlaps an old one only adds the new reviews. Each
+        file's high-water mark (rows read and committed) is kept in the load_log table.
+
+        Params:
+         * batch_size: (int)       - The number of rows per transaction. Default None, one transaction per file.
+         * use_executemany: (bool) - If True, rows are resolved into a buffer and inserted with executemany,
+                                     one call per transaction. Default False.
+         * incremental: (bool)     - If True, files are checked against the load log: an unchanged, completely loaded
+                                     file is skipped and an unchanged, partially loaded file resumes after its
+                                     high-water mark. Default False.
         """
         # Path to data source
         PATH_TO_YELP_CSV = str(self.yelp_review_data)
@@ -685,6 +1481,9 @@ class RestaurantReviewDB:
             # connect to db
             self.connect()
 
+            # load the lookup tables into the key cache
+            self.warm_key_cache("reviewer").warm_key_cache("restaurant").warm_key_cache("site_origin")
+
             # define inserter
             inserter = """
                     INSERT INTO res_review( restaurant_id,
@@ -692,16 +1491,43 @@ class RestaurantReviewDB:
                                             site_origin_id,
                                             rating,
                                             date,
-                                            review_text) VALUES(?,?,?,?,?,?)
+                                            review_text,
+                                            review_hash) VALUES(?,?,?,?,?,?,?)
+                    ON CONFLICT DO NOTHING
                     """
             
+            # totals over both files for the stage record
+            total_rows_read = 0
+            total_rows_inserted = 0
+
             for index, csv_file in enumerate(csv_list):
-                with open(csv_file, "r") as file:
-                    reader = csv.reader(file)
+                file_name = Path(csv_file).name
+                file_hash = self.get_file_hash(csv_file)
+
+                # high-water mark from a previous load of the same file
+                rows_to_skip = 0
+                rows_inserted = 0
+                log_entry = self.get_load_log_entry(file_name)
+                if incremental and log_entry is not None and log_entry[0] == file_hash:
+                    if log_entry[3]:
+                        print(f"Skipping {file_name}, already loaded")
+                        continue
+                    rows_to_skip, rows_inserted = log_entry[1], log_entry[2]
+                resumed_rows_inserted = rows_inserted
+
+                with self.open_curated(csv_file) as reader:
                     next(reader)
 
+                    # rows in the current transaction
+                    pending_rows = []
+                    pending_count = 0
+                    rows_read = 0
+
                     # iterate over row of the csv
                     for row in reader:
+                        rows_read += 1
+                        if rows_read <= rows_to_skip:
+                            continue
                         
                         # data container
                         db_row = []
@@ -727,39 +1553,56 @@ class RestaurantReviewDB:
                             continue
                         
                         # Get the corresponding ids from lookup tables
-                        self.cur.execute("SELECT id FROM reviewer WHERE name = ?", (reviewer_name, ))
-                        reviewer_id = self.cur.fetchone()
-                        if not reviewer_id:
+                        reviewer_id = self.get_key("reviewer", reviewer_name)
+                        if reviewer_id is None:
                             continue
-                        reviewer_id = reviewer_id[0]
 
-                        self.cur.execute("SELECT id FROM restaurant WHERE name = ?", (restaurant_name, ))
-                        restaurant_id = self.cur.fetchone()
-                        if not restaurant_id:
+                        restaurant_id = self.get_key("restaurant", restaurant_name)
+                        if restaurant_id is None:
                             continue
-                        restaurant_id = restaurant_id[0]
 
-                        self.cur.execute("SELECT id FROM site_origin WHERE site_name = ?", (site_origin, ))
-                        site_origin_id = self.cur.fetchone()
-                        site_origin_id = site_origin_id[0]
+                        site_origin_id = self.get_key("site_origin", site_origin)
 
                         # update container
-                        db_row.extend([restaurant_id, reviewer_id, site_origin_id, rating, date, text])
-
-                        self.connection.execute(inserter, db_row)
-                        self.connection.commit()
-
-            # Commit changes to db
-            self.connection.commit()
+                        db_row.extend([restaurant_id, reviewer_id, site_origin_id, rating, date, text, self.get_review_hash(text)])
+
+                        # rowcount only counts the review itself, not the rows the res_review triggers write
+                        if use_executemany:
+                            pending_rows.append(db_row)
+                        else:
+                            rows_inserted += self.connection.execute(inserter, db_row).rowcount
+                        pending_count += 1
+
+                        # Close the transaction once the batch is full, moving the high-water mark with it
+                        if batch_size and pending_count >= batch_size:
+                            if pending_rows:
+                                rows_inserted += self.connection.executemany(inserter, pending_rows).rowcount
+                            self.record_load(file_name, file_hash, rows_read, rows_inserted, completed = False)
+                            self.connection.commit()
+                            pending_rows = []
+                            pending_count = 0
+
+                    # Flush the remainder of the file in one transaction
+                    if pending_rows:
+                        rows_inserted += self.connection.executemany(inserter, pending_rows).rowcount
+                    self.record_load(file_name, file_hash, rows_read, rows_inserted, completed = True)
+                    self.connection.commit()
+                    print(f"Loaded {file_name}: {rows_inserted} new reviews")
+
+                total_rows_read += rows_read - rows_to_skip
+                total_rows_inserted += rows_inserted - resumed_rows_inserted
+                report_rows(rows_in = total_rows_read, rows_out = total_rows_inserted)
 
         except FileNotFoundError as e:
             print(f"Error: File not found - {e}")
         except sqlite3.Error as e:
             print(f"Database error: {e}")
         finally:
-            self.connection.close()
+            self.invalidate_query_cache()
+            self.disconnect()
         return self
     
+    @timed_stage("load")
     def load_aux_rating_table(self) -> None:
         """
         Inserts data into the open_table_category_rating table.
@@ -771,6 +1614,9 @@ class RestaurantReviewDB:
             # Connect to db
             self.connect()
 
+            # Rows read and inserted, for the stage record
+            rows_read, rows_inserted = 0, 0
+
             # Define inserter
             inserter =  """
                         INSERT INTO open_table_category_rating( reviewer_id,
@@ -778,10 +1624,10 @@ class RestaurantReviewDB:
                                                                 food,
                                                                 ambience,
                                                                 service ) VALUES (?,?,?,?,?)
+                        ON CONFLICT DO NOTHING
                         """
             # Iterate over data in both cvs, loading data
-            with open(csv_file, "r") as file:
-                reader = csv.reader(file)
+            with self.open_curated(csv_file) as reader:
                 next(reader)
 
                 # Iterate over each row in the csv
@@ -797,15 +1643,11 @@ class RestaurantReviewDB:
                     service = row[7]
                     ambience = row[8]
 
-                    self.cur.execute("SELECT id FROM reviewer WHERE name = ?", (reviewer_name, ))
-                    reviewer_id = self.cur.fetchone()
-                    if not reviewer_id:
-                        break
-                    reviewer_id = reviewer_id[0]
+                    reviewer_id = self.get_key("reviewer", reviewer_name)
+                    if reviewer_id is None:
+                        continue
 
-                    self.cur.execute("SELECT id FROM restaurant WHERE name = ?", (restaurant_name, ))
-                    restaurant_id = self.cur.fetchone()
-                    restaurant_id = restaurant_id[0]
+                    restaurant_id = self.get_key("restaurant", restaurant_name)
 
                     self.cur.execute("""
                                         SELECT id FROM res_review WHERE reviewer_id = ? AND 
@@ -813,6 +1655,8 @@ class RestaurantReviewDB:
                                                                         restaurant_id = ?
                                      """, (reviewer_id, date, restaurant_id))
                     review_id = self.cur.fetchone()
+                    if review_id is None:
+                        continue
                     review_id = review_id[0]
 
 
@@ -820,38 +1664,999 @@ class RestaurantReviewDB:
                     db_row.extend([restaurant_id, review_id, food, ambience, service])
 
                     # Insert data
-                    self.connection.execute(inserter, db_row)
+                    rows_read += 1
+                    rows_inserted += self.connection.execute(inserter, db_row).rowcount
         
             # Commit changes to db
             self.connection.commit()
+            report_rows(rows_in = rows_read, rows_out = rows_inserted)
                 
         except FileNotFoundError as e:
             print(f"Error: File not found - {e}")
         except sqlite3.Error as e:
             print(f"Database error here: {e}")
         finally:
-            self.connection.close()
+            self.invalidate_query_cache()
+            self.disconnect()
         return self
     
-    def query(self, query:str) -> pd.DataFrame:
+    def read_typed_curated_columns(self, curated_file:Path) -> dict:
+        """
+        Reads a typed (Parquet or Feather) curated file into columnar form, without reparsing any strings. Requires
+        pyarrow. Values keep their types, e.g., int ratings and tag lists, except that dates are formatted as
+        "YYYY-MM-DD", the text stored in the database, and missing values are "", as in a curated csv.
+
+        Params:
+         * curated_file: (Path Object) - The path to the curated .parquet or .feather file.
+
+        Returns:
+         * columns: (dict) - Maps column name to a tuple of column values. The index column is keyed "index".
+        """
+        try:
+            import pyarrow
+        except ImportError as e:
+            raise ImportError(f"Reading {Path(curated_file).name} requires the pyarrow package") from e
+        if Path(curated_file).suffix == ".parquet":
+            frame = pd.read_parquet(curated_file, dtype_backend = "numpy_nullable")
+        else:
+            frame = pd.read_feather(curated_file, dtype_backend = "numpy_nullable")
+
+        columns = {}
+        for column in frame.columns:
+            values = frame[column]
+            if pd.api.types.is_datetime64_any_dtype(values):
+                values = values.dt.strftime("%Y-%m-%d")
+            elif values.dtype == object: # list columns are read as arrays
+                values = values.map(lambda value: list(value) if value is not None else None)
+            columns[column] = tuple(values.astype(object).where(values.notna(), ""))
+        return columns
+
+    @contextmanager
+    def open_curated(self, curated_file:Path):
+        """
+        Opens a curated file for the row-by-row loaders. Yields an iterator over the rows, header first, like a
+        csv.reader: a curated csv is read with the csv module, a typed curated file with read_typed_curated_columns.
+
+        Params:
+         * curated_file: (Path Object) - The path to the curated file.
+        """
+        if Path(curated_file).suffix in self.TYPED_CURATED_SUFFIXES:
+            columns = self.read_typed_curated_columns(curated_file)
+            yield iter([list(columns)] + [list(row) for row in zip(*columns.values())])
+        else:
+            with open(str(curated_file), "r") as file:
+                yield csv.reader(file)
+
+    def read_curated_columns(self, csv_file:Path) -> dict:
+        """
+        Parses a curated file once into columnar form. A curated csv's values are kept as the strings the csv module
+        produces, so the loaded data is identical to the row-by-row loaders. Typed curated files are read with
+        read_typed_curated_columns.
+
+        Params:
+         * csv_file: (Path Object) - The path to the curated csv, .parquet or .feather file.
+
+        Returns:
+         * columns: (dict) - Maps column name to a tuple of column values. The unnamed index column is keyed "".
+        """
+        if Path(csv_file).suffix in self.TYPED_CURATED_SUFFIXES:
+            return self.read_typed_curated_columns(csv_file)
+        with open(str(csv_file), "r") as file:
+            reader = csv.reader(file)
+            header = next(reader)
+            rows = list(reader)
+        if rows:
+            columns = dict(zip(header, zip(*rows)))
+        else:
+            columns = {col: () for col in header}
+        return columns
+
+    def rollback_load(self) -> None:
+        """
+        Rolls back the open transaction, if any, and clears the key cache, which may hold ids of the rolled back rows.
+        """
+        if self.connection is not None and self.connection.in_transaction:
+            self.connection.rollback()
+        self.clear_key_cache()
+        return self
+
+    @timed_stage("load")
+    def load_all(self) -> None:
+        """
+        Loads every table in one pass. Each of the 4 curated csv's is parsed once into columnar form, every dimension and
+        fact table is derived from those columns, and the tables are written in dependency order inside one transaction.
+        The result matches calling the load_* methods in the order given in the README, which reparse the same files
+        about a dozen times. If any step fails the whole load is rolled back.
+
+        Like load_restaurant_review_table with incremental = True, a review file whose hash is recorded in the load
+        log as completely loaded is skipped: it is not parsed and adds no reviewers, reviews or category ratings. If
+        both review files are skipped nothing is loaded.
+        """
+        try:
+            # Connect to db and check the review files against the load log
+            self.connect()
+            file_hashes = {}
+            for csv_file in (self.open_table_review_data, self.yelp_review_data):
+                file_hash = self.get_file_hash(str(csv_file))
+                log_entry = self.get_load_log_entry(Path(csv_file).name)
+                if log_entry is not None and log_entry[0] == file_hash and log_entry[3]:
+                    print(f"Skipping {Path(csv_file).name}, already loaded")
+                    continue
+                file_hashes[csv_file] = file_hash
+            if not file_hashes:
+                return self
+
+            # Parse each csv once; a skipped review file contributes empty columns
+            open_table_reviews = (self.read_curated_columns(self.open_table_review_data)
+                                  if self.open_table_review_data in file_hashes else defaultdict(list))
+            yelp_reviews = (self.read_curated_columns(self.yelp_review_data)
+                            if self.yelp_review_data in file_hashes else defaultdict(list))
+            open_table_restaurants = self.read_curated_columns(self.open_table_restaurant_data)
+            yelp_restaurants = self.read_curated_columns(self.yelp_restaurant_data)
+
+            # Open one transaction for the whole load
+            self.connection.execute("BEGIN")
+
+            # site_origin
+            site_origins = dict.fromkeys([*open_table_reviews["origins"], *yelp_reviews["origins"]])
+            self.connection.executemany("INSERT OR IGNORE INTO site_origin( site_name ) VALUES (?)",
+                                        [(site_origin, ) for site_origin in site_origins])
+
+            # region
+            regions = dict.fromkeys(zip(open_table_restaurants["city"] + yelp_restaurants["city"],
+                                        [state.strip() for state in open_table_restaurants["state"] + yelp_restaurants["state"]]))
+            self.connection.executemany("INSERT OR IGNORE INTO region( city, state ) VALUES (?,?)", list(regions))
+
+            # tag, parsing every tag list once
+            open_table_tags = [self.parse_tags(tags, name, "OpenTable")
+                               for name, tags in zip(open_table_restaurants["restaurant_name"], open_table_restaurants["tags"])]
+            yelp_tags = [self.parse_tags(tags, name.strip(), "Yelp")
+                         for name, tags in zip(yelp_restaurants["restaurant_name"], yelp_restaurants["tags"])]
+            tags = dict.fromkeys(tag for tag_list in open_table_tags + yelp_tags for tag in tag_list)
+            self.connection.executemany("INSERT OR IGNORE INTO tag( name ) VALUES (?)", [(tag, ) for tag in tags])
+
+            # price_point
+            price_points = dict.fromkeys(price_point for price_point in yelp_restaurants["price_point"] if price_point != "")
+            self.connection.executemany("INSERT OR IGNORE INTO price_point( price_point ) VALUES (?)",
+                                        [(price_point, ) for price_point in price_points])
+
+            # restaurant, joining the OpenTable cuisine and description on name
+            open_table_index = {}
+            for name, cuisine, description in zip(open_table_restaurants["restaurant_name"],
+                                                  open_table_restaurants["cuisine"],
+                                                  open_table_restaurants["description"]):
+                open_table_index.setdefault(name, (cuisine, description))
+
+            restaurant_rows = []
+            for name, price_point, city, state in zip(yelp_restaurants["restaurant_name"], yelp_restaurants["price_point"],
+                                                      yelp_restaurants["city"], yelp_restaurants["state"]):
+                name, city, state = name.strip(), city.strip(), state.strip()
+                if (city, state) not in regions:
+                    self.connection.execute("INSERT OR IGNORE INTO region (city, state) VALUES (?, ?)", (city, state))
+                    regions[(city, state)] = None
+                    print(f"Inserted new region: {city}, {state}")
+                cuisine, description = open_table_index.get(name, (None, None))
+                restaurant_rows.append((name, price_point if price_point != "" else None, cuisine, description, city, state))
+            self.connection.executemany("""
+                                        INSERT OR IGNORE INTO restaurant( name, price_point_id, cuisine, description, city, state)
+                                        VALUES (?,?,?,?,?,?)
+                                        """, restaurant_rows)
+
+            # restaurant_tag
+            self.warm_key_cache("tag").warm_key_cache("restaurant")
+            open_table_tags_index = {}
+            for name, tag_list in zip(open_table_restaurants["restaurant_name"], open_table_tags):
+                open_table_tags_index.setdefault(name, tag_list)
+
+            res_tag_rows = []
+            for name, tag_list in zip(yelp_restaurants["restaurant_name"], yelp_tags):
+                name = name.strip()
+                for tag in set(tag_list + open_table_tags_index.get(name, [])):
+                    tag_id = self.get_key("tag", tag)
+                    if tag_id is None:
+                        print(f"Tag '{tag}' not found in the tag lookup table.")
+                        continue
+                    restaurant_id = self.get_key("restaurant", name)
+                    if restaurant_id is None:
+                        print(f"Restaurant '{name}' not found in the restaurant lookup table.")
+                        continue
+                    res_tag_rows.append((restaurant_id, tag_id))
+            self.connection.executemany("INSERT OR IGNORE INTO restaurant_tag( restaurant_id, tag_id) VALUES (?,?)", res_tag_rows)
+
+            # reviewer, deduplicated on (name, hometown) and stopping at the first row of a file without a reviewer name
+            reviewer_rows = {}
+            for reviews in (open_table_reviews, yelp_reviews):
+                for name, hometown in zip(reviews["reviewer_name"], reviews["city"]):
+                    name, hometown = name.strip(), hometown.strip()
+                    if name == "":
+                        break
+                    reviewer_rows.setdefault((name, hometown if hometown != "" else None))
+            self.connection.executemany("INSERT INTO reviewer(name, hometown) VALUES (?, ?) ON CONFLICT DO NOTHING", list(reviewer_rows))
+
+            # res_review, inserted per file so each file's new reviews are counted in the load log
+            self.warm_key_cache("reviewer").warm_key_cache("site_origin")
+            reviews_inserted = {}
+            for csv_file, reviews, rating_col in ((self.open_table_review_data, open_table_reviews, "overall"),
+                                                  (self.yelp_review_data, yelp_reviews, "rating")):
+                if csv_file not in file_hashes:
+                    continue
+                review_rows = []
+                for restaurant_name, date, reviewer_name, rating, text, site_origin in zip(reviews["restaurant_name"],
+                                                                                           reviews["datelike"],
+                                                                                           reviews["reviewer_name"],
+                                                                                           reviews[rating_col],
+                                                                                           reviews["review_text"],
+                                                                                           reviews["origins"]):
+                    reviewer_name = reviewer_name.strip()
+                    if reviewer_name == "":
+                        continue
+                    reviewer_id = self.get_key("reviewer", reviewer_name)
+                    if reviewer_id is None:
+                        continue
+                    restaurant_id = self.get_key("restaurant", restaurant_name.strip())
+                    if restaurant_id is None:
+                        continue
+                    site_origin_id = self.get_key("site_origin", site_origin)
+                    review_rows.append((restaurant_id, reviewer_id, site_origin_id, rating, date, text, self.get_review_hash(text)))
+                reviews_inserted[csv_file] = self.connection.executemany("""
+                                        INSERT INTO res_review( restaurant_id, reviewer_id, site_origin_id, rating, date, review_text, review_hash)
+                                        VALUES(?,?,?,?,?,?,?)
+                                        ON CONFLICT DO NOTHING
+                                        """, review_rows).rowcount
+
+            # open_table_category_rating, resolving review ids from one scan of res_review
+            review_ids = {}
+            for review_id, reviewer_id, date, restaurant_id in self.cur.execute("""
+                                                                                SELECT id, reviewer_id, date, restaurant_id
+                                                                                FROM res_review ORDER BY id
+                                                                                """):
+                review_ids.setdefault((reviewer_id, date, restaurant_id), review_id)
+
+            aux_rows = []
+            for restaurant_name, date, reviewer_name, food, service, ambience in zip(open_table_reviews["restaurant_name"],
+                                                                                    open_table_reviews["datelike"],
+                                                                                    open_table_reviews["reviewer_name"],
+                                                                                    open_table_reviews["food"],
+                                                                                    open_table_reviews["service"],
+                                                                                    open_table_reviews["ambience"]):
+                reviewer_id = self.get_key("reviewer", reviewer_name)
+                if reviewer_id is None:
+                    continue
+                restaurant_id = self.get_key("restaurant", restaurant_name.strip())
+                review_id = review_ids.get((reviewer_id, date, restaurant_id))
+                if review_id is None:
+                    continue
+                aux_rows.append((restaurant_id, review_id, food, ambience, service))
+            self.connection.executemany("""
+                                        INSERT INTO open_table_category_rating( reviewer_id, review_id, food, ambience, service)
+                                        VALUES (?,?,?,?,?)
+                                        ON CONFLICT DO NOTHING
+                                        """, aux_rows)
+
+            # Record the loaded review files in the load log
+            for csv_file, reviews in ((self.open_table_review_data, open_table_reviews), (self.yelp_review_data, yelp_reviews)):
+                if csv_file in file_hashes:
+                    self.record_load(Path(csv_file).name, file_hashes[csv_file], len(reviews["datelike"]),
+                                     reviews_inserted[csv_file], completed = True)
+
+            # Commit the whole load
+            self.connection.commit()
+            report_rows(rows_in = len(open_table_reviews["datelike"]) + len(yelp_reviews["datelike"]), rows_out = sum(reviews_inserted.values()))
+
+        # Any failure rolls the whole load back, so the key cache must forget the ids of the rows it inserted
+        except FileNotFoundError as e:
+            self.rollback_load()
+            print(f"Error: File not found - {e}")
+        except sqlite3.Error as e:
+            self.rollback_load()
+            print(f"Database error: {e}")
+        except Exception:
+            self.rollback_load()
+            raise
+        finally:
+            self.invalidate_query_cache()
+            self.disconnect()
+        return self
+
+    def query(self, query:str, params = None, use_cache:bool = False) -> pd.DataFrame:
         """ 
-        Method used to extract data from the database using SQLite Syntax.
+        Method used to extract data from the database using SQLite Syntax. Uses a connection from the read pool if one
+        is open, otherwise the session connection or a new connection. Values should be passed as bind parameters rather
+        than formatted into the SQL; SQLite then reuses the prepared statement on the connection for repeated queries.
 
         Params:
-         * query: (str) - A query written in SQL
+         * query: (str)            - A query written in SQL, with "?" or ":name" placeholders.
+         * params: (tuple or dict) - The bind parameters. Default None.
+         * use_cache: (bool)       - If True, the result is served from and stored in the query cache (see 
+                                     set_query_cache_size). Default False.
 
         Returns:
          * result: (pd.DataFrame) - A dataframe containing the results of the query.
+
+        Example:
+         * ResDB.query("SELECT * FROM restaurant WHERE city = ? AND state = ?", ("Portland", "ME"))
+        """
+        if params is None:
+            params = ()
+
+        # check the cache
+        cache_key = None
+        if use_cache and self.query_cache_size > 0:
+            cache_key = (query, tuple(sorted(params.items())) if isinstance(params, dict) else tuple(params))
+            with self.query_cache_lock:
+                if cache_key in self.query_cache:
+                    self.query_cache.move_to_end(cache_key)
+                    return self.query_cache[cache_key].copy()
+
+        if self.read_pool is not None:
+            with self.read_pool.connection() as connection:
+                result = self.fetch_dataframe(connection.cursor(), query, params)
+        else:
+            self.connect()
+            try:
+                result = self.fetch_dataframe(self.connection.cursor(), query, params)
+            finally:
+                self.disconnect()
+
+        # update the cache, evicting the least recently used result
+        if cache_key is not None:
+            with self.query_cache_lock:
+                self.query_cache[cache_key] = result.copy()
+                while len(self.query_cache) > self.query_cache_size:
+                    self.query_cache.popitem(last = False)
+
+        return result
+
+    def fetch_dataframe(self, cur:sqlite3.Cursor, query:str, params = ()) -> pd.DataFrame:
+        """
+        Executes a query on the given cursor and collects the result in a dataframe. The cursor is closed afterwards.
+
+        Params:
+         * cur: (sqlite3.Cursor)   - The cursor to execute the query on.
+         * query: (str)            - A query written in SQL
+         * params: (tuple or dict) - The bind parameters. Default ().
+
+        Returns:
+         * result: (pd.DataFrame) - A dataframe containing the results of the query.
+        """
+        try:
+            cur.execute(query, params)
+            result = cur.fetchall()
+            col_names = [description[0] for description in cur.description]
+            result = pd.DataFrame(result, columns = col_names)
+        finally:
+            cur.close()
+        return result
+
+    @contextmanager
+    def read_cursor(self):
+        """
+        Provides a cursor for a read that may outlive a single method call, e.g., a generator. The cursor comes from the
+        read pool if one is open, from the session connection inside a session, and otherwise from a private connection,
+        so a suspended read never holds or replaces the connection attribute used by the other methods.
+        """
+        if self.read_pool is not None:
+            with self.read_pool.connection() as connection:
+                cur = connection.cursor()
+                try:
+                    yield cur
+                finally:
+                    cur.close()
+
+        elif self.session_depth > 0:
+            cur = self.connection.cursor()
+            try:
+                yield cur
+            finally:
+                cur.close()
+
+        else:
+            connection = sqlite3.connect(str(self.get_db_file_path()))
+            try:
+                cur = connection.cursor()
+                yield cur
+                cur.close()
+            finally:
+                connection.close()
+
+    def query_iter(self, query:str, batch_size:int = 10000, params = None):
+        """
+        Executes a query and lazily yields the result in batches of rows, so only one batch is held in memory.
+
+        Params:
+         * query: (str)            - A query written in SQL
+         * batch_size: (int)       - The number of rows per batch. Default 10000.
+         * params: (tuple or dict) - The bind parameters. Default None.
+
+        Yields:
+         * (col_names, rows): (tuple) - The column names (list) and a batch of row tuples (list).
+        """
+        with self.read_cursor() as cur:
+            cur.execute(query, params if params is not None else ())
+            col_names = [description[0] for description in cur.description]
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield col_names, rows
+
+    def query_chunks(self, query:str, chunksize:int = 10000, dtype_backend:str = None, params = None):
+        """
+        Executes a query and lazily yields the result as dataframes of at most chunksize rows. Large exports, e.g., every
+        review text in a region, then run in memory bounded by the chunk size.
+
+        Params:
+         * query: (str)            - A query written in SQL
+         * chunksize: (int)        - The number of rows per dataframe. Default 10000.
+         * dtype_backend: (str)    - None for default numpy columns, "numpy_nullable" for nullable numpy dtypes, or
+                                     "pyarrow" for Arrow backed columns (requires pyarrow). Default None.
+         * params: (tuple or dict) - The bind parameters. Default None.
+
+        Yields:
+         * chunk: (pd.DataFrame) - A dataframe containing the next chunk of the result.
+        """
+        if dtype_backend not in (None, "numpy_nullable", "pyarrow"):
+            raise ValueError(f"dtype_backend must be None, 'numpy_nullable' or 'pyarrow', got {dtype_backend}")
+        if dtype_backend == "pyarrow":
+            try:
+                import pyarrow
+            except ImportError as e:
+                raise ImportError("dtype_backend = 'pyarrow' requires the pyarrow package") from e
+
+        for col_names, rows in self.query_iter(query, batch_size = chunksize, params = params):
+            chunk = pd.DataFrame(rows, columns = col_names)
+            if dtype_backend is not None:
+                chunk = chunk.convert_dtypes(dtype_backend = dtype_backend)
+            yield chunk
+
+    @timed_stage("db")
+    def rebuild_rating_summary(self) -> None:
+        """
+        Recomputes restaurant_rating_summary from scratch. The summary is kept up to date by triggers as the loaders insert
+        reviews and category ratings, so this is only needed if the triggers were bypassed or dropped.
+        """
+        try:
+            self.connect()
+            self.connection.execute("BEGIN")
+            for statement in self.REBUILD_RATING_SUMMARY_STATEMENTS:
+                self.connection.execute(statement)
+            self.connection.commit()
+
+        except sqlite3.Error as e:
+            self.connection.rollback()
+            print(f"Database error: {e}")
+        finally:
+            self.invalidate_query_cache()
+            self.disconnect()
+        return self
+
+    def get_rating_summary(self, site:str = None, min_reviews:int = 0, top_n:int = None, order_by:str = "avg_rating",
+                           use_cache:bool = False) -> pd.DataFrame:
+        """
+        Reads the materialized rating summary: review count, average rating and OpenTable food, service and ambience
+        averages per restaurant. Reads O(restaurants) summary rows rather than aggregating every review, so leaderboards
+        and top-N queries stay cheap as the review count grows.
+
+        Params:
+         * site: (str)         - A site_origin site_name, e.g., "Yelp", to restrict the summary to one site. Default None,
+                                 all sites combined.
+         * min_reviews: (int)  - Restaurants with fewer reviews are left out. Default 0.
+         * top_n: (int)        - Only return the first top_n restaurants. Default None, all restaurants.
+         * order_by: (str)     - The column to sort by, descending: "avg_rating", "review_count", "avg_food",
+                                 "avg_service" or "avg_ambience". Default "avg_rating".
+         * use_cache: (bool)   - Passed to query. Default False.
+
+        Returns:
+         * result: (pd.DataFrame) - One row per restaurant.
+        """
+        order_columns = ("avg_rating", "review_count", "avg_food", "avg_service", "avg_ambience")
+        if order_by not in order_columns:
+            raise ValueError(f"order_by must be one of {order_columns}, got {order_by}")
+
+        summary_query = f"""
+                        SELECT Re.id AS restaurant_id,
+                               Re.name,
+                               SUM(S.review_count) AS review_count,
+                               CAST(SUM(S.rating_sum) AS REAL) / NULLIF(SUM(S.rating_count), 0) AS avg_rating,
+                               CAST(SUM(S.food_sum) AS REAL) / NULLIF(SUM(S.food_count), 0) AS avg_food,
+                               CAST(SUM(S.service_sum) AS REAL) / NULLIF(SUM(S.service_count), 0) AS avg_service,
+                               CAST(SUM(S.ambience_sum) AS REAL) / NULLIF(SUM(S.ambience_count), 0) AS avg_ambience
+                        FROM restaurant_rating_summary AS S
+                        JOIN restaurant AS Re ON S.restaurant_id = Re.id
+                        JOIN site_origin AS O ON S.site_origin_id = O.id
+                        WHERE (:site IS NULL OR O.site_name = :site)
+                        GROUP BY Re.id
+                        HAVING SUM(S.review_count) >= :min_reviews AND SUM(S.review_count) > 0
+                        ORDER BY {order_by} DESC, review_count DESC
+                        LIMIT :top_n
+                        """
+        params = {"site": site, "min_reviews": min_reviews, "top_n": top_n if top_n is not None else -1}
+        return self.query(summary_query, params, use_cache = use_cache)
+
+    def search_reviews(self, terms, restaurant:str = None, site:str = None, limit:int = 50) -> pd.DataFrame:
+        """
+        Full-text search over review text using the review_fts index, returning hits ranked by relevance (BM25). This
+        replaces LIKE '%...%' scans of res_review. Words are stemmed, so "wait" also matches "waited" and "waiting".
+
+        Params:
+         * terms: (str or list) - An FTS5 query string, e.g., 'lobster AND roll' or '"wait time"'. A list is treated as
+                                  phrases that must all appear, e.g., ["lobster roll", "wait time"].
+         * restaurant: (str)    - Only search reviews of this restaurant name. Default None.
+         * site: (str)          - Only search reviews from this site_origin site_name. Default None.
+         * limit: (int)         - The maximum number of hits. Default 50.
+
+        Returns:
+         * result: (pd.DataFrame) - The hits, best first, with review_id, restaurant name, site_name, rating, date,
+                                    review_text and score (lower is more relevant).
+        """
+        if not isinstance(terms, str):
+            terms = " AND ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+        search_query = """
+                       SELECT R.id AS review_id,
+                              Re.name,
+                              S.site_name,
+                              R.rating,
+                              R.date,
+                              R.review_text,
+                              bm25(review_fts) AS score
+                       FROM review_fts
+                       JOIN res_review AS R ON R.id = review_fts.rowid
+                       JOIN restaurant AS Re ON R.restaurant_id = Re.id
+                       JOIN site_origin AS S ON R.site_origin_id = S.id
+                       WHERE review_fts MATCH :terms
+                         AND (:restaurant IS NULL OR Re.name = :restaurant)
+                         AND (:site IS NULL OR S.site_name = :site)
+                       ORDER BY score
+                       LIMIT :limit
+                       """
+        params = {"terms": terms, "restaurant": restaurant, "site": site, "limit": limit}
+        return self.query(search_query, params)
+
+    def get_export_dir(self, export_dir:Path = None) -> Path:
+        """
+        Returns the Parquet export folder, by default data/export/<database file name without suffix>.
+
+        Params:
+         * export_dir: (Path Object) - An explicit export folder. Default None.
+
+        Returns:
+         * export_dir: (Path Object) - The export folder.
+        """
+        if export_dir is None:
+            export_dir = self.HOME / "data" / "export" / Path(self.file_name).stem
+        return Path(export_dir)
+
+    def get_arrow_schema(self, table:str):
+        """
+        Builds an Arrow schema from a table's declared SQLite column types, so every chunk of a streamed export is
+        written with the same types.
+
+        Params:
+         * table: (str) - The table name.
+
+        Returns:
+         * schema: (pyarrow.Schema) - INTEGER columns as int64, REAL as float64, everything else as string.
         """
+        import pyarrow as pa
+
+        type_map = {"INTEGER": pa.int64(), "REAL": pa.float64()}
         self.connect()
-        self.cur.execute(query)
-        result = self.cur.fetchall()
-        col_names = [description[0] for description in self.cur.description]
-        result = pd.DataFrame(result, columns = col_names)
-        self.cur.close()
-        self.connection.close()
+        try:
+            columns = self.cur.execute(f"PRAGMA table_info({table})").fetchall()
+        finally:
+            self.disconnect()
+        return pa.schema([(column[1], type_map.get(column[2].upper(), pa.string())) for column in columns])
+
+    def write_parquet_stream(self, query:str, params, schema, file_path:Path, chunksize:int) -> int:
+        """
+        Streams a query result into one Parquet file, one row group per chunk, so memory is bounded by the chunk size.
+        No file is written if the query returns no rows.
+
+        Params:
+         * query: (str)              - A query written in SQL
+         * params: (tuple or dict)   - The bind parameters.
+         * schema: (pyarrow.Schema)  - The schema of the result, in column order.
+         * file_path: (Path Object)  - The Parquet file to write.
+         * chunksize: (int)          - The number of rows per row group.
+
+        Returns:
+         * rows_written: (int) - The number of rows written.
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        rows_written = 0
+        writer = None
+        try:
+            for _, rows in self.query_iter(query, batch_size = chunksize, params = params):
+                columns = list(zip(*rows))
+                batch = pa.Table.from_arrays([pa.array(column, type = field.type) for column, field in zip(columns, schema)],
+                                             schema = schema)
+                if writer is None:
+                    file_path.parent.mkdir(parents = True, exist_ok = True)
+                    writer = pq.ParquetWriter(str(file_path), schema)
+                writer.write_table(batch)
+                rows_written += len(rows)
+        finally:
+            if writer is not None:
+                writer.close()
+        return rows_written
+
+    @timed_stage("db")
+    def export_tables_to_parquet(self, tables:list = None, export_dir:Path = None, chunksize:int = 100000) -> dict:
+        """
+        Writes database tables to Parquet, one file per table, streaming each table in chunks. Requires pyarrow.
+
+        Params:
+         * tables: (list)            - The tables to export. Default None, every table except the FTS index tables.
+         * export_dir: (Path Object) - The export folder. Default None, see get_export_dir.
+         * chunksize: (int)          - The number of rows per row group. Default 100000.
+
+        Returns:
+         * rows_written: (dict) - Maps table name to the number of rows written.
+        """
+        export_dir = self.get_export_dir(export_dir) / "tables"
+        if tables is None:
+            table_names = self.query("""
+                                     SELECT name FROM sqlite_master
+                                     WHERE type = 'table' AND name NOT LIKE 'sqlite_%' AND name NOT LIKE 'review_fts%'
+                                     ORDER BY name
+                                     """)
+            tables = table_names["name"].tolist()
+
+        rows_written = {}
+        for table in tables:
+            file_path = export_dir / f"{table}.parquet"
+            if file_path.exists():
+                file_path.unlink()
+            schema = self.get_arrow_schema(table)
+            rows_written[table] = self.write_parquet_stream(f"SELECT * FROM {table}", (), schema, file_path, chunksize)
+        return rows_written
+
+    @timed_stage("db")
+    def export_review_facts_to_parquet(self, export_dir:Path = None, incremental:bool = False, chunksize:int = 100000) -> dict:
+        """
+        Writes a denormalized review fact table (each review with its restaurant, region, reviewer and site) to a
+        Parquet dataset partitioned by region and site_origin, e.g., review_facts/region=Portland_ME/site_origin=Yelp/.
+        Each partition is streamed in chunks, so memory is bounded by the chunk size. The highest review id exported is
+        kept in _export_state.json; with incremental = True only reviews added since the last export are written, as a
+        new part file in each partition. Requires pyarrow.
+
+        Params:
+         * export_dir: (Path Object) - The export folder. Default None, see get_export_dir.
+         * incremental: (bool)       - If True, append the reviews loaded since the last export. If False, the dataset is
+                                       rewritten from scratch. Default False.
+         * chunksize: (int)          - The number of rows per row group. Default 100000.
+
+        Returns:
+         * rows_written: (dict) - Maps partition path to the number of rows written.
+        """
+        import pyarrow as pa
+
+        dataset_dir = self.get_export_dir(export_dir) / "review_facts"
+        state_path = dataset_dir / "_export_state.json"
+
+        # high-water mark of the previous export
+        last_review_id = 0
+        if incremental and state_path.exists():
+            with open(state_path, "r") as file:
+                last_review_id = json.load(file)["last_review_id"]
+        elif dataset_dir.exists():
+            shutil.rmtree(dataset_dir)
+
+        max_review_id = self.query("SELECT IFNULL(MAX(id), 0) AS max_id FROM res_review")["max_id"][0]
+        if max_review_id <= last_review_id:
+            return {}
+
+        schema = pa.schema([("review_id", pa.int64()), ("restaurant_id", pa.int64()), ("restaurant", pa.string()),
+                            ("city", pa.string()), ("state", pa.string()), ("reviewer_id", pa.int64()),
+                            ("reviewer", pa.string()), ("hometown", pa.string()), ("site_name", pa.string()),
+                            ("rating", pa.int64()), ("date", pa.string()), ("review_text", pa.string())])
+        facts_query = """
+                      SELECT R.id, Re.id, Re.name, Re.city, Re.state, V.id, V.name, V.hometown, S.site_name,
+                             R.rating, R.date, R.review_text
+                      FROM res_review AS R
+                      JOIN restaurant AS Re ON R.restaurant_id = Re.id
+                      JOIN site_origin AS S ON R.site_origin_id = S.id
+                      LEFT JOIN reviewer AS V ON R.reviewer_id = V.id
+                      WHERE R.id > :low AND R.id <= :high
+                        AND Re.city IS :city AND Re.state IS :state AND S.site_name IS :site
+                      ORDER BY R.id
+                      """
+        partitions = self.query("""
+                                SELECT DISTINCT Re.city, Re.state, S.site_name
+                                FROM res_review AS R
+                                JOIN restaurant AS Re ON R.restaurant_id = Re.id
+                                JOIN site_origin AS S ON R.site_origin_id = S.id
+                                WHERE R.id > ? AND R.id <= ?
+                                """, (last_review_id, max_review_id))
+
+        rows_written = {}
+        for city, state, site in partitions.itertuples(index = False):
+            region = f"{city}_{state}".replace(" ", "_").replace("/", "-").replace("=", "-")
+            partition = f"region={region}/site_origin={str(site).replace('/', '-').replace('=', '-')}"
+            file_path = dataset_dir / partition / f"part-{last_review_id + 1}-{max_review_id}.parquet"
+            params = {"low": last_review_id, "high": max_review_id, "city": city, "state": state, "site": site}
+            rows_written[partition] = self.write_parquet_stream(facts_query, params, schema, file_path, chunksize)
+
+        # move the high-water mark
+        dataset_dir.mkdir(parents = True, exist_ok = True)
+        with open(state_path, "w") as file:
+            json.dump({"last_review_id": int(max_review_id)}, file)
+        return rows_written
+
+#################################################################################################################################
+# Connection Pool
+#################################################################################################################################
+class ConnectionPool:
+    """
+    A fixed size pool of SQLite connections that can be shared between threads. Each connection is only used by one
+    thread at a time; a thread blocks in connection until one is free.
+
+    Attributes:
+     * db_file_path: (Path Object) - The path to the database file.
+     * size: (int)                 - The number of connections in the pool.
+     * read_only: (bool)           - If True, connections are opened in read-only mode.
+     * connections: (Queue)        - The idle connections.
+
+    Methods:
+     * connection
+     * close
+    """
+
+    def __init__(self, db_file_path:Path, size:int = 4, read_only:bool = True) -> None:
+        """
+        Initializer for ConnectionPool. Opens all the connections up front.
+
+        Params:
+         * db_file_path: (Path Object) - The path to the database file.
+         * size: (int)                 - The number of connections in the pool. Default 4.
+         * read_only: (bool)           - If True, connections are opened in read-only mode. Default True.
+        """
+        self.db_file_path = Path(db_file_path)
+        self.size = size
+        self.read_only = read_only
+        self.connections = queue.Queue(maxsize = size)
+        self.all_connections = []
+        self.lock = threading.Lock()
+
+        for _ in range(size):
+            if read_only:
+                connection = sqlite3.connect(f"{self.db_file_path.as_uri()}?mode=ro", uri = True, check_same_thread = False)
+            else:
+                connection = sqlite3.connect(str(self.db_file_path), check_same_thread = False)
+            self.all_connections.append(connection)
+            self.connections.put(connection)
+
+    @contextmanager
+    def connection(self, timeout:float = None):
+        """
+        Borrows a connection from the pool for the duration of the with block.
+
+        Params:
+         * timeout: (float) - Seconds to wait for a free connection. Default None, wait indefinitely.
+        """
+        connection = self.connections.get(timeout = timeout)
+        try:
+            yield connection
+        finally:
+            if connection.in_transaction:
+                connection.rollback()
+            self.connections.put(connection)
+
+    def close(self) -> None:
+        """
+        Closes every connection in the pool.
+        """
+        with self.lock:
+            for connection in self.all_connections:
+                connection.close()
+            self.all_connections = []
+
+#################################################################################################################################
+# Read Query Service
+#################################################################################################################################
+class ReadQueryService:
+    """
+    Runs read queries concurrently on a pool of read-only connections behind a thread pool, recording the latency of
+    every query. The database is switched to WAL journaling when the service starts, so readers see the last committed
+    state while a loader writes and neither blocks the other. WAL mode is persistent; it stays in place after the
+    service closes.
+
+    Attributes:
+     * db_file_path: (Path Object)   - The path to the database file.
+     * workers: (int)                - The number of worker threads and read-only connections.
+     * wal_connection: (Connection)  - A connection held open while the service runs, so the WAL and shared memory
+                                       files read-only connections need are not removed.
+     * pool: (ConnectionPool)        - The read-only connections.
+     * executor: (ThreadPoolExecutor)- The worker threads.
+     * latencies: (list)             - One dict per finished query: label, queued_ms, execute_ms, total_ms, rows, error.
+
+    Methods:
+     * start
+     * close
+     * run_query
+     * submit
+     * map
+     * get_latency_report
+     * get_latency_summary
+     * reset_latencies
+    """
+
+    def __init__(self, db_file_path:Path, workers:int = 4) -> None:
+        """
+        Initializer for ReadQueryService. No connections are opened until start.
+
+        Params:
+         * db_file_path: (Path Object) - The path to the database file.
+         * workers: (int)              - The number of worker threads and read-only connections. Default 4.
+        """
+        self.db_file_path = Path(db_file_path)
+        self.workers = workers
+        self.wal_connection = None
+        self.pool = None
+        self.executor = None
+        self.latencies = []
+        self.latencies_lock = threading.Lock()
 
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def start(self) -> "ReadQueryService":
+        """
+        Switches the database to WAL journaling, opens the read-only connections and starts the worker threads.
+        """
+        if self.executor is not None:
+            return self
+        if not self.db_file_path.exists():
+            raise FileNotFoundError(self.db_file_path)
+
+        self.wal_connection = sqlite3.connect(str(self.db_file_path), check_same_thread = False)
+        journal_mode = self.wal_connection.execute("PRAGMA journal_mode = WAL").fetchone()[0]
+        if journal_mode.lower() != "wal":
+            print(f"Warning: could not switch {self.db_file_path.name} to WAL, journal_mode is {journal_mode}; "
+                  "readers may block while a loader writes")
+
+        self.pool = ConnectionPool(self.db_file_path, size = self.workers, read_only = True)
+        self.executor = ThreadPoolExecutor(max_workers = self.workers, thread_name_prefix = "read_service")
+        return self
+
+    def close(self) -> "ReadQueryService":
+        """
+        Waits for submitted queries to finish, then stops the worker threads and closes every connection.
+        """
+        if self.executor is not None:
+            self.executor.shutdown(wait = True)
+            self.executor = None
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
+        if self.wal_connection is not None:
+            self.wal_connection.close()
+            self.wal_connection = None
+        return self
+
+    def run_query(self, query:str, params = None, label:str = None, submitted:float = None) -> pd.DataFrame:
+        """
+        Runs one query on a pooled read-only connection and records its latency. Called on a worker thread by submit,
+        but can also be called directly.
+
+        Params:
+         * query: (str)            - A query written in SQL
+         * params: (tuple or dict) - The bind parameters. Default None.
+         * label: (str)            - The name the query is reported under. Default None, the first 60 characters of
+                                     the SQL with its whitespace collapsed.
+         * submitted: (float)      - The time.perf_counter value when the query was submitted. Default None, now.
+
+        Returns:
+         * result: (pd.DataFrame) - A dataframe containing the results of the query.
+        """
+        if params is None:
+            params = ()
+        if label is None:
+            label = " ".join(query.split())[:60]
+        if submitted is None:
+            submitted = time.perf_counter()
+
+        started = time.perf_counter()
+        result = None
+        error = None
+        try:
+            with self.pool.connection() as connection:
+                cur = connection.cursor()
+                try:
+                    cur.execute(query, params)
+                    col_names = [description[0] for description in cur.description]
+                    result = pd.DataFrame(cur.fetchall(), columns = col_names)
+                finally:
+                    cur.close()
+        except sqlite3.Error as e:
+            error = str(e)
+            raise
+        finally:
+            finished = time.perf_counter()
+            with self.latencies_lock:
+                self.latencies.append({"label": label,
+                                       "queued_ms": (started - submitted) * 1000,
+                                       "execute_ms": (finished - started) * 1000,
+                                       "total_ms": (finished - submitted) * 1000,
+                                       "rows": len(result) if result is not None else 0,
+                                       "error": error})
         return result
+
+    def submit(self, query:str, params = None, label:str = None):
+        """
+        Queues a query on the worker threads.
+
+        Params:
+         * query: (str)            - A query written in SQL
+         * params: (tuple or dict) - The bind parameters. Default None.
+         * label: (str)            - The name the query is reported under. Default None, the first 60 characters of
+                                     the SQL with its whitespace collapsed.
+
+        Returns:
+         * future: (Future) - Resolves to the result dataframe, or raises the query's sqlite3.Error.
+        """
+        if self.executor is None:
+            self.start()
+        return self.executor.submit(self.run_query, query, params, label, time.perf_counter())
+
+    def map(self, queries:list) -> list:
+        """
+        Runs a batch of queries concurrently and waits for all of them.
+
+        Params:
+         * queries: (list) - Each item is a SQL string or a (query, params) or (query, params, label) tuple.
+
+        Returns:
+         * results: (list) - The result dataframes, in the order of queries.
+        """
+        futures = []
+        for item in queries:
+            if isinstance(item, str):
+                item = (item, )
+            futures.append(self.submit(*item))
+        return [future.result() for future in futures]
+
+    def get_latency_report(self) -> pd.DataFrame:
+        """
+        Returns the latency of every finished query.
+
+        Returns:
+         * report: (pd.DataFrame) - One row per query: label, queued_ms, execute_ms, total_ms, rows, error.
+        """
+        with self.latencies_lock:
+            return pd.DataFrame(self.latencies, columns = ["label", "queued_ms", "execute_ms", "total_ms", "rows", "error"])
+
+    def get_latency_summary(self) -> pd.DataFrame:
+        """
+        Summarizes the latency report per query label.
+
+        Returns:
+         * summary: (pd.DataFrame) - Per label: count, errors, mean, p50, p95 and max of total_ms, and mean queued_ms.
+        """
+        report = self.get_latency_report()
+        grouped = report.groupby("label")
+        return pd.DataFrame({"count": grouped.size(),
+                             "errors": grouped["error"].count(),
+                             "mean_ms": grouped["total_ms"].mean(),
+                             "p50_ms": grouped["total_ms"].quantile(0.50),
+                             "p95_ms": grouped["total_ms"].quantile(0.95),
+                             "max_ms": grouped["total_ms"].max(),
+                             "mean_queued_ms": grouped["queued_ms"].mean()}).reset_index()
+
+    def reset_latencies(self) -> "ReadQueryService":
+        """
+        Clears the latency report.
+        """
+        with self.latencies_lock:
+            self.latencies = []
+        return self
+
 #################################################################################################################################
 # End
 #################################################################################################################################
@@ -0,0 +1,242 @@
+"""
+Review Aggregator
+
+Stage Recorder
+
+This file contains the StageRecorder class and the timed_stage decorator. Scraper phases, transformer steps and
+database loads are wrapped with timed_stage; each call produces one record with its duration, rows in and out, rows
+rejected and memory high-water mark. Records are kept in memory on the shared RECORDER and, when an output file is
+configured, appended to it as JSON lines so nightly runs can be trended.
+
+Usage:
+    from instrumentation.stage_recorder import RECORDER
+    RECORDER.configure(output_path = "data/logs/stages.jsonl", track_memory = True)
+
+The output file can also be set with the REVIEW_AGG_STAGE_LOG environment variable.
+"""
+###################################################################################################################
+# libraries
+import os
+import json
+import time
+import datetime
+import functools
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import resource
+except ImportError: # not available on Windows
+    resource = None
+
+###################################################################################################################
+# class
+class StageRecorder:
+    """
+    Records one structured record per pipeline stage.
+
+    Attributes:
+     * run_id: (str)            - Identifies the run in every record; by default the start time and process id.
+     * output_path: (Path)      - JSON lines file records are appended to. None keeps them in memory only.
+     * track_memory: (bool)     - If True, peak Python heap per stage is traced with tracemalloc. This slows
+                                  allocation heavy steps, so it is off by default; the process RSS high-water mark
+                                  is always recorded.
+     * records: (list)          - The records of the finished stages, in finishing order.
+
+    Methods:
+     * configure
+     * stage
+     * report_rows
+     * get_records
+     * clear
+    """
+
+    def __init__(self, output_path:Path = None, track_memory:bool = False) -> None:
+        """
+        Initializer for StageRecorder.
+
+        Params:
+         * output_path: (Path) - JSON lines file records are appended to. Default None.
+         * track_memory: (bool) - If True, trace the peak Python heap per stage. Default False.
+        """
+        self.run_id = f"{datetime.datetime.now().strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+        self.output_path = None
+        self.track_memory = False
+        self.records = []
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.configure(output_path, track_memory)
+
+    def configure(self, output_path:Path = None, track_memory:bool = None, run_id:str = None) -> None:
+        """
+        Sets where records are written and whether memory is traced.
+
+        Params:
+         * output_path: (Path)  - JSON lines file records are appended to. None keeps records in memory only.
+         * track_memory: (bool) - If True, trace the peak Python heap per stage. Default None, unchanged.
+         * run_id: (str)        - Overrides the run id, e.g., to group the processes of one nightly run. Default None.
+        """
+        self.output_path = Path(output_path) if output_path else None
+        if self.output_path is not None:
+            self.output_path.parent.mkdir(parents = True, exist_ok = True)
+        if track_memory is not None:
+            self.track_memory = track_memory
+            if track_memory and not tracemalloc.is_tracing():
+                tracemalloc.start()
+        if run_id is not None:
+            self.run_id = run_id
+        return self
+
+    def get_stack(self) -> list:
+        """
+        Returns this thread's stack of open stages.
+        """
+        if not hasattr(self.local, "stack"):
+            self.local.stack = []
+        return self.local.stack
+
+    @contextmanager
+    def stage(self, name:str, rows_in:int = None):
+        """
+        Times the with block as one stage. The yielded record can be updated inside the block, e.g., rows_out.
+        Stages opened inside the block are recorded as its children.
+
+        Params:
+         * name: (str)    - The stage name, e.g., "transform.yelp_review.clean_datelike_col".
+         * rows_in: (int) - The number of rows going into the stage. Default None.
+        """
+        stack = self.get_stack()
+        record = {"run_id": self.run_id,
+                  "stage": name,
+                  "parent": stack[-1]["record"]["stage"] if stack else None,
+                  "started_at": datetime.datetime.now().isoformat(timespec = "milliseconds"),
+                  "duration_s": None,
+                  "rows_in": rows_in,
+                  "rows_out": None,
+                  "rows_rejected": None,
+                  "peak_traced_mb": None,
+                  "max_rss_mb": None,
+                  "status": "ok",
+                  "error": None,
+                  "pid": os.getpid()}
+
+        # the traced peak is shared, so a child stage hands its parent the peak seen so far before resetting it
+        tracing = self.track_memory and tracemalloc.is_tracing()
+        if tracing:
+            if stack:
+                stack[-1]["peak"] = max(stack[-1]["peak"], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        frame = {"record": record, "peak": 0}
+        stack.append(frame)
+
+        start = time.perf_counter()
+        try:
+            yield record
+        except BaseException as e:
+            record["status"] = "error"
+            record["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            record["duration_s"] = round(time.perf_counter() - start, 6)
+            stack.pop()
+            if tracing:
+                peak = max(frame["peak"], tracemalloc.get_traced_memory()[1])
+                record["peak_traced_mb"] = round(peak / 2**20, 3)
+                if stack:
+                    stack[-1]["peak"] = max(stack[-1]["peak"], peak)
+                tracemalloc.reset_peak()
+            if resource is not None:
+                # ru_maxrss is in KiB on Linux and bytes on macOS
+                max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+                record["max_rss_mb"] = round(max_rss / (2**20 if os.uname().sysname == "Darwin" else 2**10), 3)
+            if record["rows_rejected"] is None and record["rows_in"] is not None and record["rows_out"] is not None:
+                record["rows_rejected"] = max(record["rows_in"] - record["rows_out"], 0)
+            self.emit(record)
+
+    def report_rows(self, rows_in:int = None, rows_out:int = None, rows_rejected:int = None) -> None:
+        """
+        Sets row counts on the innermost open stage of this thread, for code that knows its counts better than the
+        stage wrapper can, e.g., a loader that skips rows. Does nothing outside a stage.
+
+        Params:
+         * rows_in: (int)       - Rows read by the stage. Default None, unchanged.
+         * rows_out: (int)      - Rows produced or written by the stage. Default None, unchanged.
+         * rows_rejected: (int) - Rows dropped by the stage. Default None, unchanged.
+        """
+        stack = self.get_stack()
+        if not stack:
+            return None
+        record = stack[-1]["record"]
+        for key, value in (("rows_in", rows_in), ("rows_out", rows_out), ("rows_rejected", rows_rejected)):
+            if value is not None:
+                record[key] = value
+        return None
+
+    def emit(self, record:dict) -> None:
+        """
+        Keeps a finished record and appends it to the output file if one is set.
+        """
+        with self.lock:
+            self.records.append(record)
+            if self.output_path is not None:
+                with open(self.output_path, "a") as file:
+                    file.write(json.dumps(record, default = str) + "\n")
+
+    def get_records(self) -> list:
+        """
+        Returns a copy of the finished records.
+        """
+        with self.lock:
+            return list(self.records)
+
+    def clear(self) -> None:
+        """
+        Drops the in-memory records. The output file is left alone.
+        """
+        with self.lock:
+            self.records = []
+        return self
+
+###################################################################################################################
+# shared recorder and helpers
+RECORDER = StageRecorder(output_path = os.environ.get("REVIEW_AGG_STAGE_LOG"))
+
+def report_rows(rows_in:int = None, rows_out:int = None, rows_rejected:int = None) -> None:
+    """
+    Sets row counts on the innermost open stage of the shared recorder. See StageRecorder.report_rows.
+    """
+    RECORDER.report_rows(rows_in, rows_out, rows_rejected)
+
+def length_of(attribute:str):
+    """
+    Returns a rows function for timed_stage that counts the rows of an attribute, e.g., length_of("raw_data").
+    Returns None while the attribute is unset.
+    """
+    def rows(obj):
+        value = getattr(obj, attribute, None)
+        return len(value) if value is not None else None
+    return rows
+
+def timed_stage(prefix:str, rows = None):
+    """
+    Decorator recording each call of a method as the stage "<prefix>.<method name>" on the shared recorder.
+
+    Params:
+     * prefix: (str)      - The stage name prefix, e.g., "transform.yelp_review".
+     * rows: (func)       - Called with the instance before and after the method to get rows_in and rows_out, e.g.,
+                            length_of("raw_data"). Default None.
+    """
+    def decorator(method):
+        name = f"{prefix}.{method.__name__}"
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with RECORDER.stage(name, rows_in = rows(self) if rows is not None else None) as record:
+                result = method(self, *args, **kwargs)
+                if rows is not None and record["rows_out"] is None:
+                    record["rows_out"] = rows(self)
+            return result
+        return wrapper
+    return decorator
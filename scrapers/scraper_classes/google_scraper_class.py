@@ -24,6 +24,7 @@ from time import sleep
 from bs4 import BeautifulSoup
 from datetime import datetime, timedelta
 import re
+from instrumentation.stage_recorder import timed_stage, length_of
 
 #nltk.download('punkt')
 
@@ -44,6 +45,7 @@ class GoogleScraper:
         self.reviews = []
 
 #############################################################################################
+    @timed_stage("scrape.google")
     def google_search(self, city ="portland", state="maine", business="restaurants"):
         '''
         Description:
@@ -91,6 +93,7 @@ class GoogleScraper:
         sleep(2)
 
 #############################################################################################
+    @timed_stage("scrape.google", rows = length_of("reviews"))
     def get_reviews(self):
         """Collect all links to restuarants on results page"""
 
@@ -178,6 +181,7 @@ class GoogleScraper:
             print("Error:", e)   
 
 #############################################################################################
+    @timed_stage("scrape.google")
     def next_page(self):
         """Advance to next page in restuarant search results"""
 
@@ -241,6 +245,7 @@ class GoogleScraper:
         return reviews        
 
 #############################################################################################
+    @timed_stage("scrape.google", rows = length_of("results_list"))
     def extract_review_data(self):
         """Scrape review data from restuarnt's google page."""
         
@@ -22,6 +22,7 @@ from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
 import time
 from datetime import date
+from instrumentation.stage_recorder import timed_stage, length_of
 nltk.download('punkt')
 
 
@@ -63,6 +64,7 @@ class OpenTableScraper():
         self.region = region
         self.date = str(date.today())
 
+    @timed_stage("scrape.open_table_region")
     def go_to_region(self):
         """
         Go to the city, state specified
@@ -95,6 +97,7 @@ class OpenTableScraper():
                 break
             last_height = new_height
 
+    @timed_stage("scrape.open_table_region", rows = length_of("hrefs"))
     def get_restaurant_urls(self):
         """ 
         Get the individual restaurant urls from the OpenTable homepage.
@@ -220,6 +223,7 @@ class OpenTableScraper():
 
         return results_dict
     
+    @timed_stage("scrape.open_table_region", rows = length_of("restaurant_data"))
     def get_restaurant_data(self, res_url):
         """
         Get the restaurant data
@@ -304,6 +308,7 @@ class OpenTableScraper():
         results_dict['restaurant_name'] = restaurant_name
         self.restaurant_data.append(results_dict)
 
+    @timed_stage("scrape.open_table_region", rows = length_of("review_data"))
     def scrape_individual_restaurant(self, res_url):
         """
         Scrape a restaurant starting the restaurant home url extracted during phase one of the scraper.
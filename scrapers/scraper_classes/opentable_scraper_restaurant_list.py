@@ -24,6 +24,7 @@ from webdriver_manager.chrome import ChromeDriverManager
 import time
 from datetime import date
 import concurrent.futures
+from instrumentation.stage_recorder import timed_stage, length_of
 nltk.download('punkt')
 
 ##########################################################################################################################
@@ -78,6 +79,7 @@ class OpenTableScraperRestaurantList():
         self.reviews = None # this can be removed; VERIFY
         self.date = str(date.today())
 
+    @timed_stage("scrape.open_table_restaurant_list")
     def go_to_base_url(self) -> None:
         """
         Go to the base URL
@@ -117,6 +119,7 @@ class OpenTableScraperRestaurantList():
             print(f'Error going to restuarant: {e}')
             return False
 
+    @timed_stage("scrape.open_table_restaurant_list")
     def go_to_restaurant_with_timeout(self, timeout = 10):
         """
         Adds a timer wrapper to go to restaurant. This is prevent the scraper from getting stuck.
@@ -146,6 +149,7 @@ class OpenTableScraperRestaurantList():
                 print(f"An error occurred in go_to_restaurant_with_timeout: {e}")
                 return False
 
+    @timed_stage("scrape.open_table_restaurant_list")
     def click_res_link(self) -> bool:
         """
         This will click the restaurant link and go to the first page of reviews.
@@ -199,6 +203,7 @@ class OpenTableScraperRestaurantList():
         self.driver.switch_to.window(handles[-1])
         return None
 
+    @timed_stage("scrape.open_table_restaurant_list")
     def get_restaurant_url(self) -> None:
         """
         Gets the current URL, the restaurant URL. Used to switch to BeautifulSoup.
@@ -318,6 +323,7 @@ class OpenTableScraperRestaurantList():
 
         return results_dict
     
+    @timed_stage("scrape.open_table_restaurant_list", rows = length_of("restaurant_data"))
     def get_restaurant_data(self) -> bool:
         """
         Get the restaurant data
@@ -431,6 +437,7 @@ class OpenTableScraperRestaurantList():
         self.restaurant_data.append(results_dict)
         return True
 
+    @timed_stage("scrape.open_table_restaurant_list", rows = length_of("review_data"))
     def scrape_individual_restaurant(self, max_pages = 20):
         """
         Scrape a restaurant starting the restaurant home url extracted during phase one of the scraper.
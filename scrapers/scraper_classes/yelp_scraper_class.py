@@ -22,6 +22,7 @@ from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
 import time
 from datetime import date
+from instrumentation.stage_recorder import timed_stage, length_of
 nltk.download('punkt')
 
 # scraper class
@@ -62,6 +63,7 @@ class YelpScraper:
         self.buiness_type = business_type
         self.date = str(date.today())
 
+    @timed_stage("scrape.yelp")
     def go_to_region(self):
         """
         Go to the city, state specified
@@ -99,6 +101,7 @@ class YelpScraper:
             print(f"Error fetching the region entry box: {e}")
             return
         
+    @timed_stage("scrape.yelp")
     def enter_business_type(self):
         """
         Enter the business type of the reviews we are scraping
@@ -123,6 +126,7 @@ class YelpScraper:
             print(f"Error fetching the business type entry box: {e}")
             return
 
+    @timed_stage("scrape.yelp", rows = length_of("hrefs"))
     def navigate_pages_get_res_urls(self):
         """
         This function will extract the restaurant URLs form the base_url. It will navigate all the pages
@@ -170,6 +174,7 @@ class YelpScraper:
             href = card.get_attribute('href')
             self.hrefs.append(href)
     
+    @timed_stage("scrape.yelp", rows = length_of("hrefs"))
     def remove_unwanted_urls(self):
         """
         This function will remove links that are not links to restaurants
@@ -356,6 +361,7 @@ class YelpScraper:
             # append results dict to the results list
             self.review_data.append(results_dict)
 
+    @timed_stage("scrape.yelp", rows = length_of("review_data"))
     def go_to_restaurant_url_extract_data(self):
         """
         This function will visit all the review pages for a particular restaurant
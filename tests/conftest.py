@@ -0,0 +1,42 @@
+"""
+Review Aggregator
+
+Test fixtures. The tests run against the synthetic curated data written by benchmarks/synthetic_data_generator.py, in
+a temporary project folder.
+"""
+###################################################################################################################
+# libraries
+import os
+import sys
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'db_manager')))
+from benchmarks.synthetic_data_generator import SyntheticDataGenerator
+from database_manager_class import RestaurantReviewDB
+
+###################################################################################################################
+# fixtures
+@pytest.fixture
+def home(tmp_path, monkeypatch):
+    """
+    A project folder holding one synthetic region's curated csv's. The working directory is a folder inside it, as
+    RestaurantReviewDB takes the parent of the working directory as the project folder.
+    """
+    generator = SyntheticDataGenerator(tmp_path, restaurants = 40, reviews = 1200, open_table_share = 0.5,
+                                       open_table_review_share = 0.4, seed = 1)
+    generator.generate()
+    (tmp_path / "work").mkdir()
+    monkeypatch.chdir(tmp_path / "work")
+    return generator
+
+@pytest.fixture
+def res_db(home):
+    """
+    A RestaurantReviewDB with its tables created and the synthetic curated csv's set.
+    """
+    ResDB = RestaurantReviewDB("test.db")
+    ResDB.create_tables()
+    ResDB.set_yelp_data(home.file_names["yelp_review"][1], home.file_names["yelp_restaurant"][1])
+    ResDB.set_open_table_data(home.file_names["open_table_review"][1], home.file_names["open_table_restaurant"][1])
+    return ResDB
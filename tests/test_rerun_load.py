@@ -0,0 +1,68 @@
+"""
+Review Aggregator
+
+Rerunning a load on the same curated csv's must not add rows to res_review or open_table_category_rating, or change
+the restaurant_rating_summary counts.
+"""
+###################################################################################################################
+# libraries
+import sqlite3
+
+###################################################################################################################
+# helpers
+def get_counts(ResDB) -> dict:
+    """
+    Returns the row counts of the fact tables and the totals of the rating summary.
+    """
+    with sqlite3.connect(str(ResDB.get_db_file_path())) as connection:
+        counts = {table: connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                  for table in ("res_review", "open_table_category_rating")}
+        counts["summary"] = connection.execute("""
+                                               SELECT SUM(review_count), SUM(rating_count), SUM(food_count),
+                                                      SUM(service_count), SUM(ambience_count)
+                                               FROM restaurant_rating_summary
+                                               """).fetchone()
+    return counts
+
+def load_tables(ResDB) -> None:
+    """
+    Loads every table with the load_* methods, in the order given in the README.
+    """
+    (ResDB.load_site_origin_table().load_region_table().load_tags_table().load_price_point_table()
+          .load_restuarant_table().load_res_tags_table().load_reviewer_table()
+          .load_restaurant_review_table(incremental = True).load_aux_rating_table())
+
+###################################################################################################################
+# tests
+def test_load_all_rerun_adds_nothing(res_db):
+    res_db.load_all()
+    counts = get_counts(res_db)
+    assert counts["open_table_category_rating"] > 0
+
+    res_db.load_all()
+    assert get_counts(res_db) == counts
+
+def test_load_tables_rerun_adds_nothing(res_db):
+    load_tables(res_db)
+    counts = get_counts(res_db)
+    assert counts["open_table_category_rating"] > 0
+
+    res_db.load_restaurant_review_table(incremental = True).load_aux_rating_table()
+    assert get_counts(res_db) == counts
+
+def test_load_all_skips_loaded_files(res_db, monkeypatch):
+    res_db.load_all()
+    read_files = []
+    read_curated_columns = res_db.read_curated_columns
+    monkeypatch.setattr(res_db, "read_curated_columns", lambda path: read_files.append(path) or read_curated_columns(path))
+
+    # both review files are recorded as completely loaded, so nothing is parsed
+    res_db.load_all()
+    assert read_files == []
+
+    # a loaded review file is skipped while the other is loaded
+    with sqlite3.connect(str(res_db.get_db_file_path())) as connection:
+        connection.execute("DELETE FROM load_log WHERE file_name = ?", (res_db.yelp_review_data.name, ))
+    res_db.load_all()
+    assert res_db.open_table_review_data not in read_files
+    assert res_db.yelp_review_data in read_files
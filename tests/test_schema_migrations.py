@@ -0,0 +1,66 @@
+"""
+Review Aggregator
+
+create_tables builds a new database at the latest schema version and upgrades a database created with the baseline
+schema, and the loaders' per row lookups are served by indexes.
+"""
+###################################################################################################################
+# libraries
+import sqlite3
+from database_manager_class import RestaurantReviewDB
+
+###################################################################################################################
+# helpers
+def create_baseline_database(monkeypatch) -> RestaurantReviewDB:
+    """
+    Creates the tables without applying any migration, as create_tables did before MIGRATIONS, and adds duplicate
+    reviewers and a review for the migrations to rewrite.
+    """
+    ResDB = RestaurantReviewDB("baseline.db")
+    with monkeypatch.context() as patch:
+        patch.setattr(RestaurantReviewDB, "migrate", lambda ResDB: ResDB)
+        ResDB.create_tables()
+    with sqlite3.connect(str(ResDB.get_db_file_path())) as connection:
+        connection.executemany("INSERT INTO reviewer(name, hometown) VALUES (?, ?)",
+                               [("Ann", "Portland, ME"), ("Ann", "Portland, ME"), ("Bob", None)])
+        connection.execute("""
+                           INSERT INTO res_review(restaurant_id, reviewer_id, site_origin_id, rating, date, review_text)
+                           VALUES (1, 2, 1, 5, '2024-07-01', 'Great chowder')
+                           """)
+    return ResDB
+
+def assert_lookups_use_indexes(ResDB:RestaurantReviewDB) -> None:
+    """
+    Asserts every entry of explain_lookup_queries is served by an index.
+    """
+    plans = ResDB.explain_lookup_queries()
+    assert set(plans) == set(RestaurantReviewDB.LOOKUP_QUERIES)
+    for name, (uses_index, plan_details) in plans.items():
+        assert uses_index, f"{name} scans the table: {plan_details}"
+
+###################################################################################################################
+# tests
+def test_new_database_is_at_latest_version(home):
+    ResDB = RestaurantReviewDB("new.db")
+    ResDB.create_tables()
+    assert ResDB.get_schema_version() == len(RestaurantReviewDB.MIGRATIONS)
+    assert_lookups_use_indexes(ResDB)
+
+def test_baseline_database_is_upgraded(home, monkeypatch):
+    ResDB = create_baseline_database(monkeypatch)
+    assert ResDB.get_schema_version() == 0
+    assert not all(uses_index for uses_index, _ in ResDB.explain_lookup_queries().values())
+
+    ResDB.create_tables()
+    assert ResDB.get_schema_version() == len(RestaurantReviewDB.MIGRATIONS)
+    assert_lookups_use_indexes(ResDB)
+
+    # migration 2 collapses the duplicate reviewer, and the review follows it to the kept id
+    with sqlite3.connect(str(ResDB.get_db_file_path())) as connection:
+        assert connection.execute("SELECT COUNT(*) FROM reviewer").fetchone()[0] == 2
+        assert connection.execute("SELECT reviewer_id FROM res_review").fetchall() == [(1, )]
+
+def test_create_tables_is_idempotent(home):
+    ResDB = RestaurantReviewDB("new.db")
+    ResDB.create_tables().create_tables()
+    assert ResDB.get_schema_version() == len(RestaurantReviewDB.MIGRATIONS)